@@ -0,0 +1,117 @@
+"""
+Compare a pytest-benchmark JSON run against a stored baseline.
+
+    python benchmarks/compare.py .cache/bench.json
+    python benchmarks/compare.py .cache/bench.json --threshold 0.25
+    python benchmarks/compare.py .cache/bench.json --update
+
+Benchmarks are matched by test file name and test id (so runs from any
+rootdir line up) and compared on their median time. One that is slower
+than baseline * (1 + threshold) is a regression. The exit status is 1
+on any regression or when a baseline benchmark is missing from the run,
+so a run that matched nothing cannot pass. --update writes the run as
+the new baseline instead. Baselines only compare meaningfully on the
+machine they were recorded on.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from typing import Dict, List, Tuple
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baselines', 'baseline.json')
+
+
+def bench_key(fullname: str) -> str:
+    """'test_file.py::test[id]' for a pytest node id, whatever directory it was collected from."""
+    path, _, test = fullname.partition('::')
+    return f"{os.path.basename(path)}::{test}"
+
+
+def load_run(path: str) -> Dict[str, Dict]:
+    """{benchmark name: {'median_s', 'mean_s', 'rounds'}} from pytest-benchmark's --benchmark-json output."""
+    with open(path, 'r') as f:
+        doc = json.load(f)
+    return {
+        bench_key(b['fullname']): {'median_s': b['stats']['median'], 'mean_s': b['stats']['mean'], 'rounds': b['stats']['rounds']}
+        for b in doc.get('benchmarks', [])
+    }
+
+
+def load_baseline(path: str) -> Dict[str, Dict]:
+    with open(path, 'r') as f:
+        return json.load(f)['benchmarks']
+
+
+def save_baseline(results: Dict[str, Dict], path: str, run_path: str) -> None:
+    with open(run_path, 'r') as f:
+        machine = json.load(f).get('machine_info', {})
+    doc = {
+        'machine': {
+            'node': machine.get('node', platform.node()),
+            'cpu': machine.get('cpu', {}).get('brand_raw', platform.processor()),
+            'python': machine.get('python_version', platform.python_version()),
+        },
+        'benchmarks': dict(sorted(results.items())),
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(doc, f, indent=2)
+        f.write('\n')
+
+
+def compare(current: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> Tuple[List[Tuple], List[str], List[str]]:
+    """
+    Returns (rows, regressions, missing): rows are (name, baseline_s,
+    current_s, ratio) for benchmarks in both; missing are baseline names
+    absent from the run. New benchmarks are ignored until --update.
+    """
+    rows, regressions = [], []
+    for name in sorted(set(current) & set(baseline)):
+        base, cur = baseline[name]['median_s'], current[name]['median_s']
+        ratio = cur / base if base > 0 else float('inf')
+        rows.append((name, base, cur, ratio))
+        if ratio > 1.0 + threshold:
+            regressions.append(name)
+    missing = sorted(set(baseline) - set(current))
+    return rows, regressions, missing
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='Flag benchmark regressions against a stored baseline')
+    p.add_argument('run', help='JSON written by pytest --benchmark-json')
+    p.add_argument('--baseline', default=DEFAULT_BASELINE)
+    p.add_argument('--threshold', type=float, default=0.15, help='Allowed slowdown of the median, as a fraction')
+    p.add_argument('--update', action='store_true', help='Store this run as the baseline')
+    args = p.parse_args(argv)
+
+    current = load_run(args.run)
+    if args.update:
+        save_baseline(current, args.baseline, args.run)
+        print(f"Wrote {len(current)} benchmarks to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update first")
+        return 2
+
+    rows, regressions, missing = compare(current, load_baseline(args.baseline), args.threshold)
+    width = max((len(r[0]) for r in rows), default=10)
+    print(f"{'benchmark':<{width}}  {'baseline':>10}  {'current':>10}  {'ratio':>6}")
+    for name, base, cur, ratio in rows:
+        flag = '  REGRESSION' if name in regressions else ''
+        print(f"{name:<{width}}  {base * 1000:>8.2f}ms  {cur * 1000:>8.2f}ms  {ratio:>6.2f}{flag}")
+    for name in missing:
+        print(f"missing from run: {name}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    if missing:
+        print(f"{len(missing)} baseline benchmark(s) missing from the run")
+        return 1
+    print("No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Shared inputs for the benchmark suite.
+
+Run from poi_tool/ with pytest-benchmark installed:
+
+    python -m pytest benchmarks --benchmark-json=.cache/bench.json
+    python benchmarks/compare.py .cache/bench.json
+
+Sizes go from 1k to 100k elements; POI_BENCH_FULL=1 adds 1M. Inputs are
+synthesized with a fixed seed, so runs are comparable across machines
+and commits.
+"""
+import os
+from functools import lru_cache
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+from src.normalize import normalize_elements
+from src.overpass_client import OverpassClient
+from src.replay_server import ReplayServer, SyntheticWorld
+
+SEED = 42
+CENTER = (40.0, -74.0)
+SIZES = [1_000, 10_000, 100_000] + ([1_000_000] if os.environ.get('POI_BENCH_FULL') else [])
+
+
+def world_bbox(lat: float = CENTER[0], lon: float = CENTER[1], half_deg: float = 0.05):
+    return (lat - half_deg, lon - half_deg, lat + half_deg, lon + half_deg)
+
+
+@lru_cache(maxsize=None)
+def world(n: int) -> SyntheticWorld:
+    return SyntheticWorld(n, world_bbox(), seed=SEED)
+
+
+@lru_cache(maxsize=None)
+def elements(n: int) -> List[Dict]:
+    """n Overpass-shaped elements, the same ones the replay server would return."""
+    w = world(n)
+    return [w.element(i) for i in range(n)]
+
+
+@lru_cache(maxsize=None)
+def rows(n: int) -> List[Dict]:
+    return normalize_elements(elements(n))
+
+
+@lru_cache(maxsize=None)
+def points(n: int):
+    rng = np.random.default_rng(SEED)
+    south, west, north, east = world_bbox()
+    return rng.uniform(south, north, n), rng.uniform(west, east, n)
+
+
+def run(benchmark, fn, *args, n: int = 1, **kwargs):
+    """Benchmark fn; above 10k elements use a few fixed rounds instead of calibration."""
+    if n > 10_000:
+        return benchmark.pedantic(fn, args=args, kwargs=kwargs, rounds=3, iterations=1, warmup_rounds=1)
+    return benchmark(fn, *args, **kwargs)
+
+
+@pytest.fixture(params=SIZES, ids=lambda n: f"n={n}")
+def size(request):
+    return request.param
+
+
+@pytest.fixture
+def replay_client(size):
+    """OverpassClient (no response cache) against a replay server holding size synthetic POIs."""
+    with ReplayServer(synth_elements=size, synth_bbox=world_bbox(), seed=SEED) as server, \
+            OverpassClient(base_url=server.url) as client:
+        yield client
@@ -0,0 +1,54 @@
+import pytest
+import yaml
+
+from src.extractor import map_to_detailed_category
+from src.geometry import bbox_wgs84_for_square_m, bboxes_wgs84_for_squares_m, distances_km
+from src.normalize import normalize_elements
+from src.tags import load_tag_filters
+
+from conftest import CENTER, elements, points, run
+
+
+def test_normalize_elements(benchmark, size):
+    els = elements(size)
+    out = run(benchmark, normalize_elements, els, n=size)
+    assert len(out) == size
+
+
+def test_map_to_detailed_category(benchmark, size):
+    tags = [el['tags'] for el in elements(size)]
+    out = run(benchmark, lambda: [map_to_detailed_category(t) for t in tags], n=size)
+    assert len(out) == size
+
+
+def test_bbox_wgs84_for_square_m(benchmark):
+    lats, lons = points(1_000)
+    centers = list(zip(lats.tolist(), lons.tolist()))
+    out = run(benchmark, lambda: [bbox_wgs84_for_square_m(lat, lon, 1000) for lat, lon in centers])
+    assert len(out) == len(centers)
+
+
+def test_bboxes_wgs84_for_squares_m(benchmark, size):
+    lats, lons = points(size)
+    out = run(benchmark, bboxes_wgs84_for_squares_m, lats, lons, 1000, n=size)
+    assert out.shape == (size, 5)
+
+
+@pytest.mark.parametrize('mode', ['geodesic', 'haversine'])
+def test_distances_km(benchmark, size, mode):
+    lats, lons = points(size)
+    out = run(benchmark, distances_km, CENTER[0], CENTER[1], lats, lons, mode, n=size)
+    assert len(out) == size
+
+
+def test_load_tag_filters(benchmark):
+    out = run(benchmark, load_tag_filters, 'config/tags.yml')
+    assert out
+
+
+def test_load_tag_filters_large(benchmark, tmp_path):
+    path = tmp_path / 'tags.yml'
+    entries = [{'key': f'key{i}', 'values': [f'v{j}' for j in range(10)]} for i in range(1_000)]
+    path.write_text(yaml.safe_dump({'tags': entries}))
+    out = run(benchmark, load_tag_filters, str(path))
+    assert len(out) == 10_000
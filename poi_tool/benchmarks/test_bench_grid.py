@@ -0,0 +1,26 @@
+import pytest
+
+from src import extractor
+
+from conftest import CENTER, run
+
+
+@pytest.fixture
+def grid_backend(replay_client):
+    extractor.set_overpass_client(replay_client)
+    yield replay_client
+    extractor.set_overpass_client(None)
+
+
+def test_grid_analysis_single_fetch(benchmark, size, grid_backend):
+    df = run(benchmark, extractor.create_grid_analysis, CENTER[0], CENTER[1], grid_size_km=0.5,
+             search_radius_km=3.0, single_fetch=True, n=size)
+    assert len(df) > 0
+
+
+@pytest.mark.parametrize('size', [10_000], ids=lambda n: f"n={n}")
+def test_grid_analysis_per_cell(benchmark, size, grid_backend):
+    # One HTTP round trip per cell: a few fixed rounds rather than calibration
+    df = benchmark.pedantic(extractor.create_grid_analysis, args=(CENTER[0], CENTER[1]), rounds=3, warmup_rounds=1,
+                            kwargs=dict(grid_size_km=0.5, search_radius_km=2.0, single_fetch=False, max_workers=4))
+    assert len(df) > 0
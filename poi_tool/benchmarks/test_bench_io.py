@@ -0,0 +1,10 @@
+from src.io_utils import write_outputs
+
+from conftest import rows, run
+
+
+def test_write_outputs_csv_json(benchmark, size, tmp_path):
+    data = rows(size)
+    meta = {'input_address': 'bench', 'bbox_wgs84': [0, 0, 1, 1], 'tagset_hash': 'x', 'overpass_url': 'replay'}
+    csv_path, json_path = run(benchmark, write_outputs, data, str(tmp_path), meta, n=size)
+    assert csv_path.endswith('pois.csv') and json_path.endswith('pois.json')
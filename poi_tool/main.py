@@ -3,9 +3,12 @@ import os
 from src.extractor import geocode_address, get_pois, get_pois_with_detailed_categories, create_grid_analysis, create_grid_analysis_vertical
 from src.geometry import bbox_wgs84_for_square_m
 from src.tags import load_tag_filters, tagset_hash
-from src.overpass_client import OverpassClient
+from src.spatial_index import SpatialIndex
+from src import extractor
 from src.normalize import normalize_elements
 from src.io_utils import write_outputs
+from src.checkpoint import GridCheckpoint
+from src.cli import _add_cache_args, _add_format_arg, _check_format_args, _client_from_args, _overpass_args
 
 def main():
     parser = argparse.ArgumentParser(description="Extract POIs from OpenStreetMap.")
@@ -19,15 +22,42 @@ def main():
                        help="Search radius in km for grid analysis (default: 5.0)")
     parser.add_argument("--grid-size", type=float, default=0.5, 
                        help="Grid cell size in km (default: 0.5)")
+    parser.add_argument("--distance", type=str, choices=["geodesic", "haversine"], default="geodesic",
+                       help="Distance model: WGS84 geodesic or faster spherical haversine (within 0.6%%)")
+    parser.add_argument("--per-cell", action='store_true',
+                       help="Query Overpass once per grid cell instead of fetching the whole search area once")
+    parser.add_argument("--workers", type=int, default=4,
+                       help="Concurrent cell queries with --per-cell (default: 4)")
+    parser.add_argument("--resume", action='store_true',
+                       help="With --per-cell, skip cells already finished by an earlier run with the same parameters")
+    parser.add_argument("--checkpoint-dir", type=str, default=None, help="Directory for per-cell grid checkpoints")
     # New deterministic pipeline flags
     parser.add_argument("--poiextract", action='store_true', help="Run deterministic 1x1 km extraction with tags.yml")
     parser.add_argument("--tags", type=str, default="config/tags.yml", help="Path to tags.yml")
-    parser.add_argument("--overpass-url", type=str, default="https://overpass-api.de/api/interpreter", help="Overpass endpoint")
+    _overpass_args(parser)
     parser.add_argument("--snapshot", type=str, default=None, help="YYYY-MM-DD to pin OSM date")
     parser.add_argument("--outdir", type=str, default="out", help="Output directory for deterministic pipeline")
+    _add_format_arg(parser)
+    _add_cache_args(parser)
     
     args = parser.parse_args()
+    _check_format_args(parser, args)
+    if args.resume and not (args.per_cell and args.analysis != "individual"):
+        parser.error("--resume only applies to grid analysis with --per-cell")
     
+    # One backend shared by the deterministic pipeline and grid analysis
+    with _client_from_args(args) as client:
+        extractor.set_overpass_client(client)
+        run(args, parser, client)
+
+
+def run(args, parser, client):
+    if not args.poiextract and isinstance(client, SpatialIndex):
+        missing = client.missing_filters(extractor.DETAILED_FILTERS)
+        if missing:
+            parser.error(f"index {args.index_dir} lacks {', '.join(missing)} needed for {args.analysis} analysis; "
+                         "rebuild it with 'python -m src.cli index --detailed'")
+
     lat, lon = None, None
     
     if args.address:
@@ -51,9 +81,7 @@ def main():
         south, west, north, east, utm_zone = bbox_wgs84_for_square_m(lat, lon, side_m=1000)
         filters = load_tag_filters(args.tags)
         tag_hash = tagset_hash(filters)
-        client = OverpassClient(base_url=args.overpass_url)
-        query = client.build_query((south, west, north, east), filters, snapshot_iso=(args.snapshot + 'T00:00:00Z') if args.snapshot else None)
-        data = client.fetch(query)
+        data = client.fetch_bbox((south, west, north, east), filters, snapshot_iso=(args.snapshot + 'T00:00:00Z') if args.snapshot else None)
         elements = data.get('elements', [])
         rows = normalize_elements(elements)
         meta = {
@@ -63,15 +91,25 @@ def main():
             'utm_zone': utm_zone,
             'bbox_wgs84': [south, west, north, east],
             'tagset_hash': tag_hash,
-            'overpass_url': args.overpass_url,
+            'overpass_url': client.source,
             'osm_base_ts': data.get('osm3s', {}).get('timestamp_osm_base'),
         }
-        csv_path, json_path = write_outputs(rows, args.outdir, meta)
-        print(f"Wrote {len(rows)} rows to {csv_path} and {json_path}")
+        data_path, json_path = write_outputs(rows, args.outdir, meta, args.format, args.compress)
+        print(f"Wrote {len(rows)} rows to {data_path} and {json_path}")
         return
     
+    checkpoint = None
+    if args.per_cell and args.analysis != "individual":
+        run_params = {
+            'analysis': args.analysis, 'lat': lat, 'lon': lon, 'grid_size_km': args.grid_size,
+            'search_radius_km': args.radius, 'distance': args.distance, 'overpass_url': client.source,
+        }
+        checkpoint = GridCheckpoint.for_run(run_params, args.checkpoint_dir)
+        if not args.resume:
+            checkpoint.reset()
+
     if args.analysis == "individual":
-        pois_df = get_pois_with_detailed_categories(lat, lon)
+        pois_df = get_pois_with_detailed_categories(lat, lon, distance_mode=args.distance)
         
         if pois_df.empty:
             print("No POIs found in the specified area.")
@@ -87,7 +125,7 @@ def main():
     
     elif args.analysis == "grid":  # horizontal grid analysis
         print(f"Performing grid analysis with {args.radius}km radius and {args.grid_size}km cells...")
-        grid_df = create_grid_analysis(lat, lon, grid_size_km=args.grid_size, search_radius_km=args.radius)
+        grid_df = create_grid_analysis(lat, lon, grid_size_km=args.grid_size, search_radius_km=args.radius, single_fetch=not args.per_cell, distance_mode=args.distance, max_workers=args.workers, checkpoint=checkpoint)
         
         if grid_df.empty:
             print("No POIs found in the specified area.")
@@ -106,7 +144,7 @@ def main():
     
     else:  # vertical grid analysis
         print(f"Performing vertical grid analysis with {args.radius}km radius and {args.grid_size}km cells...")
-        grid_df = create_grid_analysis_vertical(lat, lon, grid_size_km=args.grid_size, search_radius_km=args.radius)
+        grid_df = create_grid_analysis_vertical(lat, lon, grid_size_km=args.grid_size, search_radius_km=args.radius, single_fetch=not args.per_cell, distance_mode=args.distance, max_workers=args.workers, checkpoint=checkpoint)
         
         if grid_df.empty:
             print("No POIs found in the specified area.")
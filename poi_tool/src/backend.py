@@ -0,0 +1,39 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+BBox = Tuple[float, float, float, float]
+
+
+class ExtractBackend(ABC):
+    """
+    Source of OSM elements for bbox + tag-filter queries.
+
+    Implementations return Overpass-shaped results, {'osm3s': {...},
+    'elements': [...]}, with way/relation positions in 'center' as from
+    `out center`, so normalize_elements works on either. Filters use the
+    tags.yml / Overpass QL filter syntax (e.g. ["amenity"="cafe"]).
+    """
+
+    @property
+    @abstractmethod
+    def source(self) -> str:
+        """Where the data comes from, recorded as overpass_url in run metadata."""
+
+    @abstractmethod
+    def fetch_bbox(self, bbox: BBox, filters: List[str], snapshot_iso: Optional[str] = None, max_depth: int = 3,
+                   max_elements: Optional[int] = None, max_workers: int = 1) -> Dict:
+        """Elements inside bbox (south, west, north, east) matching any filter."""
+
+    @abstractmethod
+    def fetch_all_chunked(self, bbox: BBox, filters: List[str], snapshot_iso: Optional[str] = None, chunk_size: int = 4,
+                          max_workers: int = 1, max_depth: int = 3) -> Dict:
+        """Like fetch_bbox, for filter lists too large for one request."""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,85 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+
+def default_checkpoint_dir() -> str:
+    return os.path.join(os.path.dirname(__file__), '..', '.cache', 'grid_runs')
+
+
+def run_key(params: Dict) -> str:
+    s = json.dumps(params, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(s.encode('utf-8')).hexdigest()[:16]
+
+
+class GridCheckpoint:
+    """
+    Append-only JSONL store of finished grid cells for one run.
+
+    Each line is {"cell": grid_id, "rows": [...]}; a torn last line from an
+    interrupted write is ignored on load and cut off before the first
+    append, so new records start on a line of their own. The file name is
+    derived from the run parameters, so only a run with identical
+    parameters resumes it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._repaired = False
+
+    @classmethod
+    def for_run(cls, params: Dict, base_dir: Optional[str] = None) -> "GridCheckpoint":
+        base_dir = base_dir or default_checkpoint_dir()
+        os.makedirs(base_dir, exist_ok=True)
+        return cls(os.path.join(base_dir, f"grid_{run_key(params)}.jsonl"))
+
+    def load(self) -> Dict[str, List[Dict]]:
+        done: Dict[str, List[Dict]] = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                done[rec['cell']] = rec.get('rows', [])
+        return done
+
+    def append(self, cell_id: str, rows: List[Dict]) -> None:
+        line = json.dumps({'cell': cell_id, 'rows': rows}, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            if not self._repaired:
+                self._truncate_torn_tail()
+                self._repaired = True
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _truncate_torn_tail(self) -> None:
+        """Drop anything after the last newline, left by a write that was interrupted."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                start = max(pos - 65536, 0)
+                f.seek(start)
+                block = f.read(pos - start)
+                nl = block.rfind(b'\n')
+                if nl >= 0:
+                    pos = start + nl + 1
+                    break
+                pos = start
+            if pos < end:
+                f.truncate(pos)
+
+    def reset(self) -> None:
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
@@ -0,0 +1,104 @@
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import yaml
+
+ANY_VALUE = "*"
+
+
+def default_rules_path() -> str:
+    return os.path.join(os.path.dirname(__file__), '..', 'config', 'categories.yml')
+
+
+def _values(spec) -> Optional[frozenset]:
+    """None means "any non-empty value"."""
+    if spec == ANY_VALUE:
+        return None
+    if not isinstance(spec, list):
+        spec = [spec]
+    return frozenset(str(v) for v in spec)
+
+
+class CategoryClassifier:
+    """
+    Ordered first-match-wins rule table compiled into a dispatch index.
+
+    Each rule is indexed under one (key, value) pair of its match clause
+    (or under the key alone for "*"), so classifying an element only looks
+    at rules reachable from the element's own tags: O(number of tags).
+    """
+
+    def __init__(self, rules: List[Dict], default: str = "other"):
+        self.default = default
+        self.categories: List[str] = []
+        self._match: List[List[Tuple[str, Optional[frozenset]]]] = []
+        self._unless: List[List[Tuple[str, frozenset]]] = []
+        self._by_value: Dict[Tuple[str, str], List[int]] = {}
+        self._by_key: Dict[str, List[int]] = {}
+        keys = set()
+        for rid, rule in enumerate(rules):
+            match = [(k, _values(v)) for k, v in (rule.get('match') or {}).items()]
+            if not match:
+                raise ValueError(f"Rule {rid} ({rule.get('category')}) has no match clause")
+            unless = [(k, _values(v)) for k, v in (rule.get('unless') or {}).items()]
+            self.categories.append(rule['category'])
+            self._match.append(match)
+            self._unless.append(unless)
+            anchor_key, anchor_values = match[0]
+            if anchor_values is None:
+                self._by_key.setdefault(anchor_key, []).append(rid)
+            else:
+                for v in anchor_values:
+                    self._by_value.setdefault((anchor_key, v), []).append(rid)
+            keys.update(k for k, _ in match)
+            keys.update(k for k, _ in unless)
+        self.keys = frozenset(keys)
+
+    def _rule_holds(self, rid: int, tags: Dict) -> bool:
+        for key, values in self._match[rid]:
+            v = tags.get(key)
+            if values is None:
+                if not v:
+                    return False
+            elif v not in values:
+                return False
+        for key, values in self._unless[rid]:
+            if tags.get(key) in values:
+                return False
+        return True
+
+    def classify(self, tags: Dict) -> str:
+        best = None
+        for key, value in tags.items():
+            if key not in self.keys:
+                continue
+            candidates = self._by_value.get((key, value), [])
+            if value:
+                candidates = candidates + self._by_key.get(key, [])
+            for rid in candidates:
+                if (best is None or rid < best) and self._rule_holds(rid, tags):
+                    best = rid
+        return self.default if best is None else self.categories[best]
+
+    def classify_many(self, tag_dicts: Iterable[Dict]) -> List[str]:
+        """
+        Classify a column of tag dicts. Results are memoized on the subset of
+        tags the rules look at, so repeated tag combinations cost one lookup.
+        """
+        memo: Dict[Tuple, str] = {}
+        key_order = sorted(self.keys)
+        out: List[str] = []
+        for tags in tag_dicts:
+            tags = tags or {}
+            sig = tuple(map(tags.get, key_order))
+            category = memo.get(sig)
+            if category is None:
+                category = memo[sig] = self.classify(tags)
+            out.append(category)
+        return out
+
+
+def load_category_rules(path: Optional[str] = None) -> CategoryClassifier:
+    with open(path or default_rules_path(), 'r') as f:
+        cfg = yaml.safe_load(f) or {}
+    return CategoryClassifier(cfg.get('rules', []), default=cfg.get('default', 'other'))
@@ -1,13 +1,113 @@
 import argparse
+import csv
 import glob
 import json
-from .geocode import cached_geocode
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from .geocode import cached_geocode, iter_geocode
 from .geometry import bbox_wgs84_for_square_m
-from .tags import load_tag_filters, tagset_hash
+from .tags import load_tag_filters, tagset_hash, compile_filters
 from .overpass_client import OverpassClient
+from .overpass_cache import OverpassCache
+from .backend import ExtractBackend
+from .local_osm import LocalOSMBackend
+from .spatial_index import SpatialIndex
 from .normalize import normalize_elements
-from .io_utils import write_outputs
+from .io_utils import write_outputs, write_combined, id_list_hash, OUTPUT_FORMATS, STREAM_FILES
 from .debug_repro import run_repro, compare_runs
+from .refresh import refresh_sites
+from .replay_server import DEFAULT_RECORDED_ENDPOINT, ReplayServer
+from .extractor import DETAILED_FILTERS
+
+
+def _add_cache_args(p: argparse.ArgumentParser):
+    p.add_argument('--cache-dir', type=str, default=None, help='Overpass response cache directory')
+    p.add_argument('--cache-ttl', type=int, default=86400, help='Seconds before cached live (non-snapshot) responses expire')
+    p.add_argument('--cache-max-mb', type=int, default=512, help='Size budget of the response cache in MB')
+    p.add_argument('--no-cache', action='store_true', help='Always query Overpass')
+
+
+def _cache_from_args(args):
+    if args.no_cache:
+        return None
+    return OverpassCache(args.cache_dir, ttl_s=args.cache_ttl, max_bytes=args.cache_max_mb * 1024 * 1024)
+
+
+def _overpass_args(p: argparse.ArgumentParser):
+    p.add_argument('--overpass-url', type=str, nargs='+', default=['https://overpass-api.de/api/interpreter'], help='Overpass endpoint; extra URLs are used as mirrors')
+    p.add_argument('--hedge', action='store_true', help='Send a duplicate query to the next mirror when the first exceeds its p95 latency')
+    p.add_argument('--osm-file', type=str, default=None, help='Answer queries from a local .osm/.osm.pbf extract instead of Overpass')
+    p.add_argument('--index-dir', type=str, default=None, help='Answer queries from a spatial index built by poiextract index')
+    p.add_argument('--max-elements', type=int, default=None,
+                   help='Split an Overpass query into quadrants when its response has this many elements')
+
+
+def _client_from_args(args) -> ExtractBackend:
+    if args.index_dir:
+        return SpatialIndex(args.index_dir)
+    if args.osm_file:
+        return LocalOSMBackend(args.osm_file)
+    return OverpassClient(base_url=args.overpass_url[0], mirrors=args.overpass_url[1:], hedge=args.hedge, cache=_cache_from_args(args),
+                          max_elements=args.max_elements)
+
+
+def _check_format_args(p: argparse.ArgumentParser, args):
+    if args.compress and args.format not in STREAM_FILES:
+        p.error(f"--compress only applies to --format {', '.join(STREAM_FILES)}")
+
+
+def _add_format_arg(p: argparse.ArgumentParser):
+    p.add_argument('--format', type=str, choices=OUTPUT_FORMATS, default='csv',
+                   help='Output format; parquet, arrow and feather need pyarrow')
+    p.add_argument('--compress', type=str, choices=['gzip', 'zstd'], default=None,
+                   help='Compress csv-stream, ndjson and geojson output (zstd needs zstandard)')
+
+
+def _snapshot_iso(snapshot: Optional[str]) -> Optional[str]:
+    return (snapshot + 'T00:00:00Z') if snapshot else None
+
+
+def extract_site(client: ExtractBackend, lat: float, lon: float, filters: List[str], outdir: str,
+                 address: str = '', snapshot_iso: Optional[str] = None, workers: int = 1, stream: bool = False,
+                 fmt: str = 'csv', compression: Optional[str] = None) -> Tuple[List[Dict], Dict]:
+    """
+    Run the 1x1 km extraction for one center with an existing backend and
+    write it to outdir in fmt (see write_outputs). stream only applies to
+    OverpassClient. Returns (rows, meta).
+    """
+    south, west, north, east, utm_zone = bbox_wgs84_for_square_m(lat, lon, side_m=1000)
+    if stream and isinstance(client, OverpassClient):
+        # One chunk at a time, parsed incrementally: memory stays flat
+        header = {}
+        elements = (
+            el for flt in compile_filters(filters)
+            for el in client.iter_elements(client.build_query((south, west, north, east), [flt], snapshot_iso=snapshot_iso), header)
+        )
+        rows = normalize_elements(elements)
+        data = {'osm3s': header.get('osm3s', {})}
+    else:
+        # Use chunked fetch to avoid Overpass OOM
+        data = client.fetch_all_chunked((south, west, north, east), filters, snapshot_iso=snapshot_iso, chunk_size=1, max_workers=workers)
+        rows = normalize_elements(data.get('elements', []))
+    meta = {
+        'input_address': address or '',
+        'center_lat': lat,
+        'center_lon': lon,
+        'utm_zone': utm_zone,
+        'bbox_wgs84': [south, west, north, east],
+        'tagset_hash': tagset_hash(filters),
+        'overpass_url': client.source,
+        'osm_base_ts': data.get('osm3s', {}).get('timestamp_osm_base'),
+    }
+    write_outputs(rows, outdir, meta, fmt, compression)
+    meta['id_list_sha256'] = id_list_hash(rows)
+    return rows, meta
 
 
 def poiextract_cmd(argv=None):
@@ -16,37 +116,139 @@ def poiextract_cmd(argv=None):
     p.add_argument('--lat', type=float)
     p.add_argument('--lon', type=float)
     p.add_argument('--tags', type=str, default='config/tags.yml')
-    p.add_argument('--overpass-url', type=str, default='https://overpass-api.de/api/interpreter')
+    _overpass_args(p)
     p.add_argument('--snapshot', type=str)
     p.add_argument('--outdir', type=str, default='out')
+    p.add_argument('--workers', type=int, default=2, help='Number of filter chunks fetched concurrently')
+    p.add_argument('--stream', action='store_true', help='Parse responses incrementally to bound memory (chunks run sequentially)')
+    _add_format_arg(p)
+    _add_cache_args(p)
     args = p.parse_args(argv)
+    _check_format_args(p, args)
 
     if args.address and (args.lat is None or args.lon is None):
         lat, lon = cached_geocode(args.address)
     else:
         lat, lon = args.lat, args.lon
 
-    south, west, north, east, utm_zone = bbox_wgs84_for_square_m(lat, lon, side_m=1000)
     filters = load_tag_filters(args.tags)
-    tag_hash = tagset_hash(filters)
-    client = OverpassClient(base_url=args.overpass_url)
-    query = client.build_query((south, west, north, east), filters, snapshot_iso=(args.snapshot + 'T00:00:00Z') if args.snapshot else None)
-    # Use chunked fetch to avoid Overpass OOM
-    south, west, north, east, _ = (south, west, north, east, utm_zone)
-    data = client.fetch_all_chunked((south, west, north, east), filters, snapshot_iso=(args.snapshot + 'T00:00:00Z') if args.snapshot else None, chunk_size=1)
-    elements = data.get('elements', [])
-    rows = normalize_elements(elements)
-    meta = {
-        'input_address': args.address or '',
-        'center_lat': lat,
-        'center_lon': lon,
-        'utm_zone': utm_zone,
-        'bbox_wgs84': [south, west, north, east],
-        'tagset_hash': tag_hash,
-        'overpass_url': args.overpass_url,
-        'osm_base_ts': data.get('osm3s', {}).get('timestamp_osm_base'),
-    }
-    write_outputs(rows, args.outdir, meta)
+    with _client_from_args(args) as client:
+        extract_site(client, lat, lon, filters, args.outdir, address=args.address,
+                     snapshot_iso=_snapshot_iso(args.snapshot), workers=args.workers, stream=args.stream, fmt=args.format, compression=args.compress)
+
+
+def site_slug(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or 'site'
+
+
+def load_manifest(path: str) -> List[Dict]:
+    """
+    Read a site manifest: a CSV with a header row, or a YAML list (optionally
+    under a top-level 'sites' key). Recognised fields are site, address,
+    lat, lon, snapshot and tags; a site needs an address or lat/lon.
+    Relative tags paths are resolved against the manifest's directory.
+    """
+    if path.endswith(('.yml', '.yaml')):
+        with open(path, 'r') as f:
+            doc = yaml.safe_load(f) or []
+        entries = doc.get('sites', []) if isinstance(doc, dict) else doc
+    else:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            entries = list(csv.DictReader(f))
+
+    sites = []
+    slugs = set()
+    for n, e in enumerate(entries):
+        e = {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in e.items() if k}
+        address = e.get('address') or ''
+        lat = float(e['lat']) if e.get('lat') not in (None, '') else None
+        lon = float(e['lon']) if e.get('lon') not in (None, '') else None
+        if not address and (lat is None or lon is None):
+            raise ValueError(f"Manifest entry {n} needs an address or lat/lon")
+        name = str(e.get('site') or address or f"{lat},{lon}")
+        slug = site_slug(name)
+        if slug in slugs:
+            slug = f"{slug}-{n}"
+        slugs.add(slug)
+        sites.append({
+            'site': name, 'slug': slug, 'address': address, 'lat': lat, 'lon': lon,
+            'snapshot': str(e['snapshot']) if e.get('snapshot') else None,
+            'tags': os.path.join(os.path.dirname(path), str(e['tags'])) if e.get('tags') else None,
+        })
+    return sites
+
+
+def run_batch(sites: List[Dict], client: ExtractBackend, outdir: str, tags: str = 'config/tags.yml',
+              max_workers: int = 4, chunk_workers: int = 1, fmt: str = 'csv', compression: Optional[str] = None) -> List[Dict]:
+    """
+    Extract every site with one shared client, up to max_workers sites at a
+    time. Addresses are batch geocoded and each site is queued as soon as
+    its coordinates resolve, so extraction overlaps rate-limited
+    geocoding. Each site is written to outdir/<slug>/ and all rows to
+    outdir/combined.csv in manifest order. Returns one summary dict per
+    site; failed sites carry an 'error' instead of rows.
+    """
+    filter_sets = {path: load_tag_filters(path) for path in {s['tags'] or tags for s in sites}}
+
+    def run_site(site):
+        if site['lat'] is None or site['lon'] is None:
+            raise ValueError(f"Could not geocode address: {site['address']}")
+        return extract_site(client, site['lat'], site['lon'], filter_sets[site['tags'] or tags],
+                            os.path.join(outdir, site['slug']), address=site['address'],
+                            snapshot_iso=_snapshot_iso(site['snapshot']), workers=chunk_workers, fmt=fmt, compression=compression)
+
+    results: List[Optional[Tuple[List[Dict], Dict]]] = [None] * len(sites)
+    summary = [{'site': s['site'], 'slug': s['slug']} for s in sites]
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as ex:
+        futures = {}
+        by_address: Dict[str, List[int]] = {}
+        for n, s in enumerate(sites):
+            if s['lat'] is None or s['lon'] is None:
+                by_address.setdefault(s['address'], []).append(n)
+            else:
+                futures[ex.submit(run_site, s)] = n
+        for address, (lat, lon) in iter_geocode(by_address):
+            for n in by_address[address]:
+                sites[n]['lat'], sites[n]['lon'] = lat, lon
+                futures[ex.submit(run_site, sites[n])] = n
+        for fut in as_completed(futures):
+            n = futures[fut]
+            try:
+                results[n] = fut.result()
+            except Exception as e:
+                print(f"Site {sites[n]['site']} failed: {e}")
+                summary[n]['error'] = str(e)
+
+    site_rows = []
+    for s, res, info in zip(sites, results, summary):
+        if res is None:
+            continue
+        rows, meta = res
+        info.update(rows=len(rows), id_list_sha256=meta['id_list_sha256'], osm_base_ts=meta['osm_base_ts'])
+        site_rows.append((s['site'], rows))
+    write_combined(site_rows, os.path.join(outdir, 'combined.csv'))
+    with open(os.path.join(outdir, 'batch.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def poiextract_batch_cmd(argv=None):
+    p = argparse.ArgumentParser(description='Run the 1x1 km extraction for every site in a manifest')
+    p.add_argument('--manifest', type=str, required=True, help='CSV or YAML with site, address, lat, lon and optional snapshot, tags')
+    p.add_argument('--tags', type=str, default='config/tags.yml', help='Default tags.yml for sites that do not set one')
+    _overpass_args(p)
+    p.add_argument('--outdir', type=str, default='out/batch')
+    p.add_argument('--site-workers', type=int, default=4, help='Number of sites extracted concurrently')
+    p.add_argument('--workers', type=int, default=1, help='Number of filter chunks fetched concurrently per site')
+    _add_format_arg(p)
+    _add_cache_args(p)
+    args = p.parse_args(argv)
+    _check_format_args(p, args)
+
+    sites = load_manifest(args.manifest)
+    with _client_from_args(args) as client:
+        summary = run_batch(sites, client, args.outdir, tags=args.tags, max_workers=args.site_workers, chunk_workers=args.workers, fmt=args.format, compression=args.compress)
+    print(json.dumps(summary, indent=2))
 
 
 def poiextract_repro_cmd(argv=None):
@@ -58,12 +260,13 @@ def poiextract_repro_cmd(argv=None):
     p.add_argument('--runs', type=int, default=5)
     p.add_argument('--snapshot', type=str)
     p.add_argument('--outdir', type=str, default='logs/repro')
+    _add_cache_args(p)
     args = p.parse_args(argv)
     if args.address and (args.lat is None or args.lon is None):
         lat, lon = cached_geocode(args.address)
     else:
         lat, lon = args.lat, args.lon
-    run_repro(args.address, lat, lon, args.tags, runs=args.runs, snapshot_iso=(args.snapshot + 'T00:00:00Z') if args.snapshot else None, out_dir=args.outdir)
+    run_repro(args.address, lat, lon, args.tags, runs=args.runs, snapshot_iso=_snapshot_iso(args.snapshot), out_dir=args.outdir, cache=_cache_from_args(args))
     d = sorted(glob.glob(args.outdir + '/*'))[-1]
     print(json.dumps(compare_runs(d), indent=2))
 
@@ -75,3 +278,85 @@ def poiextract_compare_cmd(argv=None):
     print(json.dumps(compare_runs(args.dir), indent=2))
 
 
+def poiextract_index_cmd(argv=None):
+    p = argparse.ArgumentParser(description='Build a spatial index of the POIs in a local OSM extract')
+    p.add_argument('--osm-file', type=str, required=True, help='.osm/.osm.pbf extract to index')
+    p.add_argument('--tags', type=str, default='config/tags.yml', help='Only elements matching these filters are indexed')
+    p.add_argument('--index-dir', type=str, required=True)
+    p.add_argument('--cell-deg', type=float, default=0.01, help='Index cell size in degrees')
+    p.add_argument('--detailed', action='store_true',
+                   help="Also index the keys main.py's individual and grid analyses query (building, landuse, ...)")
+    args = p.parse_args(argv)
+
+    filters = load_tag_filters(args.tags) + (DETAILED_FILTERS if args.detailed else [])
+    backend = LocalOSMBackend(args.osm_file)
+    elements = backend.iter_bbox((-90.0, -180.0, 90.0, 180.0), filters, bounds=True)
+    index = SpatialIndex.build(elements, args.index_dir, cell_deg=args.cell_deg, osm3s=backend.osm3s(), filters=filters)
+    print(f"Indexed {len(index)} elements into {args.index_dir}")
+
+
+def poiextract_refresh_cmd(argv=None):
+    p = argparse.ArgumentParser(description='Update earlier extractions with only the OSM changes since their osm_base_ts')
+    p.add_argument('--outdir', type=str, nargs='+', required=True, help='Output directories of earlier extractions, in any --format')
+    p.add_argument('--tags', type=str, default='config/tags.yml', help='Must be the tags the outputs were extracted with')
+    p.add_argument('--overpass-url', type=str, nargs='+', default=['https://overpass-api.de/api/interpreter'], help='Overpass endpoint; extra URLs are used as mirrors')
+    p.add_argument('--hedge', action='store_true', help='Send a duplicate query to the next mirror when the first exceeds its p95 latency')
+    _add_cache_args(p)
+    args = p.parse_args(argv)
+
+    filters = load_tag_filters(args.tags)
+    with OverpassClient(base_url=args.overpass_url[0], mirrors=args.overpass_url[1:], hedge=args.hedge, cache=_cache_from_args(args)) as client:
+        summary = refresh_sites(client, args.outdir, filters)
+    print(json.dumps(summary, indent=2))
+
+
+def poiextract_replay_cmd(argv=None):
+    p = argparse.ArgumentParser(description='Serve recorded or synthetic Overpass responses locally, with injected latency and errors')
+    p.add_argument('--port', type=int, default=8080)
+    p.add_argument('--cache-dir', type=str, default=None, help='Overpass response cache to replay')
+    p.add_argument('--recorded-endpoint', type=str, default=DEFAULT_RECORDED_ENDPOINT, help='Endpoint the cache was filled from')
+    p.add_argument('--synth', type=int, default=0, help='Answer other queries from this many synthetic elements')
+    p.add_argument('--synth-bbox', type=float, nargs=4, default=[0.0, 0.0, 1.0, 1.0], metavar=('S', 'W', 'N', 'E'))
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--latency', type=float, default=0.0, help='Seconds added to every answer')
+    p.add_argument('--jitter', type=float, default=0.0, help='Extra uniform random latency up to this many seconds')
+    p.add_argument('--error-rate', type=float, default=0.0, help='Share of queries answered with 429 or 504')
+    p.add_argument('--truncate-rate', type=float, default=0.0, help='Share of queries answered with a truncation remark')
+    p.add_argument('--retry-after', type=float, default=None, help='Retry-After seconds sent with busy responses')
+    p.add_argument('--max-elements', type=int, default=None, help='Truncate larger results like an out-of-memory query')
+    p.add_argument('--rate-limit', type=int, default=0, help='Concurrent query slots reported on /api/status; 0 for none')
+    args = p.parse_args(argv)
+
+    server = ReplayServer(cache_dir=args.cache_dir, recorded_endpoint=args.recorded_endpoint, synth_elements=args.synth,
+                          synth_bbox=tuple(args.synth_bbox), seed=args.seed, latency_s=args.latency, jitter_s=args.jitter,
+                          error_rate=args.error_rate, truncate_rate=args.truncate_rate, retry_after_s=args.retry_after,
+                          max_elements=args.max_elements, rate_limit=args.rate_limit, port=args.port)
+    print(f"Replaying Overpass at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+COMMANDS = {
+    'extract': poiextract_cmd,
+    'batch': poiextract_batch_cmd,
+    'index': poiextract_index_cmd,
+    'refresh': poiextract_refresh_cmd,
+    'replay': poiextract_replay_cmd,
+    'repro': poiextract_repro_cmd,
+    'compare': poiextract_compare_cmd,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(f"usage: python -m src.cli {{{','.join(COMMANDS)}}} [options]")
+        return 2
+    COMMANDS[argv[0]](argv[1:])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
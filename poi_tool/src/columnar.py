@@ -0,0 +1,176 @@
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .normalize import TYPE_ORDER, _extract_coords
+
+TYPE_NAMES = tuple(sorted(TYPE_ORDER, key=TYPE_ORDER.get))
+
+
+class ElementTable:
+    """
+    Columnar form of normalize_elements output.
+
+    Rows are held as typed arrays (type code, id, lat, lon) plus an index
+    into one interned string table for the name. Tags are stored flat:
+    tag_keys/tag_values index the same string table and row i owns
+    entries tag_offsets[i]:tag_offsets[i + 1], in the element's own order.
+    Rows are deduplicated by (type, id), last one wins, and sorted by
+    (type, id) exactly like normalize_elements.
+    """
+
+    def __init__(self, type_code: np.ndarray, ids: np.ndarray, lat: np.ndarray, lon: np.ndarray,
+                 name_idx: np.ndarray, tag_offsets: np.ndarray, tag_keys: np.ndarray,
+                 tag_values: np.ndarray, strings: List[str]):
+        self.type_code = type_code
+        self.ids = ids
+        self.lat = lat
+        self.lon = lon
+        self.name_idx = name_idx
+        self.tag_offsets = tag_offsets
+        self.tag_keys = tag_keys
+        self.tag_values = tag_values
+        self.strings = strings
+
+    @classmethod
+    def from_elements(cls, elements: Iterable[Dict]) -> "ElementTable":
+        """Build from Overpass elements; elements may be a lazy iterator."""
+        strings: List[str] = []
+        interned: Dict[str, int] = {}
+
+        def intern(s: str) -> int:
+            i = interned.get(s)
+            if i is None:
+                i = interned[s] = len(strings)
+                strings.append(s)
+            return i
+
+        type_code, ids = array('b'), array('q')
+        lat, lon = array('d'), array('d')
+        name_idx = array('i')
+        tag_offsets, tag_keys, tag_values = array('q', [0]), array('i'), array('i')
+        last: Dict[tuple, int] = {}
+        na = intern('N/A')
+        for el in elements:
+            etype = el.get('type')
+            eid = el.get('id')
+            code = TYPE_ORDER.get(etype)
+            if code is None or eid is None:
+                continue
+            x, y = _extract_coords(el)
+            tags = el.get('tags', {}) or {}
+            last[(code, int(eid))] = len(ids)
+            type_code.append(code)
+            ids.append(int(eid))
+            lat.append(y)
+            lon.append(x)
+            name = tags.get('name')
+            name_idx.append(na if name is None else intern(name))
+            for k, v in tags.items():
+                tag_keys.append(intern(k))
+                tag_values.append(intern(v))
+            tag_offsets.append(len(tag_keys))
+
+        type_code = np.frombuffer(type_code, dtype=np.int8)
+        ids = np.frombuffer(ids, dtype=np.int64)
+        offsets = np.frombuffer(tag_offsets, dtype=np.int64)
+        live = np.fromiter(last.values(), dtype=np.int64, count=len(last))
+        order = live[np.lexsort((ids[live], type_code[live]))]
+
+        # Gather each kept row's tag run into the new row order
+        counts = np.diff(offsets)[order]
+        new_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(counts, out=new_offsets[1:])
+        gather = np.repeat(offsets[:-1][order] - new_offsets[:-1], counts) + np.arange(new_offsets[-1])
+        return cls(
+            type_code[order], ids[order],
+            np.frombuffer(lat, dtype=np.float64)[order], np.frombuffer(lon, dtype=np.float64)[order],
+            np.frombuffer(name_idx, dtype=np.int32)[order], new_offsets,
+            np.frombuffer(tag_keys, dtype=np.int32)[gather], np.frombuffer(tag_values, dtype=np.int32)[gather],
+            strings,
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict]) -> "ElementTable":
+        """Build from normalize_elements row dicts."""
+        return cls.from_elements(
+            {'type': r['type'], 'id': r['id'], 'lat': r['lat'], 'lon': r['lon'],
+             'center': {'lat': r['lat'], 'lon': r['lon']}, 'tags': r.get('tags') or {}}
+            for r in rows
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the arrays and the string table."""
+        arrays = (self.type_code, self.ids, self.lat, self.lon, self.name_idx,
+                  self.tag_offsets, self.tag_keys, self.tag_values)
+        return sum(a.nbytes for a in arrays) + sum(len(s) + 49 for s in self.strings)
+
+    def types(self) -> np.ndarray:
+        return np.array(TYPE_NAMES, dtype=object)[self.type_code]
+
+    def names(self) -> np.ndarray:
+        return np.array(self.strings, dtype=object)[self.name_idx]
+
+    def tags(self, i: int) -> Dict[str, str]:
+        lo, hi = self.tag_offsets[i], self.tag_offsets[i + 1]
+        s = self.strings
+        return {s[k]: s[v] for k, v in zip(self.tag_keys[lo:hi].tolist(), self.tag_values[lo:hi].tolist())}
+
+    def to_rows(self) -> List[Dict]:
+        """The list of row dicts normalize_elements would return."""
+        s = self.strings
+        keys = [s[k] for k in self.tag_keys.tolist()]
+        values = [s[v] for v in self.tag_values.tolist()]
+        offsets = self.tag_offsets.tolist()
+        rows = []
+        for i, (t, eid, y, x, n) in enumerate(zip(self.type_code.tolist(), self.ids.tolist(), self.lat.tolist(),
+                                                  self.lon.tolist(), self.name_idx.tolist())):
+            lo, hi = offsets[i], offsets[i + 1]
+            rows.append({
+                'type': TYPE_NAMES[t],
+                'id': eid,
+                'lat': y,
+                'lon': x,
+                'name': s[n],
+                'tags': dict(zip(keys[lo:hi], values[lo:hi])),
+            })
+        return rows
+
+    def to_pandas(self, include_tags: bool = False) -> pd.DataFrame:
+        df = pd.DataFrame({
+            'type': pd.Categorical.from_codes(self.type_code, categories=list(TYPE_NAMES)),
+            'id': self.ids,
+            'lat': self.lat,
+            'lon': self.lon,
+            'name': self.names(),
+        })
+        if include_tags:
+            df['tags'] = [self.tags(i) for i in range(len(self))]
+        return df
+
+    def to_arrow(self, metadata: Optional[Dict[str, str]] = None):
+        """pyarrow.Table with tags as a map<string, string> column. Requires pyarrow."""
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("to_arrow requires pyarrow (pip install pyarrow)") from e
+        strings = np.array(self.strings, dtype=object)
+        tags = pa.MapArray.from_arrays(
+            pa.array(self.tag_offsets, type=pa.int32()),
+            pa.array(strings[self.tag_keys], type=pa.string()),
+            pa.array(strings[self.tag_values], type=pa.string()),
+        )
+        return pa.table({
+            'type': pa.DictionaryArray.from_arrays(pa.array(self.type_code, type=pa.int8()), pa.array(TYPE_NAMES)),
+            'id': pa.array(self.ids, type=pa.int64()),
+            'lat': pa.array(self.lat, type=pa.float64()),
+            'lon': pa.array(self.lon, type=pa.float64()),
+            'name': pa.array(strings[self.name_idx], type=pa.string()),
+            'tags': tags,
+        }, metadata=metadata)
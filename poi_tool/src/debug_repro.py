@@ -6,6 +6,7 @@ from typing import Optional, List, Dict
 
 from .geometry import bbox_wgs84_for_square_m
 from .overpass_client import OverpassClient
+from .overpass_cache import OverpassCache
 from .tags import load_tag_filters, tagset_hash
 
 
@@ -13,7 +14,7 @@ def ensure_dir(p: str):
     os.makedirs(p, exist_ok=True)
 
 
-def run_repro(address: Optional[str], lat: Optional[float], lon: Optional[float], tags_path: str, runs: int = 5, snapshot_iso: Optional[str] = None, out_dir: str = "logs/repro"):
+def run_repro(address: Optional[str], lat: Optional[float], lon: Optional[float], tags_path: str, runs: int = 5, snapshot_iso: Optional[str] = None, out_dir: str = "logs/repro", cache: Optional[OverpassCache] = None):
     ts = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
     run_dir = os.path.join(out_dir, ts)
     ensure_dir(run_dir)
@@ -28,24 +29,27 @@ def run_repro(address: Optional[str], lat: Optional[float], lon: Optional[float]
     filters = load_tag_filters(tags_path)
     tag_hash = tagset_hash(filters)
 
-    client = OverpassClient()
+    # Only snapshot-pinned runs may be served from cache; a live run that
+    # replays a cached response would trivially report itself as stable.
+    client = OverpassClient(cache=cache if snapshot_iso else None)
     query = client.build_query((south, west, north, east), filters, snapshot_iso=snapshot_iso)
 
-    for i in range(runs):
-        data = client.fetch(query)
-        elements = data.get('elements', [])
-        id_hash = client.elements_id_hash(elements)
-        rec = {
-            'run': i,
-            'bbox': [south, west, north, east],
-            'utm_zone': utm_zone,
-            'overpass_url': client.base_url,
-            'osm_base_ts': data.get('osm3s', {}).get('timestamp_osm_base'),
-            'elements_count': len(elements),
-            'id_hash': id_hash,
-        }
-        with open(os.path.join(run_dir, f'run_{i}.json'), 'w') as f:
-            json.dump(rec, f, indent=2)
+    with client:
+        for i in range(runs):
+            data = client.fetch(query)
+            elements = data.get('elements', [])
+            id_hash = client.elements_id_hash(elements)
+            rec = {
+                'run': i,
+                'bbox': [south, west, north, east],
+                'utm_zone': utm_zone,
+                'overpass_url': client.base_url,
+                'osm_base_ts': data.get('osm3s', {}).get('timestamp_osm_base'),
+                'elements_count': len(elements),
+                'id_hash': id_hash,
+            }
+            with open(os.path.join(run_dir, f'run_{i}.json'), 'w') as f:
+                json.dump(rec, f, indent=2)
 
 
 def compare_runs(run_dir: str) -> Dict:
@@ -0,0 +1,98 @@
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+
+def _parse_ts(ts: Optional[str]) -> Optional[float]:
+    if not ts:
+        return None
+    try:
+        return datetime.strptime(ts, '%Y-%m-%dT%H:%M:%SZ').timestamp()
+    except ValueError:
+        return None
+
+
+class EndpointStats:
+    def __init__(self, window: int):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.osm_base_ts: Optional[str] = None
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for ok in self.outcomes if not ok) / len(self.outcomes)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        lat = sorted(self.latencies)
+        return lat[min(int(q * len(lat)), len(lat) - 1)]
+
+
+class EndpointPool:
+    """
+    Health tracking for a list of Overpass mirrors.
+
+    Records per-endpoint latency, recent error rate and snapshot freshness
+    (osm3s.timestamp_osm_base) over a sliding window of window requests.
+    ranked() orders endpoints healthiest first: mirrors whose data is more
+    than stale_after_s behind the freshest mirror go last, the rest are
+    ordered by median latency inflated by error rate. Endpoints with no
+    history rank first so every mirror gets measured, endpoints that have
+    only failed rank last; ties keep the configured order.
+    """
+
+    def __init__(self, endpoints: List[str], window: int = 50, stale_after_s: float = 3600.0, error_weight: float = 4.0):
+        if not endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        self.endpoints = list(dict.fromkeys(endpoints))
+        self.stale_after_s = stale_after_s
+        self.error_weight = error_weight
+        self._lock = threading.Lock()
+        self._stats: Dict[str, EndpointStats] = {e: EndpointStats(window) for e in self.endpoints}
+
+    def record_success(self, endpoint: str, latency_s: float, osm_base_ts: Optional[str] = None) -> None:
+        with self._lock:
+            st = self._stats[endpoint]
+            st.latencies.append(latency_s)
+            st.outcomes.append(True)
+            if osm_base_ts:
+                st.osm_base_ts = osm_base_ts
+
+    def record_error(self, endpoint: str) -> None:
+        with self._lock:
+            self._stats[endpoint].outcomes.append(False)
+
+    def p95(self, endpoint: str) -> Optional[float]:
+        with self._lock:
+            return self._stats[endpoint].quantile(0.95)
+
+    def ranked(self) -> List[str]:
+        with self._lock:
+            stamps = {e: _parse_ts(st.osm_base_ts) for e, st in self._stats.items()}
+            freshest = max((t for t in stamps.values() if t is not None), default=None)
+
+            def score(e: str):
+                st = self._stats[e]
+                stale = freshest is not None and stamps[e] is not None and freshest - stamps[e] > self.stale_after_s
+                median = st.quantile(0.5)
+                if median is None:
+                    return (stale, float('inf') if st.outcomes else 0.0)
+                return (stale, median * (1.0 + self.error_weight * st.error_rate()))
+
+            return sorted(self.endpoints, key=score)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Per-endpoint health summary, for logging."""
+        with self._lock:
+            return {
+                e: {
+                    'p50_s': st.quantile(0.5),
+                    'p95_s': st.quantile(0.95),
+                    'error_rate': st.error_rate(),
+                    'osm_base_ts': st.osm_base_ts,
+                }
+                for e, st in self._stats.items()
+            }
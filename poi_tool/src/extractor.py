@@ -1,32 +1,61 @@
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
 import numpy as np
-from geopy.geocoders import Nominatim
 from geopy.distance import geodesic
 
+from .overpass_cache import OverpassCache
+from .overpass_client import OverpassClient
+from .geometry import distances_km
+from .classify import load_category_rules
+from .geocode import cached_geocode
+
+_overpass_client = None
+# Guards the lazy module globals; grid cells resolve them from worker threads
+_init_lock = threading.Lock()
+
+
+def set_overpass_client(client):
+    """
+    Set the backend shared by every query in this module: an OverpassClient,
+    so all POI and grid requests reuse one pooled session and response
+    cache, or any other ExtractBackend such as LocalOSMBackend.
+    """
+    global _overpass_client
+    _overpass_client = client
+
+
+def get_overpass_client():
+    global _overpass_client
+    if _overpass_client is None:
+        with _init_lock:
+            if _overpass_client is None:
+                _overpass_client = OverpassClient(cache=OverpassCache())
+    return _overpass_client
+
+
 def geocode_address(address):
     """
     Geocodes an address to latitude and longitude.
+    Results are served from the persistent geocode cache when possible.
     """
     try:
-        geolocator = Nominatim(user_agent="poi_tool", timeout=10)
-        location = geolocator.geocode(address)
-        if location:
-            return location.latitude, location.longitude
-        else:
-            return None, None
+        return cached_geocode(address)
     except Exception as e:
         print(f"Error geocoding address: {e}")
         return None, None
 
-def get_pois(latitude, longitude, distance_km=0.5):
+def get_pois(latitude, longitude, distance_km=0.5, distance_mode="geodesic"):
     """
     Fetch POIs using the Overpass API within a square bounding box
     centered at (latitude, longitude) and extending distance_km in each
     cardinal direction.
 
     Returns a pandas DataFrame with columns: name, category, latitude,
-    longitude, distance_from_center_km.
+    longitude, distance_from_center_km. distance_mode is 'geodesic'
+    (WGS84) or 'haversine' (spherical, within 0.6%).
     """
     # Compute bounding box (south, west, north, east)
     north = geodesic(kilometers=distance_km).destination((latitude, longitude), 0).latitude
@@ -39,32 +68,11 @@ def get_pois(latitude, longitude, distance_km=0.5):
     # Define categories of interest
     categories = ["amenity", "shop", "leisure", "tourism", "historic"]
 
-    # Build Overpass QL query. Use out center to get centroids for ways/relations
-    bbox_str = f"{south_west_north_east[0]},{south_west_north_east[1]},{south_west_north_east[2]},{south_west_north_east[3]}"
-    selectors = []
-    for key in categories:
-        selectors.append(f"node[\"{key}\"]({bbox_str});")
-        selectors.append(f"way[\"{key}\"]({bbox_str});")
-        selectors.append(f"relation[\"{key}\"]({bbox_str});")
-    union = "\n  ".join(selectors)
-
-    overpass_query = f"""
-    [out:json][timeout:30];
-    (
-      {union}
-    );
-    out center tags;
-    """.strip()
+    # One nwr statement per key; out center gives centroids for ways/relations
+    filters = [f'["{key}"]' for key in categories]
 
     try:
-        response = requests.post(
-            "https://overpass-api.de/api/interpreter",
-            data={"data": overpass_query},
-            headers={"User-Agent": "poi_tool/1.0 (contact: example@example.com)"},
-            timeout=60,
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = get_overpass_client().fetch_bbox(south_west_north_east, filters)
 
         elements = data.get("elements", [])
         if not elements:
@@ -94,295 +102,350 @@ def get_pois(latitude, longitude, distance_km=0.5):
                     break
 
             name = tags.get("name", "N/A")
-            dist_km = geodesic((latitude, longitude), (poi_lat, poi_lon)).km
 
             results.append({
                 "name": name,
                 "category": category,
                 "latitude": poi_lat,
                 "longitude": poi_lon,
-                "distance_from_center_km": dist_km,
             })
 
-        return pd.DataFrame(results)
+        return _with_distances(pd.DataFrame(results), latitude, longitude, distance_mode)
     except Exception as e:
         print(f"An error occurred while fetching POIs: {e}")
         return pd.DataFrame()
 
 
-def get_pois_with_detailed_categories(latitude, longitude, distance_km=0.5):
+def get_pois_with_detailed_categories(latitude, longitude, distance_km=0.5, distance_mode="geodesic"):
     """
     Fetch POIs using the Overpass API with detailed category mapping.
     Returns a pandas DataFrame with specific category assignments.
     """
-    # Compute bounding box (south, west, north, east)
+    try:
+        return _query_detailed_pois(_bbox_around(latitude, longitude, distance_km), latitude, longitude, distance_mode)
+    except Exception as e:
+        print(f"An error occurred while fetching POIs: {e}")
+        return pd.DataFrame()
+
+
+def _bbox_around(latitude, longitude, distance_km):
+    """(south, west, north, east) extending distance_km in each cardinal direction."""
     north = geodesic(kilometers=distance_km).destination((latitude, longitude), 0).latitude
     south = geodesic(kilometers=distance_km).destination((latitude, longitude), 180).latitude
     east = geodesic(kilometers=distance_km).destination((latitude, longitude), 90).longitude
     west = geodesic(kilometers=distance_km).destination((latitude, longitude), 270).longitude
+    return south, west, north, east
 
-    south_west_north_east = (south, west, north, east)
 
-    # Define comprehensive categories and their OSM mappings
-    category_mappings = {
-        "amenity": ["amenity"],
-        "historic": ["historic"],
-        "leisure": ["leisure"],
-        "shop": ["shop"],
-        "tourism": ["tourism"],
-        "public_transport": ["public_transport", "route"],
-        "highway": ["highway"],  # For bus stops, etc.
-        "building": ["building"],  # For housing data
-        "landuse": ["landuse"]  # For residential areas
-    }
-
-    # Build Overpass QL query
-    bbox_str = f"{south_west_north_east[0]},{south_west_north_east[1]},{south_west_north_east[2]},{south_west_north_east[3]}"
-    selectors = []
-    for key_list in category_mappings.values():
-        for key in key_list:
-            selectors.append(f"node[\"{key}\"]({bbox_str});")
-            selectors.append(f"way[\"{key}\"]({bbox_str});")
-            selectors.append(f"relation[\"{key}\"]({bbox_str});")
-    union = "\n  ".join(selectors)
-
-    overpass_query = f"""
-    [out:json][timeout:30];
-    (
-      {union}
-    );
-    out center tags;
-    """.strip()
+# Define comprehensive categories and their OSM mappings
+CATEGORY_MAPPINGS = {
+    "amenity": ["amenity"],
+    "historic": ["historic"],
+    "leisure": ["leisure"],
+    "shop": ["shop"],
+    "tourism": ["tourism"],
+    "public_transport": ["public_transport", "route"],
+    "highway": ["highway"],  # For bus stops, etc.
+    "building": ["building"],  # For housing data
+    "landuse": ["landuse"]  # For residential areas
+}
 
-    try:
-        response = requests.post(
-            "https://overpass-api.de/api/interpreter",
-            data={"data": overpass_query},
-            headers={"User-Agent": "poi_tool/1.0 (contact: example@example.com)"},
-            timeout=60,
-        )
-        response.raise_for_status()
-        data = response.json()
+# Filters fetched for detailed categories and grid analysis
+DETAILED_FILTERS = [f"[\"{key}\"]" for key_list in CATEGORY_MAPPINGS.values() for key in key_list]
 
-        elements = data.get("elements", [])
-        if not elements:
-            return pd.DataFrame()
 
-        results = []
-        for el in elements:
-            tags = el.get("tags", {})
+def _query_detailed_pois(south_west_north_east, latitude, longitude, distance_mode="geodesic"):
+    """
+    Run the detailed-category Overpass query for a (south, west, north, east)
+    bbox. Distances are measured from (latitude, longitude). Large areas are
+    split into quadrants by the client when Overpass truncates. Raises on
+    network or HTTP errors.
+    """
+    data = get_overpass_client().fetch_bbox(tuple(south_west_north_east), DETAILED_FILTERS, max_workers=2)
 
-            # Determine coordinates for node vs way/relation
-            if el.get("type") == "node":
-                poi_lat = el.get("lat")
-                poi_lon = el.get("lon")
-            else:
-                center = el.get("center") or {}
-                poi_lat = center.get("lat")
-                poi_lon = center.get("lon")
+    elements = data.get("elements", [])
+    if not elements:
+        return pd.DataFrame()
 
-            if poi_lat is None or poi_lon is None:
-                continue
+    located = []
+    tag_column = []
+    for el in elements:
+        tags = el.get("tags", {})
 
-            # Map to detailed categories
-            detailed_category = map_to_detailed_category(tags)
-            if detailed_category == "other":
-                continue  # Skip items that don't fit our categories
+        # Determine coordinates for node vs way/relation
+        if el.get("type") == "node":
+            poi_lat = el.get("lat")
+            poi_lon = el.get("lon")
+        else:
+            center = el.get("center") or {}
+            poi_lat = center.get("lat")
+            poi_lon = center.get("lon")
+
+        if poi_lat is None or poi_lon is None:
+            continue
+        located.append((tags.get("name", "N/A"), poi_lat, poi_lon))
+        tag_column.append(tags)
+
+    # Map to detailed categories in one batch
+    categories = _category_classifier().classify_many(tag_column)
+
+    results = []
+    for (name, poi_lat, poi_lon), detailed_category in zip(located, categories):
+        if detailed_category == "other":
+            continue  # Skip items that don't fit our categories
+        results.append({
+            "name": name,
+            "category": detailed_category,
+            "latitude": poi_lat,
+            "longitude": poi_lon,
+        })
+
+    return _with_distances(pd.DataFrame(results), latitude, longitude, distance_mode)
+
+
+def _with_distances(pois_df, latitude, longitude, distance_mode):
+    """Add distance_from_center_km for all rows in one vectorized call."""
+    if pois_df.empty:
+        return pois_df
+    pois_df["distance_from_center_km"] = distances_km(
+        latitude, longitude, pois_df["latitude"].to_numpy(float), pois_df["longitude"].to_numpy(float), distance_mode
+    )
+    return pois_df
 
-            name = tags.get("name", "N/A")
-            dist_km = geodesic((latitude, longitude), (poi_lat, poi_lon)).km
 
-            results.append({
-                "name": name,
-                "category": detailed_category,
-                "latitude": poi_lat,
-                "longitude": poi_lon,
-                "distance_from_center_km": dist_km,
-            })
+def map_to_detailed_category(tags):
+    """
+    Map OSM tags to detailed categories based on the requirements.
+    The rules live in config/categories.yml (first match wins).
+    """
+    return _category_classifier().classify(tags)
+
+
+_classifier = None
+
+
+def _category_classifier():
+    global _classifier
+    if _classifier is None:
+        with _init_lock:
+            if _classifier is None:
+                _classifier = load_category_rules()
+    return _classifier
 
-        return pd.DataFrame(results)
+
+GRID_CATEGORIES = [
+    "Public Schools", "Public Transit Lines", "Parks and Recreational Areas",
+    "Community Services", "Cafés", "Bars", "Libraries",
+    "Single-Family Houses", "Residential Buildings", "Detached Houses",
+    "Semi-Detached Houses", "Terraced Houses", "Residential Areas", "Housing Facilities",
+    "amenity", "historic", "leisure", "shop", "tourism", "landuse"
+]
+
+KM_PER_DEGREE = 111.0  # Approximate km per degree used to lay out the grid
+
+
+def _grid_cells(latitude, longitude, grid_size_km, search_radius_km, distance_mode="geodesic"):
+    """
+    Return the grid cells inside the search radius as a list of
+    (i, j, grid_center_lat, grid_center_lon, distance_from_center_km),
+    ordered by i then j.
+    """
+    # Calculate the number of grid cells in each direction
+    half_grids = int(np.ceil(search_radius_km / grid_size_km))
+    steps = np.arange(-half_grids, half_grids + 1)
+    ii, jj = np.meshgrid(steps, steps, indexing='ij')
+    ii, jj = ii.ravel(), jj.ravel()
+
+    # Calculate grid cell centers
+    center_lats = latitude + (ii * grid_size_km / KM_PER_DEGREE)
+    center_lons = longitude + (jj * grid_size_km / (KM_PER_DEGREE * np.cos(np.radians(latitude))))
+
+    # Skip cells outside search radius
+    dists = distances_km(latitude, longitude, center_lats, center_lons, distance_mode)
+    inside = dists <= search_radius_km
+    return [
+        (int(i), int(j), float(clat), float(clon), float(d))
+        for i, j, clat, clon, d in zip(ii[inside], jj[inside], center_lats[inside], center_lons[inside], dists[inside])
+    ]
+
+
+def _bin_to_grid(poi_lats, poi_lons, latitude, longitude, grid_size_km):
+    """
+    Assign POIs to grid cells with vectorized floor-division on the grid's
+    local km projection. Cell (i, j) covers the half-open interval
+    [i - 0.5, i + 0.5) x [j - 0.5, j + 0.5) in grid units, so every POI lands
+    in exactly one cell. Returns integer arrays (i, j).
+    """
+    km_per_deg_lon = KM_PER_DEGREE * np.cos(np.radians(latitude))
+    y_km = (np.asarray(poi_lats, dtype=float) - latitude) * KM_PER_DEGREE
+    x_km = (np.asarray(poi_lons, dtype=float) - longitude) * km_per_deg_lon
+    i = np.floor(y_km / grid_size_km + 0.5).astype(np.int64)
+    j = np.floor(x_km / grid_size_km + 0.5).astype(np.int64)
+    return i, j
+
+
+def _grid_pois_single_fetch(cells, latitude, longitude, grid_size_km, search_radius_km, distance_mode="geodesic"):
+    """
+    Fetch the bbox enclosing every grid cell in one Overpass query and bin
+    the POIs locally. Returns {(i, j): DataFrame} for non-empty cells.
+    """
+    if not cells:
+        return {}
+
+    # Outer edge of the outermost cells in the grid's own projection
+    half_grids = int(np.ceil(search_radius_km / grid_size_km))
+    extent_km = (half_grids + 0.5) * grid_size_km
+    dlat = extent_km / KM_PER_DEGREE
+    dlon = extent_km / (KM_PER_DEGREE * np.cos(np.radians(latitude)))
+    bbox = (latitude - dlat, longitude - dlon, latitude + dlat, longitude + dlon)
+
+    try:
+        pois_df = _query_detailed_pois(bbox, latitude, longitude, distance_mode)
     except Exception as e:
         print(f"An error occurred while fetching POIs: {e}")
-        return pd.DataFrame()
+        return {}
+    if pois_df.empty:
+        return {}
 
+    cell_i, cell_j = _bin_to_grid(pois_df['latitude'], pois_df['longitude'], latitude, longitude, grid_size_km)
+    pois_df = pois_df.assign(_i=cell_i, _j=cell_j)
 
-def map_to_detailed_category(tags):
+    grid_pois = {}
+    for (i, j), cell_df in pois_df.groupby(['_i', '_j'], sort=False):
+        grid_pois[(int(i), int(j))] = cell_df.drop(columns=['_i', '_j']).reset_index(drop=True)
+    return grid_pois
+
+
+def _grid_pois_per_cell(cells, grid_size_km, distance_mode="geodesic", max_workers=1, checkpoint=None):
     """
-    Map OSM tags to detailed categories based on the requirements.
+    Query Overpass once per grid cell on up to max_workers threads; the
+    shared client's slot scheduler keeps them within the server's rate
+    limit. Cells are collected as they finish. Returns
+    ({(i, j): DataFrame} for non-empty cells, {grid_id: seconds}).
+    Failed cells are reported and left out.
+
+    With a GridCheckpoint, cells already recorded in it are not queried
+    again and every newly finished cell is appended to it.
     """
-    # Public Schools
-    if tags.get("amenity") == "school" and tags.get("school:type") in ["public", "state"]:
-        return "Public Schools"
-    if tags.get("amenity") == "school" and not tags.get("school:type") in ["private", "religious"]:
-        return "Public Schools"
-    
-    # Public Transit Lines
-    if tags.get("public_transport") in ["station", "stop_position", "platform"]:
-        return "Public Transit Lines"
-    if tags.get("route") in ["subway", "bus", "tram", "light_rail"]:
-        return "Public Transit Lines"
-    if tags.get("highway") == "bus_stop":
-        return "Public Transit Lines"
-    
-    # Parks and Recreational Areas
-    if tags.get("leisure") in ["park", "recreation_ground", "playground", "garden"]:
-        return "Parks and Recreational Areas"
-    if tags.get("landuse") == "recreation_ground":
-        return "Parks and Recreational Areas"
-    
-    # Community Services (Centers)
-    if tags.get("amenity") in ["community_centre", "social_facility", "civic"]:
-        return "Community Services"
-    if tags.get("office") == "ngo":
-        return "Community Services"
-    
-    # Cafés
-    if tags.get("amenity") in ["cafe", "coffee_shop"]:
-        return "Cafés"
-    if tags.get("shop") == "coffee":
-        return "Cafés"
-    
-    # Bars
-    if tags.get("amenity") in ["bar", "pub", "nightclub"]:
-        return "Bars"
-    if tags.get("shop") == "alcohol":
-        return "Bars"
-    
-    # Libraries
-    if tags.get("amenity") == "library":
-        return "Libraries"
-    
-    # Housing Categories
-    if tags.get("building") == "house":
-        return "Single-Family Houses"
-    if tags.get("building") in ["apartments", "residential"]:
-        return "Residential Buildings"
-    if tags.get("building") == "detached":
-        return "Detached Houses"
-    if tags.get("building") == "semi_detached":
-        return "Semi-Detached Houses"
-    if tags.get("building") == "terrace":
-        return "Terraced Houses"
-    if tags.get("landuse") == "residential":
-        return "Residential Areas"
-    if tags.get("amenity") == "housing":
-        return "Housing Facilities"
-    
-    # Original categories (keep for backward compatibility)
-    if tags.get("amenity"):
-        return "amenity"
-    if tags.get("historic"):
-        return "historic"
-    if tags.get("leisure"):
-        return "leisure"
-    if tags.get("shop"):
-        return "shop"
-    if tags.get("tourism"):
-        return "tourism"
-    if tags.get("landuse"):
-        return "landuse"
-    
-    return "other"
-
-
-def create_grid_analysis(latitude, longitude, grid_size_km=0.5, search_radius_km=5.0):
+    def run_cell(cell):
+        i, j, grid_center_lat, grid_center_lon, _ = cell
+        t0 = time.monotonic()
+        bbox = _bbox_around(grid_center_lat, grid_center_lon, grid_size_km/2)
+        pois_df = _query_detailed_pois(bbox, grid_center_lat, grid_center_lon, distance_mode)
+        return pois_df, time.monotonic() - t0
+
+    # Create the shared client and rule table before the workers need them
+    get_overpass_client()
+    _category_classifier()
+
+    grid_pois = {}
+    cell_timings = {}
+    done = checkpoint.load() if checkpoint is not None else {}
+    for i, j, *_ in cells:
+        rows = done.get(f"grid_{i}_{j}")
+        if rows:
+            grid_pois[(i, j)] = pd.DataFrame(rows)
+    pending = [cell for cell in cells if f"grid_{cell[0]}_{cell[1]}" not in done]
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as ex:
+        futures = {ex.submit(run_cell, cell): cell for cell in pending}
+        for future in as_completed(futures):
+            i, j = futures[future][:2]
+            try:
+                pois_df, seconds = future.result()
+            except Exception as e:
+                print(f"An error occurred while fetching POIs for grid_{i}_{j}: {e}")
+                continue
+            cell_timings[f"grid_{i}_{j}"] = seconds
+            if checkpoint is not None:
+                checkpoint.append(f"grid_{i}_{j}", pois_df.to_dict('records'))
+            if not pois_df.empty:
+                grid_pois[(i, j)] = pois_df
+    return grid_pois, cell_timings
+
+
+def _collect_grid_pois(latitude, longitude, grid_size_km, search_radius_km, single_fetch, distance_mode, max_workers=1, checkpoint=None):
+    cells = _grid_cells(latitude, longitude, grid_size_km, search_radius_km, distance_mode)
+    cell_timings = {}
+    if single_fetch:
+        grid_pois = _grid_pois_single_fetch(cells, latitude, longitude, grid_size_km, search_radius_km, distance_mode)
+    else:
+        grid_pois, cell_timings = _grid_pois_per_cell(cells, grid_size_km, distance_mode, max_workers, checkpoint)
+    return cells, grid_pois, cell_timings
+
+
+def create_grid_analysis(latitude, longitude, grid_size_km=0.5, search_radius_km=5.0, single_fetch=True, distance_mode="geodesic", max_workers=4, checkpoint=None):
     """
     Create a grid-based analysis of POIs around a center point.
     Returns a DataFrame with counts for each category in each grid cell.
+
+    With single_fetch (default) the whole search area is fetched in one
+    Overpass query and POIs are binned locally; otherwise each cell is
+    queried separately, max_workers at a time, and per-cell fetch times
+    are kept in df.attrs['cell_timings']. A GridCheckpoint passed as
+    checkpoint makes per-cell runs resumable. distance_mode is 'geodesic'
+    or 'haversine'.
     """
-    # Calculate the number of grid cells in each direction
-    half_grids = int(np.ceil(search_radius_km / grid_size_km))
-    
-    # Calculate grid boundaries
-    north_bound = geodesic(kilometers=search_radius_km).destination((latitude, longitude), 0).latitude
-    south_bound = geodesic(kilometers=search_radius_km).destination((latitude, longitude), 180).latitude
-    east_bound = geodesic(kilometers=search_radius_km).destination((latitude, longitude), 90).longitude
-    west_bound = geodesic(kilometers=search_radius_km).destination((latitude, longitude), 270).longitude
-    
-    # Create grid cells
+    cells, grid_pois, cell_timings = _collect_grid_pois(latitude, longitude, grid_size_km, search_radius_km, single_fetch, distance_mode, max_workers, checkpoint)
+
     grid_results = []
-    
-    for i in range(-half_grids, half_grids + 1):
-        for j in range(-half_grids, half_grids + 1):
-            # Calculate grid cell center
-            grid_center_lat = latitude + (i * grid_size_km / 111.0)  # Approximate km per degree
-            grid_center_lon = longitude + (j * grid_size_km / (111.0 * np.cos(np.radians(latitude))))
-            
-            # Skip if outside search radius
-            dist_from_center = geodesic((latitude, longitude), (grid_center_lat, grid_center_lon)).km
-            if dist_from_center > search_radius_km:
-                continue
-            
-            # Get POIs for this grid cell
-            pois_df = get_pois_with_detailed_categories(grid_center_lat, grid_center_lon, grid_size_km/2)
-            
-            if not pois_df.empty:
-                # Count POIs by category
-                category_counts = pois_df['category'].value_counts()
-                
-                # Create row for this grid cell
-                grid_row = {
-                    'grid_center_lat': grid_center_lat,
-                    'grid_center_lon': grid_center_lon,
-                    'grid_id': f"grid_{i}_{j}",
-                    'distance_from_center_km': dist_from_center
-                }
-                
-                # Add counts for each category
-                all_categories = [
-                    "Public Schools", "Public Transit Lines", "Parks and Recreational Areas",
-                    "Community Services", "Cafés", "Bars", "Libraries",
-                    "Single-Family Houses", "Residential Buildings", "Detached Houses",
-                    "Semi-Detached Houses", "Terraced Houses", "Residential Areas", "Housing Facilities",
-                    "amenity", "historic", "leisure", "shop", "tourism", "landuse"
-                ]
-                
-                for category in all_categories:
-                    grid_row[f"{category}_count"] = category_counts.get(category, 0)
-                
-                grid_results.append(grid_row)
-    
-    return pd.DataFrame(grid_results)
-
-
-def create_grid_analysis_vertical(latitude, longitude, grid_size_km=0.5, search_radius_km=5.0):
+    for i, j, grid_center_lat, grid_center_lon, dist_from_center in cells:
+        pois_df = grid_pois.get((i, j))
+        if pois_df is None or pois_df.empty:
+            continue
+
+        # Count POIs by category
+        category_counts = pois_df['category'].value_counts()
+
+        # Create row for this grid cell
+        grid_row = {
+            'grid_center_lat': grid_center_lat,
+            'grid_center_lon': grid_center_lon,
+            'grid_id': f"grid_{i}_{j}",
+            'distance_from_center_km': dist_from_center
+        }
+
+        # Add counts for each category
+        for category in GRID_CATEGORIES:
+            grid_row[f"{category}_count"] = category_counts.get(category, 0)
+
+        grid_results.append(grid_row)
+
+    grid_df = pd.DataFrame(grid_results)
+    grid_df.attrs['cell_timings'] = cell_timings
+    return grid_df
+
+
+def create_grid_analysis_vertical(latitude, longitude, grid_size_km=0.5, search_radius_km=5.0, single_fetch=True, distance_mode="geodesic", max_workers=4, checkpoint=None):
     """
     Create a grid-based analysis of POIs around a center point with vertical CSV format.
     Returns a DataFrame in long format with one row per POI per category.
+
+    See create_grid_analysis for single_fetch, distance_mode, max_workers
+    and checkpoint.
     """
-    # Calculate the number of grid cells in each direction
-    half_grids = int(np.ceil(search_radius_km / grid_size_km))
-    
-    # Create grid cells
+    cells, grid_pois, cell_timings = _collect_grid_pois(latitude, longitude, grid_size_km, search_radius_km, single_fetch, distance_mode, max_workers, checkpoint)
+
     grid_results = []
-    
-    for i in range(-half_grids, half_grids + 1):
-        for j in range(-half_grids, half_grids + 1):
-            # Calculate grid cell center
-            grid_center_lat = latitude + (i * grid_size_km / 111.0)  # Approximate km per degree
-            grid_center_lon = longitude + (j * grid_size_km / (111.0 * np.cos(np.radians(latitude))))
-            
-            # Skip if outside search radius
-            dist_from_center = geodesic((latitude, longitude), (grid_center_lat, grid_center_lon)).km
-            if dist_from_center > search_radius_km:
-                continue
-            
-            # Get POIs for this grid cell
-            pois_df = get_pois_with_detailed_categories(grid_center_lat, grid_center_lon, grid_size_km/2)
-            
-            if not pois_df.empty:
-                # Group POIs by category and create one row per POI
-                for _, poi in pois_df.iterrows():
-                    grid_results.append({
-                        'poi_lat': poi['latitude'],
-                        'poi_lon': poi['longitude'],
-                        'poi_name': poi['name'],
-                        'grid_center_lat': grid_center_lat,
-                        'grid_center_lon': grid_center_lon,
-                        'grid_id': f"grid_{i}_{j}",
-                        'distance_from_center_km': dist_from_center,
-                        'category': poi['category'],
-                        'count': 1  # Each POI counts as 1
-                    })
-    
-    return pd.DataFrame(grid_results)
+    for i, j, grid_center_lat, grid_center_lon, dist_from_center in cells:
+        pois_df = grid_pois.get((i, j))
+        if pois_df is None or pois_df.empty:
+            continue
+
+        # Group POIs by category and create one row per POI
+        for poi in pois_df.itertuples(index=False):
+            grid_results.append({
+                'poi_lat': poi.latitude,
+                'poi_lon': poi.longitude,
+                'poi_name': poi.name,
+                'grid_center_lat': grid_center_lat,
+                'grid_center_lon': grid_center_lon,
+                'grid_id': f"grid_{i}_{j}",
+                'distance_from_center_km': dist_from_center,
+                'category': poi.category,
+                'count': 1  # Each POI counts as 1
+            })
+
+    grid_df = pd.DataFrame(grid_results)
+    grid_df.attrs['cell_timings'] = cell_timings
+    return grid_df
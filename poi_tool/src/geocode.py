@@ -1,37 +1,240 @@
 import os
 import json
-from typing import Tuple
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from geopy.geocoders import Nominatim
 
+Coords = Tuple[Optional[float], Optional[float]]
 
-def _cache_path() -> str:
+
+def _cache_dir() -> str:
     base = os.path.join(os.path.dirname(__file__), '..', '.cache')
     os.makedirs(base, exist_ok=True)
-    return os.path.join(base, 'geocode.json')
+    return base
+
+
+def _cache_path() -> str:
+    return os.path.join(_cache_dir(), 'geocode.sqlite')
+
+
+def normalize_address(address: str) -> str:
+    """Cache key for an address: whitespace collapsed and case folded."""
+    return " ".join(address.split()).casefold()
+
+
+class RateLimiter:
+    """Spaces calls at least min_interval_s apart across all threads."""
+
+    def __init__(self, min_interval_s: float = 1.0):
+        self.min_interval_s = min_interval_s
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_at:
+                time.sleep(self._next_at - now)
+                now = self._next_at
+            self._next_at = now + self.min_interval_s
 
 
-def cached_geocode(address: str) -> Tuple[float, float]:
-    path = _cache_path()
-    cache = {}
-    if os.path.exists(path):
+# Nominatim's usage policy allows at most one request per second
+NOMINATIM_LIMITER = RateLimiter(1.0)
+
+_geolocator: Optional[Nominatim] = None
+_geolocator_lock = threading.Lock()
+
+
+def get_geolocator() -> Nominatim:
+    """One Nominatim instance per process, created on first use."""
+    global _geolocator
+    with _geolocator_lock:
+        if _geolocator is None:
+            _geolocator = Nominatim(user_agent="poi_tool_deterministic", timeout=15)
+        return _geolocator
+
+
+class GeocodeCache:
+    """
+    SQLite (WAL) store of address -> (lat, lon) with an in-memory LRU in front.
+
+    Addresses that did not resolve are stored with NULL coordinates and
+    served as (None, None) until negative_ttl_s has passed. Connections are
+    opened per thread and per process, so the cache can be shared by thread
+    pools and used from forked workers; writes are single-statement upserts.
+    A legacy geocode.json next to the database is imported on first open.
+    """
+
+    def __init__(self, path: Optional[str] = None, negative_ttl_s: float = 7 * 86400, memo_size: int = 4096):
+        self.path = path or _cache_path()
+        self.negative_ttl_s = negative_ttl_s
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[str, Tuple[Optional[float], Optional[float], float]]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized_pid: Optional[int] = None
+
+    def _conn(self) -> sqlite3.Connection:
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != pid:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, pid
+            with self._init_lock:
+                if self._initialized_pid != pid:
+                    self._init_schema(conn)
+                    self._initialized_pid = pid
+        return conn
+
+    def _init_schema(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            " address TEXT PRIMARY KEY, lat REAL, lon REAL, stored_at REAL NOT NULL)"
+        )
+        legacy = os.path.join(os.path.dirname(self.path), 'geocode.json')
+        if not os.path.exists(legacy):
+            return
+        try:
+            with open(legacy, 'r') as f:
+                entries = json.load(f) or {}
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        conn.executemany(
+            "INSERT OR IGNORE INTO geocode (address, lat, lon, stored_at) VALUES (?, ?, ?, ?)",
+            [(normalize_address(a), float(v[0]), float(v[1]), now) for a, v in entries.items()],
+        )
         try:
-            with open(path, 'r') as f:
-                cache = json.load(f) or {}
-        except Exception:
-            cache = {}
-    if address in cache:
-        lat, lon = cache[address]
-        return float(lat), float(lon)
-    geolocator = Nominatim(user_agent="poi_tool_deterministic", timeout=15)
-    loc = geolocator.geocode(address, exactly_one=True, addressdetails=False)
+            os.replace(legacy, legacy + '.migrated')
+        except OSError:
+            pass
+
+    def _remember(self, address: str, entry: Tuple[Optional[float], Optional[float], float]) -> None:
+        with self._memo_lock:
+            self._memo[address] = entry
+            self._memo.move_to_end(address)
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+
+    def _fresh(self, entry) -> bool:
+        lat, _, stored_at = entry
+        return lat is not None or time.time() - stored_at <= self.negative_ttl_s
+
+    def get(self, address: str) -> Optional[Coords]:
+        """(lat, lon), (None, None) for a cached negative result, or None on a miss."""
+        address = normalize_address(address)
+        with self._memo_lock:
+            entry = self._memo.get(address)
+            if entry is not None:
+                self._memo.move_to_end(address)
+        if entry is None:
+            row = self._conn().execute(
+                "SELECT lat, lon, stored_at FROM geocode WHERE address = ?", (address,)
+            ).fetchone()
+            if row is None:
+                return None
+            entry = (row[0], row[1], row[2])
+            self._remember(address, entry)
+        if not self._fresh(entry):
+            return None
+        return entry[0], entry[1]
+
+    def put(self, address: str, lat: Optional[float], lon: Optional[float]) -> None:
+        address = normalize_address(address)
+        entry = (lat, lon, time.time())
+        self._conn().execute(
+            "INSERT INTO geocode (address, lat, lon, stored_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(address) DO UPDATE SET lat = excluded.lat, lon = excluded.lon, stored_at = excluded.stored_at",
+            (address,) + entry,
+        )
+        self._remember(address, entry)
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_default_cache: Optional[GeocodeCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def default_geocode_cache() -> GeocodeCache:
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = GeocodeCache()
+        return _default_cache
+
+
+def _lookup(address: str, cache: GeocodeCache, limiter: RateLimiter) -> Coords:
+    limiter.wait()
+    loc = get_geolocator().geocode(address, exactly_one=True, addressdetails=False)
     if not loc:
+        cache.put(address, None, None)
         return None, None
-    cache[address] = [loc.latitude, loc.longitude]
-    try:
-        with open(path, 'w') as f:
-            json.dump(cache, f, indent=2)
-    except Exception:
-        pass
+    cache.put(address, loc.latitude, loc.longitude)
     return float(loc.latitude), float(loc.longitude)
 
 
+def _as_coords(hit: Coords) -> Coords:
+    lat, lon = hit
+    return (float(lat), float(lon)) if lat is not None else (None, None)
+
+
+def cached_geocode(address: str, cache: Optional[GeocodeCache] = None) -> Coords:
+    cache = cache or default_geocode_cache()
+    hit = cache.get(address)
+    if hit is not None:
+        return _as_coords(hit)
+    return _lookup(address, cache, NOMINATIM_LIMITER)
+
+
+def iter_geocode(addresses: Iterable[str], cache: Optional[GeocodeCache] = None,
+                 limiter: Optional[RateLimiter] = None) -> Iterator[Tuple[str, Coords]]:
+    """
+    Yield (address, (lat, lon)) for every distinct address. Cache hits come
+    first; misses follow one by one through the shared geocoder and rate
+    limiter, so callers can start work on each result as it resolves.
+    Addresses differing only in case or spacing are looked up once. A
+    lookup that raises yields (None, None) and is not cached.
+    """
+    cache = cache or default_geocode_cache()
+    limiter = limiter or NOMINATIM_LIMITER
+    groups: Dict[str, List[str]] = {}
+    for address in addresses:
+        variants = groups.setdefault(normalize_address(address), [])
+        if address not in variants:
+            variants.append(address)
+
+    misses = []
+    for key, variants in groups.items():
+        hit = cache.get(key)
+        if hit is None:
+            misses.append(variants)
+            continue
+        for address in variants:
+            yield address, _as_coords(hit)
+
+    for variants in misses:
+        try:
+            coords = _lookup(variants[0], cache, limiter)
+        except Exception as e:
+            print(f"Error geocoding address {variants[0]!r}: {e}")
+            coords = (None, None)
+        for address in variants:
+            yield address, coords
+
+
+def batch_geocode(addresses: Iterable[str], cache: Optional[GeocodeCache] = None,
+                  limiter: Optional[RateLimiter] = None) -> Dict[str, Coords]:
+    """Resolve many addresses at once; see iter_geocode."""
+    return dict(iter_geocode(addresses, cache, limiter))
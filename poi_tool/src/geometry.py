@@ -1,14 +1,19 @@
+from functools import lru_cache
 from typing import Tuple
-from pyproj import CRS, Transformer
 
+import numpy as np
+from pyproj import CRS, Geod, Transformer
 
-def latlon_to_utm_zone(lat: float, lon: float) -> CRS:
-    """
-    Return the UTM CRS for the given WGS84 lat/lon, northern/southern hemisphere aware.
-    Deterministic: no randomness.
-    """
-    zone = int((lon + 180) // 6) + 1
-    is_northern = lat >= 0
+EARTH_MEAN_RADIUS_KM = 6371.0088
+_WGS84_GEOD = Geod(ellps='WGS84')
+
+
+def _utm_zone_number(lon: float) -> int:
+    return int((lon + 180) // 6) + 1
+
+
+@lru_cache(maxsize=None)
+def _utm_crs(zone: int, is_northern: bool) -> CRS:
     return CRS.from_dict({
         "proj": "utm",
         "zone": zone,
@@ -18,15 +23,34 @@ def latlon_to_utm_zone(lat: float, lon: float) -> CRS:
     })
 
 
+@lru_cache(maxsize=128)
+def _utm_transformers(zone: int, is_northern: bool) -> Tuple[Transformer, Transformer, int]:
+    """Cached (to_utm, to_wgs, epsg) for one UTM zone/hemisphere."""
+    wgs84 = CRS.from_epsg(4326)
+    utm = _utm_crs(zone, is_northern)
+    to_utm = Transformer.from_crs(wgs84, utm, always_xy=True)
+    to_wgs = Transformer.from_crs(utm, wgs84, always_xy=True)
+    return to_utm, to_wgs, int(utm.to_authority()[1])
+
+
+def latlon_to_utm_zone(lat: float, lon: float) -> CRS:
+    """
+    Return the UTM CRS for the given WGS84 lat/lon, northern/southern hemisphere aware.
+    Deterministic: no randomness.
+    """
+    return _utm_crs(_utm_zone_number(lon), lat >= 0)
+
+
+def _r8(v: float) -> float:
+    return float(f"{v:.8f}")
+
+
 def bbox_wgs84_for_square_m(center_lat: float, center_lon: float, side_m: int = 1000) -> Tuple[float, float, float, float, int]:
     """
     Compute a 1x1 km (or side_m) square bbox centered on WGS84 coord using UTM meters to avoid drift.
     Returns (south, west, north, east, utm_zone) with 8-decimal rounding applied to all bbox coords.
     """
-    wgs84 = CRS.from_epsg(4326)
-    utm = latlon_to_utm_zone(center_lat, center_lon)
-    to_utm = Transformer.from_crs(wgs84, utm, always_xy=True)
-    to_wgs = Transformer.from_crs(utm, wgs84, always_xy=True)
+    to_utm, to_wgs, epsg = _utm_transformers(_utm_zone_number(center_lon), center_lat >= 0)
 
     cx, cy = to_utm.transform(center_lon, center_lat)
     half = side_m / 2.0
@@ -36,9 +60,75 @@ def bbox_wgs84_for_square_m(center_lat: float, center_lon: float, side_m: int =
     west, south = to_wgs.transform(minx, miny)
     east, north = to_wgs.transform(maxx, maxy)
 
-    def r8(v: float) -> float:
-        return float(f"{v:.8f}")
+    return _r8(south), _r8(west), _r8(north), _r8(east), epsg
+
+
+def bboxes_wgs84_for_squares_m(center_lats, center_lons, side_m=1000) -> np.ndarray:
+    """
+    Vectorized bbox_wgs84_for_square_m for arrays of centers.
+
+    side_m may be a scalar or an array. Centers are grouped by UTM zone and
+    hemisphere so each group takes one transform call per direction.
+    Returns an (n, 5) float array of [south, west, north, east, utm_zone],
+    rounded identically to the scalar function.
+    """
+    lats = np.asarray(center_lats, dtype=float).ravel()
+    lons = np.asarray(center_lons, dtype=float).ravel()
+    half = np.broadcast_to(np.asarray(side_m, dtype=float) / 2.0, lats.shape)
+    zones = np.floor((lons + 180) / 6).astype(np.int64) + 1
+    northern = lats >= 0
+
+    group_keys = zones * 2 + northern
+    out = np.empty((lats.size, 5), dtype=float)
+    for key in np.unique(group_keys):
+        mask = group_keys == key
+        to_utm, to_wgs, epsg = _utm_transformers(int(key // 2), bool(key % 2))
+        cx, cy = to_utm.transform(lons[mask], lats[mask])
+        h = half[mask]
+        west, south = to_wgs.transform(cx - h, cy - h)
+        east, north = to_wgs.transform(cx + h, cy + h)
+        out[mask, 0] = south
+        out[mask, 1] = west
+        out[mask, 2] = north
+        out[mask, 3] = east
+        out[mask, 4] = epsg
+
+    # Same decimal rounding as the scalar path, so bboxes hash identically
+    coords = out[:, :4].ravel().tolist()
+    out[:, :4] = np.array(["%.8f" % v for v in coords], dtype=float).reshape(-1, 4)
+    return out
+
+
+def haversine_km(lat0: float, lon0: float, lats, lons) -> np.ndarray:
+    """
+    Great-circle distances in km from (lat0, lon0) to arrays of points, on a
+    sphere of the IUGG mean Earth radius. Compared with the WGS84 geodesic
+    the error stays below 0.6% (typically ~0.2% at mid latitudes).
+    """
+    phi0 = np.radians(lat0)
+    phi = np.radians(np.asarray(lats, dtype=float))
+    dphi = phi - phi0
+    dlmb = np.radians(np.asarray(lons, dtype=float) - lon0)
+    a = np.sin(dphi / 2.0) ** 2 + np.cos(phi0) * np.cos(phi) * np.sin(dlmb / 2.0) ** 2
+    return 2.0 * EARTH_MEAN_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
 
-    return r8(south), r8(west), r8(north), r8(east), int(utm.to_authority()[1])
+def geodesic_km(lat0: float, lon0: float, lats, lons) -> np.ndarray:
+    """
+    WGS84 ellipsoidal distances in km via one vectorized Geod.inv call.
+    Uses Karney's algorithm like geopy.distance.geodesic, so results agree
+    to well below a millimetre.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    _, _, dist_m = _WGS84_GEOD.inv(np.full(lons.shape, lon0), np.full(lats.shape, lat0), lons, lats)
+    return np.asarray(dist_m) / 1000.0
 
 
+def distances_km(lat0: float, lon0: float, lats, lons, mode: str = "geodesic") -> np.ndarray:
+    """Distances in km from one center to many points; mode is 'geodesic' or 'haversine'."""
+    if mode == "geodesic":
+        return geodesic_km(lat0, lon0, lats, lons)
+    if mode == "haversine":
+        return haversine_km(lat0, lon0, lats, lons)
+    raise ValueError(f"Unknown distance mode: {mode}")
@@ -1,22 +1,71 @@
+import io
 import os
 import csv
+import gzip
 import json
 import hashlib
-from typing import List, Dict, Tuple
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Dict, Optional, TextIO, Tuple, Union
+
+from .columnar import ElementTable
+
+COLUMNAR_FILES = {'parquet': 'pois.parquet', 'arrow': 'pois.arrow', 'feather': 'pois.feather'}
+STREAM_FILES = {'ndjson': 'pois.ndjson', 'geojson': 'pois.geojson', 'csv-stream': 'pois.stream.csv'}
+OUTPUT_FORMATS = ('csv',) + tuple(COLUMNAR_FILES) + tuple(STREAM_FILES)
+COMPRESSION_SUFFIX = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
 
 
 def ensure_dir(p: str):
     os.makedirs(p, exist_ok=True)
 
 
-def write_outputs(rows: List[Dict], out_dir: str, meta: Dict) -> Tuple[str, str]:
-    ensure_dir(out_dir)
-    # Stable ID hash
+class IdListHasher:
+    """Incremental id_list_hash: feed rows one at a time, same digest."""
+
+    def __init__(self):
+        self._h = hashlib.sha256()
+        self.count = 0
+
+    def update(self, row: Dict) -> None:
+        sep = "|" if self.count else ""
+        self._h.update(f"{sep}{row['type']}:{row['id']}".encode('utf-8'))
+        self.count += 1
+
+    def hexdigest(self) -> str:
+        return self._h.hexdigest()
+
+
+def id_list_hash(rows: Iterable[Dict]) -> str:
+    """Stable ID hash: sha256 over "type:id" joined by "|" in row order."""
     ids = [f"{r['type']}:{r['id']}" for r in rows]
-    id_list_sha256 = hashlib.sha256("|".join(ids).encode('utf-8')).hexdigest()
+    return hashlib.sha256("|".join(ids).encode('utf-8')).hexdigest()
+
+
+def write_outputs(rows: List[Dict], out_dir: str, meta: Dict, fmt: str = 'csv', compression: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Write rows and run metadata to out_dir. fmt 'csv' writes pois.csv and
+    pois.json; a columnar fmt (see COLUMNAR_FILES) writes that file plus a
+    small meta.json; a streaming fmt (see STREAM_FILES) goes through
+    write_stream, the only one that takes compression. Returns
+    (data_path, json_path).
+    """
+    if compression is not None and fmt not in STREAM_FILES:
+        raise ValueError(f"Compression applies to {', '.join(STREAM_FILES)} output, not {fmt}")
+    if fmt in STREAM_FILES:
+        return write_stream(rows, out_dir, meta, fmt, compression)
+
+    ensure_dir(out_dir)
+    id_list_sha256 = id_list_hash(rows)
     meta = dict(meta)
     meta['id_list_sha256'] = id_list_sha256
 
+    if fmt != 'csv':
+        table_path = write_table(rows, out_dir, meta, fmt)
+        meta_path = os.path.join(out_dir, 'meta.json')
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        return table_path, meta_path
+
     csv_path = os.path.join(out_dir, 'pois.csv')
     json_path = os.path.join(out_dir, 'pois.json')
 
@@ -43,3 +92,221 @@ def write_outputs(rows: List[Dict], out_dir: str, meta: Dict) -> Tuple[str, str]
     return csv_path, json_path
 
 
+def write_combined(site_rows: Iterable[Tuple[str, List[Dict]]], path: str) -> str:
+    """One CSV over many sites: the per-site columns prefixed with the site name."""
+    ensure_dir(os.path.dirname(path) or '.')
+    with open(path, 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['site', 'type', 'id', 'lat', 'lon', 'name'])
+        for site, rows in site_rows:
+            for r in rows:
+                w.writerow([site, r['type'], r['id'], f"{r['lat']:.8f}", f"{r['lon']:.8f}", r['name']])
+    return path
+
+
+def _schema_metadata(meta: Dict) -> Dict[str, str]:
+    return {k: v if isinstance(v, str) else json.dumps(v) for k, v in meta.items()}
+
+
+def write_table(rows: Union[List[Dict], ElementTable], out_dir: str, meta: Dict, fmt: str = 'parquet') -> str:
+    """
+    Write rows as a typed, zstd-compressed columnar file (parquet, arrow or
+    feather) with tags as a map<string, string> column. meta goes into the
+    schema metadata; non-string values are JSON encoded. Requires pyarrow.
+    """
+    if fmt not in COLUMNAR_FILES:
+        raise ValueError(f"Unknown columnar format: {fmt}")
+    if isinstance(rows, ElementTable):
+        table = rows
+        id_rows = ({'type': t, 'id': i} for t, i in zip(table.types().tolist(), table.ids.tolist()))
+    else:
+        table, id_rows = ElementTable.from_rows(rows), rows
+    meta = dict(meta)
+    meta.setdefault('id_list_sha256', id_list_hash(id_rows))
+    at = table.to_arrow(_schema_metadata(meta))
+
+    ensure_dir(out_dir)
+    path = os.path.join(out_dir, COLUMNAR_FILES[fmt])
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(at, path, compression='zstd')
+    elif fmt == 'feather':
+        import pyarrow.feather as feather
+        feather.write_feather(at, path, compression='zstd')
+    else:
+        import pyarrow as pa
+        options = pa.ipc.IpcWriteOptions(compression='zstd')
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, at.schema, options=options) as writer:
+            writer.write_table(at)
+    return path
+
+
+def read_table(path: str):
+    """Load a file written by write_table. Returns (pyarrow.Table, meta)."""
+    import pyarrow as pa
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        at = pq.read_table(path)
+    else:
+        with pa.memory_map(path, 'r') as source:
+            at = pa.ipc.open_file(source).read_all()
+    meta = {}
+    for k, v in (at.schema.metadata or {}).items():
+        k, v = k.decode('utf-8'), v.decode('utf-8')
+        try:
+            meta[k] = json.loads(v)
+        except ValueError:
+            meta[k] = v
+    return at, meta
+
+
+@contextmanager
+def open_text(path: str, compression: Optional[str] = None) -> Iterator[TextIO]:
+    """Open path for text writing, optionally through gzip or zstd (needs zstandard)."""
+    if compression is None:
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            yield f
+    elif compression == 'gzip':
+        with gzip.open(path, 'wt', newline='', encoding='utf-8') as f:
+            yield f
+    elif compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("zstd output requires zstandard (pip install zstandard)") from e
+        with open(path, 'wb') as raw, zstandard.ZstdCompressor().stream_writer(raw) as zf:
+            with io.TextIOWrapper(zf, encoding='utf-8', newline='') as f:
+                yield f
+    else:
+        raise ValueError(f"Unknown compression: {compression}")
+
+
+def _stream_csv(rows: Iterable[Dict], f: TextIO, hasher: IdListHasher, meta: Dict) -> None:
+    # Unlike pois.csv from write_outputs there is no metadata header row:
+    # id_list_sha256 is only known after the last row, so meta goes in the sidecar
+    w = csv.writer(f)
+    w.writerow(['type', 'id', 'lat', 'lon', 'name'])
+    for r in rows:
+        hasher.update(r)
+        w.writerow([r['type'], r['id'], f"{r['lat']:.8f}", f"{r['lon']:.8f}", r['name']])
+
+
+def _stream_ndjson(rows: Iterable[Dict], f: TextIO, hasher: IdListHasher, meta: Dict) -> None:
+    for r in rows:
+        hasher.update(r)
+        f.write(json.dumps(r, ensure_ascii=False, separators=(',', ':')))
+        f.write('\n')
+
+
+def _stream_geojson(rows: Iterable[Dict], f: TextIO, hasher: IdListHasher, meta: Dict) -> None:
+    f.write('{"type":"FeatureCollection","features":[')
+    for r in rows:
+        if hasher.count:
+            f.write(',')
+        hasher.update(r)
+        feature = {
+            'type': 'Feature',
+            'id': f"{r['type']}/{r['id']}",
+            'geometry': {'type': 'Point', 'coordinates': [r['lon'], r['lat']]},
+            'properties': {'type': r['type'], 'id': r['id'], 'name': r['name'], 'tags': r.get('tags', {})},
+        }
+        f.write('\n')
+        f.write(json.dumps(feature, ensure_ascii=False, separators=(',', ':')))
+    # Member order is free in JSON, so the metadata can follow the features
+    f.write('\n],"meta":')
+    f.write(json.dumps(dict(meta, id_list_sha256=hasher.hexdigest()), ensure_ascii=False, separators=(',', ':')))
+    f.write('}\n')
+
+
+_STREAM_WRITERS = {'csv-stream': _stream_csv, 'ndjson': _stream_ndjson, 'geojson': _stream_geojson}
+
+
+def write_stream(rows: Iterable[Dict], out_dir: str, meta: Dict, fmt: str = 'ndjson',
+                 compression: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Write rows from an iterator without holding them in memory. fmt is
+    'csv-stream', 'ndjson' or 'geojson'; compression is None, 'gzip' or
+    'zstd'. id_list_sha256 is computed on the fly and, with the rest of
+    meta and the row count, written to a meta.json sidecar.
+    Returns (data_path, meta_path).
+    """
+    if fmt not in _STREAM_WRITERS:
+        raise ValueError(f"Unknown streaming format: {fmt}")
+    ensure_dir(out_dir)
+    path = os.path.join(out_dir, STREAM_FILES[fmt] + COMPRESSION_SUFFIX[compression])
+    hasher = IdListHasher()
+    with open_text(path, compression) as f:
+        _STREAM_WRITERS[fmt](rows, f, hasher, meta)
+
+    meta = dict(meta)
+    meta['id_list_sha256'] = hasher.hexdigest()
+    meta['row_count'] = hasher.count
+    meta_path = os.path.join(out_dir, 'meta.json')
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    return path, meta_path
+
+
+@contextmanager
+def _open_text_read(path: str, compression: Optional[str] = None) -> Iterator[TextIO]:
+    if compression is None:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            yield f
+    elif compression == 'gzip':
+        with gzip.open(path, 'rt', newline='', encoding='utf-8') as f:
+            yield f
+    else:
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("zstd input requires zstandard (pip install zstandard)") from e
+        with open(path, 'rb') as raw, zstandard.ZstdDecompressor().stream_reader(raw) as zf:
+            yield io.TextIOWrapper(zf, encoding='utf-8', newline='')
+
+
+def _find_outputs(out_dir: str) -> Tuple[str, str, Optional[str]]:
+    """(path, fmt, compression) of the newest data file write_outputs left in out_dir."""
+    candidates = [(os.path.join(out_dir, 'pois.json'), 'csv', None)]
+    candidates += [(os.path.join(out_dir, name), fmt, None) for fmt, name in COLUMNAR_FILES.items()]
+    candidates += [(os.path.join(out_dir, name + suffix), fmt, comp)
+                   for fmt, name in STREAM_FILES.items() for comp, suffix in COMPRESSION_SUFFIX.items()]
+    found = [c for c in candidates if os.path.exists(c[0])]
+    if not found:
+        raise FileNotFoundError(f"No outputs from write_outputs in {out_dir}")
+    return max(found, key=lambda c: os.path.getmtime(c[0]))
+
+
+def read_outputs(out_dir: str) -> Tuple[List[Dict], Dict, str, Optional[str]]:
+    """
+    Load what write_outputs wrote to out_dir, whichever format it used.
+    Returns (rows, meta, fmt, compression); csv-stream rows come back
+    without tags since the file has none.
+    """
+    path, fmt, compression = _find_outputs(out_dir)
+    if fmt == 'csv':
+        with open(path, 'r') as f:
+            doc = json.load(f)
+        return doc['rows'], doc['meta'], fmt, compression
+
+    with open(os.path.join(out_dir, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+    if fmt in COLUMNAR_FILES:
+        at, _ = read_table(path)
+        rows = at.to_pylist()
+        for r in rows:
+            r['tags'] = dict(r['tags'] or [])
+        return rows, meta, fmt, compression
+
+    meta.pop('row_count', None)
+    with _open_text_read(path, compression) as f:
+        if fmt == 'ndjson':
+            rows = [json.loads(line) for line in f if line.strip()]
+        elif fmt == 'geojson':
+            rows = [{'type': ft['properties']['type'], 'id': ft['properties']['id'],
+                     'lat': ft['geometry']['coordinates'][1], 'lon': ft['geometry']['coordinates'][0],
+                     'name': ft['properties']['name'], 'tags': ft['properties']['tags']}
+                    for ft in json.load(f)['features']]
+        else:
+            rows = [{'type': r['type'], 'id': int(r['id']), 'lat': float(r['lat']), 'lon': float(r['lon']),
+                     'name': r['name'], 'tags': {}} for r in csv.DictReader(f)]
+    return rows, meta, fmt, compression
@@ -0,0 +1,329 @@
+import bz2
+import gzip
+import os
+import threading
+import xml.etree.ElementTree as ET
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .backend import BBox, ExtractBackend
+from .tags import compile_filters, filters_predicate
+
+try:  # optional: only needed for .osm.pbf files
+    import osmium
+    OSMIUM_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    osmium = None
+    OSMIUM_AVAILABLE = False
+
+_MEMBER_TYPES = {'n': 'node', 'w': 'way', 'r': 'relation', 'node': 'node', 'way': 'way', 'relation': 'relation'}
+
+
+class _Collector:
+    """Accumulates parsed objects into flat arrays while a file is read."""
+
+    def __init__(self):
+        self.node_ids, self.node_lat, self.node_lon = array('q'), array('d'), array('d')
+        self.node_tags: List[Tuple[int, Dict[str, str]]] = []
+        self.way_ids, self.way_refs, self.way_offsets = array('q'), array('q'), array('q', [0])
+        self.way_tags: List[Dict[str, str]] = []
+        self.rel_ids: List[int] = []
+        self.rel_members: List[List[Tuple[str, int]]] = []
+        self.rel_tags: List[Dict[str, str]] = []
+        self.timestamp: Optional[str] = None
+
+    def add_node(self, nid: int, lat: float, lon: float, tags: Dict[str, str]):
+        self.node_ids.append(nid)
+        self.node_lat.append(lat)
+        self.node_lon.append(lon)
+        if tags:
+            self.node_tags.append((nid, tags))
+
+    def add_way(self, wid: int, refs: List[int], tags: Dict[str, str]):
+        self.way_ids.append(wid)
+        self.way_refs.extend(refs)
+        self.way_offsets.append(len(self.way_refs))
+        self.way_tags.append(tags)
+
+    def add_relation(self, rid: int, members: List[Tuple[str, int]], tags: Dict[str, str]):
+        self.rel_ids.append(rid)
+        self.rel_members.append(members)
+        self.rel_tags.append(tags)
+
+
+def _open_xml(path: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _read_xml(path: str, c: _Collector) -> None:
+    """Stream an .osm XML file (optionally .gz/.bz2) with iterparse, clearing as it goes."""
+    tags: Dict[str, str] = {}
+    refs: List[int] = []
+    members: List[Tuple[str, int]] = []
+    with _open_xml(path) as f:
+        context = ET.iterparse(f, events=('start', 'end'))
+        _, root = next(context)
+        c.timestamp = root.get('timestamp')
+        for event, el in context:
+            tag = el.tag
+            if event == 'start':
+                if tag in ('node', 'way', 'relation'):
+                    tags, refs, members = {}, [], []
+                elif tag == 'meta' and el.get('osm_base'):
+                    c.timestamp = el.get('osm_base')
+                continue
+            if tag == 'tag':
+                tags[el.get('k')] = el.get('v')
+            elif tag == 'nd':
+                refs.append(int(el.get('ref')))
+            elif tag == 'member':
+                members.append((_MEMBER_TYPES[el.get('type')], int(el.get('ref'))))
+            elif tag == 'node':
+                if el.get('lat') is not None:
+                    c.add_node(int(el.get('id')), float(el.get('lat')), float(el.get('lon')), tags)
+                root.clear()
+            elif tag == 'way':
+                c.add_way(int(el.get('id')), refs, tags)
+                root.clear()
+            elif tag == 'relation':
+                c.add_relation(int(el.get('id')), members, tags)
+                root.clear()
+
+
+def _read_pbf(path: str, c: _Collector) -> None:
+    if not OSMIUM_AVAILABLE:
+        raise ImportError("Reading .osm.pbf requires osmium (pip install osmium)")
+
+    class Handler(osmium.SimpleHandler):
+        def node(self, n):
+            if n.location.valid():
+                c.add_node(n.id, n.location.lat, n.location.lon, {t.k: t.v for t in n.tags})
+
+        def way(self, w):
+            c.add_way(w.id, [nd.ref for nd in w.nodes], {t.k: t.v for t in w.tags})
+
+        def relation(self, r):
+            c.add_relation(r.id, [(_MEMBER_TYPES[m.type], m.ref) for m in r.members], {t.k: t.v for t in r.tags})
+
+    header = osmium.io.Reader(path, osmium.osm.osm_entity_bits.NOTHING).header()
+    c.timestamp = header.get('osmosis_replication_timestamp') or None
+    Handler().apply_file(path)
+
+
+def _segments_hit_bbox(lat: np.ndarray, lon: np.ndarray, bbox: BBox) -> bool:
+    """True when any segment of the polyline touches bbox (Liang-Barsky clipping)."""
+    south, west, north, east = bbox
+    x0, y0, x1, y1 = lon[:-1], lat[:-1], lon[1:], lat[1:]
+    dx, dy = x1 - x0, y1 - y0
+    t0 = np.zeros(len(dx))
+    t1 = np.ones(len(dx))
+    ok = np.ones(len(dx), dtype=bool)
+    for p, q in ((-dx, x0 - west), (dx, east - x0), (-dy, y0 - south), (dy, north - y0)):
+        parallel = p == 0
+        ok &= ~(parallel & (q < 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = q / p
+        t0 = np.where(~parallel & (p < 0), np.maximum(t0, r), t0)
+        t1 = np.where(~parallel & (p > 0), np.minimum(t1, r), t1)
+    return bool(np.any(ok & (t0 <= t1)))
+
+
+class LocalOSMBackend(ExtractBackend):
+    """
+    Answers bbox + tag-filter queries from a local .osm / .osm.pbf extract.
+
+    The file is read once, on first use, into flat arrays: every node's
+    coordinates, the node refs of every way and the members of every
+    relation; tags are kept only where present. Matching follows Overpass:
+    a node matches when inside the bbox, a way when any of its segments
+    touches it, a relation when a member node or way does. Way and
+    relation centers are the middle of their bounding box, as `out
+    center` computes them, rounded to Overpass' 7 decimals.
+
+    A local extract is a single point in time, so snapshot_iso is ignored;
+    osm3s.timestamp_osm_base reports the file's own timestamp. .osm.pbf
+    needs the optional osmium package.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    @property
+    def source(self) -> str:
+        return 'file://' + os.path.abspath(self.path)
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            c = _Collector()
+            if self.path.endswith('.pbf'):
+                _read_pbf(self.path, c)
+            else:
+                _read_xml(self.path, c)
+            self._index(c)
+            self._loaded = True
+
+    def _index(self, c: _Collector) -> None:
+        ids = np.frombuffer(c.node_ids, dtype=np.int64)
+        order = np.argsort(ids, kind='stable')
+        self._node_ids = ids[order]
+        self._node_lat = np.frombuffer(c.node_lat, dtype=np.float64)[order]
+        self._node_lon = np.frombuffer(c.node_lon, dtype=np.float64)[order]
+
+        tagged = [nid for nid, _ in c.node_tags]
+        self._tagged_node_idx = self._node_index(np.array(tagged, dtype=np.int64))
+        self._tagged_node_ids = np.array(tagged, dtype=np.int64)
+        self._tagged_node_tags = [t for _, t in c.node_tags]
+
+        # Ways: resolve refs to node rows once, drop refs missing from the extract
+        refs = np.frombuffer(c.way_refs, dtype=np.int64)
+        offsets = np.frombuffer(c.way_offsets, dtype=np.int64)
+        ref_idx = self._node_index(refs)
+        valid = ref_idx >= 0
+        way_of_ref = np.repeat(np.arange(len(c.way_ids)), np.diff(offsets))
+        ref_idx, way_of_ref = ref_idx[valid], way_of_ref[valid]
+        counts = np.bincount(way_of_ref, minlength=len(c.way_ids))
+        self._way_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self._way_ref_idx = ref_idx
+        self._way_ids = np.frombuffer(c.way_ids, dtype=np.int64).copy()
+        self._way_tags = c.way_tags
+        self._way_bounds = self._bounds(ref_idx, self._way_offsets)
+        self._way_row = {int(w): i for i, w in enumerate(self._way_ids)}
+
+        self._rel_ids = np.array(c.rel_ids, dtype=np.int64)
+        self._rel_members = c.rel_members
+        self._rel_tags = c.rel_tags
+        self._rel_bounds = np.array([self._relation_bounds(m) for m in c.rel_members], dtype=np.float64).reshape(-1, 4)
+        self._timestamp = c.timestamp or datetime.fromtimestamp(os.path.getmtime(self.path), timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def _node_index(self, ids: np.ndarray) -> np.ndarray:
+        """Row of each node id in the sorted node arrays, -1 when absent."""
+        if len(self._node_ids) == 0:
+            return np.full(len(ids), -1, dtype=np.int64)
+        pos = np.searchsorted(self._node_ids, ids)
+        pos = np.minimum(pos, len(self._node_ids) - 1)
+        return np.where(self._node_ids[pos] == ids, pos, -1)
+
+    def _bounds(self, ref_idx: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        """(n, 4) [south, west, north, east] per way; NaN for ways without nodes."""
+        n = len(offsets) - 1
+        out = np.full((n, 4), np.nan)
+        nonempty = np.diff(offsets) > 0
+        if ref_idx.size:
+            starts = offsets[:-1][nonempty]
+            lat, lon = self._node_lat[ref_idx], self._node_lon[ref_idx]
+            out[nonempty, 0] = np.minimum.reduceat(lat, starts)
+            out[nonempty, 1] = np.minimum.reduceat(lon, starts)
+            out[nonempty, 2] = np.maximum.reduceat(lat, starts)
+            out[nonempty, 3] = np.maximum.reduceat(lon, starts)
+        return out
+
+    def _relation_bounds(self, members: List[Tuple[str, int]]) -> List[float]:
+        boxes = []
+        node_refs = np.array([ref for t, ref in members if t == 'node'], dtype=np.int64)
+        idx = self._node_index(node_refs)
+        idx = idx[idx >= 0]
+        if idx.size:
+            lat, lon = self._node_lat[idx], self._node_lon[idx]
+            boxes.append([lat.min(), lon.min(), lat.max(), lon.max()])
+        for t, ref in members:
+            row = self._way_row.get(ref) if t == 'way' else None
+            if row is not None and not np.isnan(self._way_bounds[row, 0]):
+                boxes.append(self._way_bounds[row].tolist())
+        if not boxes:
+            return [np.nan] * 4
+        b = np.array(boxes)
+        return [b[:, 0].min(), b[:, 1].min(), b[:, 2].max(), b[:, 3].max()]
+
+    @staticmethod
+    def _overlaps(bounds: np.ndarray, bbox: BBox) -> np.ndarray:
+        south, west, north, east = bbox
+        with np.errstate(invalid='ignore'):
+            return (bounds[:, 0] <= north) & (bounds[:, 2] >= south) & (bounds[:, 1] <= east) & (bounds[:, 3] >= west)
+
+    def _way_hits(self, row: int, bbox: BBox) -> bool:
+        b = self._way_bounds[row]
+        south, west, north, east = bbox
+        if b[0] >= south and b[2] <= north and b[1] >= west and b[3] <= east:
+            return True
+        idx = self._way_ref_idx[self._way_offsets[row]:self._way_offsets[row + 1]]
+        lat, lon = self._node_lat[idx], self._node_lon[idx]
+        if np.any((lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)):
+            return True
+        return len(idx) > 1 and _segments_hit_bbox(lat, lon, bbox)
+
+    def _relation_hits(self, members: List[Tuple[str, int]], bbox: BBox) -> bool:
+        south, west, north, east = bbox
+        idx = self._node_index(np.array([ref for t, ref in members if t == 'node'], dtype=np.int64))
+        idx = idx[idx >= 0]
+        lat, lon = self._node_lat[idx], self._node_lon[idx]
+        if np.any((lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)):
+            return True
+        for t, ref in members:
+            row = self._way_row.get(ref) if t == 'way' else None
+            if row is not None and self._overlaps(self._way_bounds[row:row + 1], bbox)[0] and self._way_hits(row, bbox):
+                return True
+        return False
+
+    def osm3s(self) -> Dict[str, str]:
+        self._load()
+        return {'timestamp_osm_base': self._timestamp, 'copyright': 'OpenStreetMap contributors, ODbL 1.0'}
+
+    @staticmethod
+    def _center(bounds: np.ndarray) -> Dict[str, float]:
+        return {'lat': round((bounds[0] + bounds[2]) / 2.0, 7), 'lon': round((bounds[1] + bounds[3]) / 2.0, 7)}
+
+    def iter_bbox(self, bbox: BBox, filters: List[str], bounds: bool = False) -> Iterator[Dict]:
+        """
+        Matching elements in Overpass output order: nodes, ways, relations,
+        each by id. bounds=True adds each way/relation's extent as
+        'bounds', like Overpass `out center bb`.
+        """
+        self._load()
+        match = filters_predicate(compile_filters(filters))
+        south, west, north, east = bbox
+
+        lat, lon = self._node_lat[self._tagged_node_idx], self._node_lon[self._tagged_node_idx]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        for i in np.flatnonzero(inside)[np.argsort(self._tagged_node_ids[inside], kind='stable')]:
+            tags = self._tagged_node_tags[i]
+            if match(tags):
+                yield {'type': 'node', 'id': int(self._tagged_node_ids[i]), 'lat': float(lat[i]), 'lon': float(lon[i]), 'tags': tags}
+
+        for kind, ids, extents, tag_list in (('way', self._way_ids, self._way_bounds, self._way_tags),
+                                             ('relation', self._rel_ids, self._rel_bounds, self._rel_tags)):
+            candidates = np.flatnonzero(self._overlaps(extents, bbox))
+            for row in candidates[np.argsort(ids[candidates], kind='stable')]:
+                tags = tag_list[row]
+                if not match(tags):
+                    continue
+                hit = self._way_hits(row, bbox) if kind == 'way' else self._relation_hits(self._rel_members[row], bbox)
+                if hit:
+                    b = extents[row]
+                    el = {'type': kind, 'id': int(ids[row]), 'center': self._center(b)}
+                    if bounds:
+                        el['bounds'] = {'minlat': float(b[0]), 'minlon': float(b[1]), 'maxlat': float(b[2]), 'maxlon': float(b[3])}
+                    if tags:
+                        el['tags'] = tags
+                    yield el
+
+    def fetch_bbox(self, bbox: BBox, filters: List[str], snapshot_iso: Optional[str] = None, max_depth: int = 3,
+                   max_elements: Optional[int] = None, max_workers: int = 1) -> Dict:
+        elements = list(self.iter_bbox(bbox, filters))
+        return {'osm3s': self.osm3s(),
+                'elements': elements}
+
+    def fetch_all_chunked(self, bbox: BBox, filters: List[str], snapshot_iso: Optional[str] = None, chunk_size: int = 4,
+                          max_workers: int = 1, max_depth: int = 3) -> Dict:
+        # No server memory limit to stay under: one pass answers every filter
+        return self.fetch_bbox(bbox, filters, snapshot_iso=snapshot_iso)
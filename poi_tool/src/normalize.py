@@ -1,4 +1,4 @@
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
 
 
 TYPE_ORDER = {"node": 0, "way": 1, "relation": 2}
@@ -11,7 +11,11 @@ def _extract_coords(el: Dict) -> Tuple[float, float]:
     return float(center.get('lon')), float(center.get('lat'))
 
 
-def normalize_elements(elements: List[Dict]) -> List[Dict]:
+def normalize_elements(elements: Iterable[Dict]) -> List[Dict]:
+    """
+    Deduplicate by (type, id) and sort into output rows. elements may be a
+    lazy iterator (e.g. OverpassClient.iter_elements); it is consumed once.
+    """
     dedup: Dict[Tuple[str, int], Dict] = {}
     for el in elements:
         etype = el.get('type')
@@ -0,0 +1,126 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Optional
+
+
+def default_cache_dir() -> str:
+    return os.path.join(os.path.dirname(__file__), '..', '.cache', 'overpass')
+
+
+def normalize_query(query: str) -> str:
+    """Strip indentation and blank lines so equivalent queries share a key."""
+    return "\n".join(line.strip() for line in query.splitlines() if line.strip())
+
+
+def is_snapshot_query(query: str) -> bool:
+    return '[date:' in query
+
+
+class OverpassCache:
+    """
+    Content-addressed on-disk cache of Overpass JSON responses.
+
+    Entries are keyed by SHA-256 of endpoint + normalized query and stored
+    gzip-compressed. Snapshot-pinned queries ([date:...]) never expire; live
+    queries expire after ttl_s. Total size is bounded by max_bytes with
+    least-recently-used eviction (file mtime is bumped on every hit).
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl_s: int = 86400, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(endpoint: str, query: str) -> str:
+        s = endpoint + "\n" + normalize_query(query)
+        return hashlib.sha256(s.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json.gz")
+
+    def get(self, endpoint: str, query: str) -> Optional[Dict]:
+        path = self._path(self.key(endpoint, query))
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not entry.get('pinned') and time.time() - entry.get('stored_at', 0) > self.ttl_s:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get('data')
+
+    def put(self, endpoint: str, query: str, data: Dict) -> None:
+        path = self._path(self.key(endpoint, query))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            'endpoint': endpoint,
+            'stored_at': time.time(),
+            'pinned': is_snapshot_query(query),
+            'data': data,
+        }
+        payload = gzip.compress(json.dumps(entry, separators=(',', ':')).encode('utf-8'))
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(payload)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp, path)
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += len(payload) - old_size
+        self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for fn in files:
+                if fn.endswith('.json.gz'):
+                    p = os.path.join(root, fn)
+                    try:
+                        st = os.stat(p)
+                    except OSError:
+                        continue
+                    yield p, st.st_size, st.st_mtime
+
+    def _remove(self, path: str) -> None:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def _evict(self) -> None:
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            if self._total_bytes <= self.max_bytes:
+                return
+            entries = sorted(self._entries(), key=lambda e: e[2])
+            total = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+            self._total_bytes = total
+
+    def clear(self) -> None:
+        for path, _, _ in list(self._entries()):
+            self._remove(path)
@@ -2,58 +2,276 @@ from __future__ import annotations
 
 import time
 import hashlib
-from typing import Dict, List, Tuple, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, FIRST_EXCEPTION
+from typing import Callable, Dict, Iterator, List, Tuple, Optional
 
 import httpx
 
+from .backend import ExtractBackend
+from .overpass_cache import OverpassCache
+from .endpoint_pool import EndpointPool
+from .rate_limit import SlotScheduler, retry_after_s
+from .stream_json import OverpassStreamParser
+from .tags import compile_filters
 
-class OverpassClient:
-    def __init__(self, base_url: str = "https://overpass-api.de/api/interpreter", timeout_s: int = 180):
+try:
+    import h2  # noqa: F401  -- enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class OverpassTruncated(RuntimeError):
+    """Overpass reported a truncated result (timeout, memory or size limit)."""
+
+
+def split_bbox(bbox: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
+    """Split (south, west, north, east) into SW, SE, NW, NE quadrants."""
+    south, west, north, east = bbox
+    mid_lat = (south + north) / 2.0
+    mid_lon = (west + east) / 2.0
+    return [
+        (south, west, mid_lat, mid_lon),
+        (south, mid_lon, mid_lat, east),
+        (mid_lat, west, north, mid_lon),
+        (mid_lat, mid_lon, north, east),
+    ]
+
+
+class OverpassClient(ExtractBackend):
+    """
+    Overpass API client holding one pooled keep-alive HTTP session.
+    Use as a context manager or call close() when done. Requests are queued
+    through a SlotScheduler; pass one in to share it between clients.
+
+    mirrors adds fallback endpoints: each query goes to the healthiest one
+    (see EndpointPool) and, with hedge=True, a duplicate is sent to the
+    next best mirror when the first has not answered within its p95
+    latency. Cache entries are keyed on base_url whichever mirror served.
+    max_elements is the default split threshold of fetch_bbox.
+    """
+
+    def __init__(self, base_url: str = "https://overpass-api.de/api/interpreter", timeout_s: int = 180, cache: Optional[OverpassCache] = None, max_connections: int = 8, scheduler: Optional[SlotScheduler] = None, mirrors: Optional[List[str]] = None, hedge: bool = False, max_elements: Optional[int] = None):
         self.base_url = base_url
+        self.max_elements = max_elements
+        self.pool = EndpointPool([base_url] + list(mirrors or []))
+        self.hedge = hedge and len(self.pool.endpoints) > 1
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_lock = threading.Lock()
         self.timeout_s = timeout_s
+        self.cache = cache
+        self._http = httpx.Client(
+            timeout=timeout_s,
+            headers=self._headers(),
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self.scheduler = scheduler if scheduler is not None else SlotScheduler(self._http)
 
     def _headers(self) -> Dict[str, str]:
         return {
             "User-Agent": "poi_tool/1.0 (deterministic-fetch)",
+            "Accept-Encoding": "gzip, deflate",
         }
 
-    def build_query(self, bbox: Tuple[float, float, float, float], filters: List[str], snapshot_iso: Optional[str] = None) -> str:
+    @property
+    def source(self) -> str:
+        return ','.join(self.pool.endpoints)
+
+    def close(self):
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+        self._http.close()
+
+    def __enter__(self) -> "OverpassClient":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def build_query(self, bbox: Tuple[float, float, float, float], filters: List[str], snapshot_iso: Optional[str] = None,
+                    newer_iso: Optional[str] = None, out: str = "center tags") -> str:
+        """
+        Build an `out center tags` query with one nwr statement per compiled
+        filter. newer_iso keeps only elements changed since that time, and
+        out selects another output mode (e.g. "ids").
+        """
         south, west, north, east = bbox
         date_clause = f'[date:"{snapshot_iso}"]' if snapshot_iso else ''
-        union = "\n  ".join([f"node{flt}({south},{west},{north},{east});\n  way{flt}({south},{west},{north},{east});\n  relation{flt}({south},{west},{north},{east});" for flt in filters])
+        newer = f'(newer:"{newer_iso}")' if newer_iso else ''
+        union = "\n  ".join([f"nwr{flt}({south},{west},{north},{east}){newer};" for flt in compile_filters(filters)])
         q = f"""
         [out:json][timeout:{self.timeout_s}]{date_clause};
         (
           {union}
         );
-        out center tags;
+        out {out};
         """.strip()
         return q
 
-    def fetch(self, query: str, max_retries: int = 5) -> Dict:
+    def _post(self, endpoint: str, query: str) -> Tuple[str, httpx.Response, float]:
+        self.scheduler.acquire(endpoint)
+        t0 = time.monotonic()
+        try:
+            r = self._http.post(endpoint, data={"data": query})
+        except Exception:
+            self.pool.record_error(endpoint)
+            raise
+        finally:
+            self.scheduler.release(endpoint)
+        return endpoint, r, time.monotonic() - t0
+
+    def _hedge_pool(self) -> ThreadPoolExecutor:
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=8)
+            return self._hedge_executor
+
+    def _send(self, query: str) -> Tuple[str, httpx.Response, float]:
+        """Send to the healthiest endpoint, hedging to the runner-up if enabled."""
+        ranked = self.pool.ranked()
+        primary = ranked[0]
+        p95 = self.pool.p95(primary) if self.hedge else None
+        if p95 is None:
+            return self._post(primary, query)
+        ex = self._hedge_pool()
+        futures = [ex.submit(self._post, primary, query)]
+        done, _ = wait(futures, timeout=p95)
+        if not done:
+            futures.append(ex.submit(self._post, ranked[1], query))
+        pending = set(futures)
+        last_exc: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None:
+                    return f.result()
+                last_exc = f.exception()
+        assert last_exc is not None
+        raise last_exc
+
+    def fetch(self, query: str, max_retries: int = 5, retry_truncated: bool = True) -> Dict:
+        """
+        POST a query and return the decoded JSON, retrying with exponential
+        backoff. With retry_truncated=False a truncation remark or client
+        timeout is raised immediately so the caller can shrink the query.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(self.base_url, query)
+            if cached is not None:
+                return cached
         backoff = 1.0
         last_exc: Optional[Exception] = None
         for attempt in range(max_retries):
+            deferred = False
             try:
-                with httpx.Client(timeout=self.timeout_s) as client:
-                    r = client.post(self.base_url, data={"data": query}, headers=self._headers())
+                endpoint, r, latency_s = self._send(query)
                 if r.status_code in (429, 504, 502, 503):
+                    self.pool.record_error(endpoint)
+                    wait_s = retry_after_s(r)
+                    if wait_s is None and r.status_code == 429:
+                        wait_s = backoff
+                    if wait_s is not None:
+                        # Let the scheduler hold every query to this endpoint;
+                        # with mirrors the retry goes to the next healthiest one
+                        self.scheduler.defer(endpoint, wait_s)
+                        deferred = True
                     raise httpx.HTTPStatusError("Overpass busy", request=r.request, response=r)
+                if r.status_code >= 400:
+                    self.pool.record_error(endpoint)
                 r.raise_for_status()
                 data = r.json()
+                self.pool.record_success(endpoint, latency_s, data.get('osm3s', {}).get('timestamp_osm_base'))
                 # Completeness checks
-                if 'remark' in data and any(k in str(data['remark']).lower() for k in ["too many", "timeout", "runtime error", "limited"]):
-                    raise RuntimeError(f"Overpass remark indicates truncation: {data['remark']}")
+                if self._is_truncated(data):
+                    raise OverpassTruncated(f"Overpass remark indicates truncation: {data['remark']}")
                 if 'elements' not in data:
                     raise RuntimeError("Overpass returned no elements")
+                if self.cache is not None:
+                    self.cache.put(self.base_url, query, data)
                 return data
             except Exception as e:
+                if not retry_truncated and isinstance(e, (OverpassTruncated, httpx.TimeoutException)):
+                    raise
                 last_exc = e
-                time.sleep(backoff)
+                if not deferred:
+                    time.sleep(backoff)
                 backoff = min(backoff * 2.0, 30.0)
         assert last_exc is not None
         raise last_exc
 
+    @staticmethod
+    def _is_truncated(data: Dict) -> bool:
+        return 'remark' in data and any(k in str(data['remark']).lower() for k in ["too many", "timeout", "runtime error", "limited"])
+
+    def iter_elements(self, query: str, header: Optional[Dict] = None, max_retries: int = 5) -> Iterator[Dict]:
+        """
+        Yield the query's elements one at a time while the response body is
+        still downloading, so peak memory is one element plus the read
+        buffer. The other top-level members (osm3s, remark, ...) are stored
+        into header once the stream ends; a truncation remark raises
+        OverpassTruncated at that point. Cache hits are replayed, but
+        streamed responses are not written to the cache. Busy-server
+        errors are retried only until the first element has been yielded.
+        """
+        if header is None:
+            header = {}
+        if self.cache is not None:
+            cached = self.cache.get(self.base_url, query)
+            if cached is not None:
+                header.update({k: v for k, v in cached.items() if k != 'elements'})
+                yield from cached.get('elements', [])
+                return
+        backoff = 1.0
+        for attempt in range(max_retries):
+            endpoint = self.pool.ranked()[0]
+            parser = OverpassStreamParser()
+            yielded = False
+            wait_s: Optional[float] = None
+            busy = False
+            self.scheduler.acquire(endpoint)
+            t0 = time.monotonic()
+            try:
+                with self._http.stream("POST", endpoint, data={"data": query}) as r:
+                    if r.status_code in (429, 504, 502, 503):
+                        busy = True
+                        wait_s = retry_after_s(r)
+                    else:
+                        r.raise_for_status()
+                        for chunk in r.iter_bytes():
+                            for el in parser.feed(chunk):
+                                yielded = True
+                                yield el
+                        for el in parser.close():
+                            yield el
+            except httpx.HTTPError:
+                if yielded or attempt == max_retries - 1:
+                    self.pool.record_error(endpoint)
+                    raise
+                busy = True
+            except ValueError:
+                # Cut-short or garbled body: count it against the mirror like fetch() does
+                self.pool.record_error(endpoint)
+                raise
+            finally:
+                self.scheduler.release(endpoint)
+            if busy:
+                if attempt == max_retries - 1:
+                    raise RuntimeError(f"Overpass busy after {max_retries} attempts")
+                self.pool.record_error(endpoint)
+                if wait_s is not None:
+                    self.scheduler.defer(endpoint, wait_s)
+                else:
+                    time.sleep(backoff)
+                backoff = min(backoff * 2.0, 30.0)
+                continue
+            header.update(parser.header)
+            self.pool.record_success(endpoint, time.monotonic() - t0, header.get('osm3s', {}).get('timestamp_osm_base'))
+            if self._is_truncated(header):
+                raise OverpassTruncated(f"Overpass remark indicates truncation: {header['remark']}")
+            return
+
     @staticmethod
     def elements_id_hash(elements: List[Dict]) -> str:
         type_order = {"node": "0", "way": "1", "relation": "2"}
@@ -62,17 +280,31 @@ class OverpassClient:
         concat = "|".join(ids)
         return hashlib.sha256(concat.encode('utf-8')).hexdigest()
 
-    def fetch_all_chunked(self, bbox: Tuple[float, float, float, float], filters: List[str], snapshot_iso: Optional[str] = None, chunk_size: int = 4) -> Dict:
+    @staticmethod
+    def _run_parallel(jobs: List[Callable[[], Dict]], max_workers: int) -> List[Dict]:
         """
-        Split the big union into multiple smaller queries to avoid OOM on Overpass.
-        Aggregate elements and osm3s metadata; last osm3s wins.
+        Run jobs on a thread pool of at most max_workers and return their
+        results in job order. The first failure cancels the jobs that have
+        not started yet and is re-raised.
         """
+        if max_workers <= 1 or len(jobs) <= 1:
+            return [job() for job in jobs]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as ex:
+            futures = [ex.submit(job) for job in jobs]
+            done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+            for f in done:
+                if f.exception() is not None:
+                    for p in pending:
+                        p.cancel()
+                    raise f.exception()
+            return [f.result() for f in futures]
+
+    @staticmethod
+    def _merge_results(results: List[Dict]) -> Dict:
+        """Merge responses in order, deduplicated by (type, id); last osm3s wins."""
         all_elements: Dict[Tuple[str, int], Dict] = {}
         osm3s = {}
-        for i in range(0, len(filters), chunk_size):
-            chunk = filters[i:i+chunk_size]
-            q = self.build_query(bbox, chunk, snapshot_iso=snapshot_iso)
-            data = self.fetch(q)
+        for data in results:
             osm3s = data.get('osm3s', osm3s)
             for el in data.get('elements', []):
                 key = (el.get('type'), el.get('id'))
@@ -81,4 +313,40 @@ class OverpassClient:
                 all_elements[key] = el
         return { 'osm3s': osm3s, 'elements': list(all_elements.values()) }
 
+    def fetch_bbox(self, bbox: Tuple[float, float, float, float], filters: List[str], snapshot_iso: Optional[str] = None, max_depth: int = 3, max_elements: Optional[int] = None, max_workers: int = 1, _depth: int = 0) -> Dict:
+        """
+        Fetch filters inside bbox, recursively splitting the bbox into
+        quadrants when Overpass truncates or times out, or when a response
+        reaches max_elements (by default the client's). Quadrants are
+        fetched with up to max_workers threads and merged deduplicated by
+        (type, id). At max_depth the query falls back to plain retries.
+        """
+        can_split = _depth < max_depth
+        if max_elements is None:
+            max_elements = self.max_elements
+        query = self.build_query(bbox, filters, snapshot_iso=snapshot_iso)
+        try:
+            data = self.fetch(query, retry_truncated=not can_split)
+            if not can_split or max_elements is None or len(data.get('elements', [])) < max_elements:
+                return data
+        except (OverpassTruncated, httpx.TimeoutException):
+            if not can_split:
+                raise
+        jobs = [
+            lambda b=b: self.fetch_bbox(b, filters, snapshot_iso=snapshot_iso, max_depth=max_depth, max_elements=max_elements, max_workers=max_workers, _depth=_depth + 1)
+            for b in split_bbox(bbox)
+        ]
+        return self._merge_results(self._run_parallel(jobs, max_workers))
 
+    def fetch_all_chunked(self, bbox: Tuple[float, float, float, float], filters: List[str], snapshot_iso: Optional[str] = None, chunk_size: int = 4, max_workers: int = 1, max_depth: int = 3) -> Dict:
+        """
+        Split the big union into multiple smaller queries to avoid OOM on Overpass.
+        Up to max_workers chunks are fetched concurrently, and each chunk's
+        bbox is split adaptively (see fetch_bbox). Results are merged in chunk
+        order, keyed by (type, id), so the output does not depend on
+        completion order; last osm3s wins.
+        """
+        filters = compile_filters(filters)
+        chunks = [filters[i:i+chunk_size] for i in range(0, len(filters), chunk_size)]
+        jobs = [lambda c=c: self.fetch_bbox(bbox, c, snapshot_iso=snapshot_iso, max_depth=max_depth) for c in chunks]
+        return self._merge_results(self._run_parallel(jobs, max_workers))
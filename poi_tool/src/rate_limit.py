@@ -0,0 +1,182 @@
+import re
+import time
+import threading
+from typing import Dict, List, Optional
+
+import httpx
+
+
+def status_url(endpoint: str) -> str:
+    """Map .../api/interpreter to .../api/status."""
+    base = endpoint.rstrip('/')
+    if base.endswith('/interpreter'):
+        base = base[:-len('/interpreter')]
+    return base + '/status'
+
+
+def parse_status(text: str) -> Dict:
+    """
+    Parse the plain-text /api/status page of an Overpass server.
+    Returns {'rate_limit': int, 'available': int, 'waits_s': [float, ...]}.
+    rate_limit 0 means the server does not limit this client.
+    """
+    m = re.search(r'Rate limit:\s*(\d+)', text)
+    rate_limit = int(m.group(1)) if m else 0
+    m = re.search(r'(\d+)\s+slots? available now', text)
+    available = int(m.group(1)) if m else 0
+    waits = [float(w) for w in re.findall(r'Slot available after:[^\n]*?in\s+(-?\d+)\s+seconds?', text)]
+    return {'rate_limit': rate_limit, 'available': available, 'waits_s': sorted(max(w, 0.0) for w in waits)}
+
+
+def retry_after_s(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+class _EndpointState:
+    def __init__(self, default_slots: int):
+        self.default_slots = default_slots
+        self.in_flight = 0
+        self.not_before = 0.0
+        # Last /api/status reading; None until read or when unavailable
+        self.rate_limit: Optional[int] = None
+        self.free_at_refresh = 0
+        self.release_times: List[float] = []
+        self.taken_since_refresh = 0
+        self.refreshed_at = float('-inf')
+        self.stale = True
+        # A query finished, so the server may have a slot free again
+        self.released = False
+        self.refreshing = False
+        # The server answered without a status page; never poll it again
+        self.no_status = False
+
+    def tokens(self, now: float) -> int:
+        if self.rate_limit is None:
+            return self.default_slots - self.in_flight
+        if self.rate_limit == 0:
+            return 1
+        released = sum(1 for t in self.release_times if t <= now)
+        return self.free_at_refresh + released - self.taken_since_refresh
+
+
+class SlotScheduler:
+    """
+    Per-endpoint token bucket fed by the server's /api/status slot report.
+
+    acquire() blocks until the endpoint has a free slot (and any Retry-After
+    deferral has passed); release() is called when the query finishes. The
+    status page is re-read after one of our queries finishes and, while
+    our view has no tokens, at most every status_ttl_s, so queries are
+    queued locally instead of being fired into a guaranteed 429. Endpoints
+    without a status page fall back to default_slots concurrent queries
+    and are not polled again once the page is found missing.
+    """
+
+    def __init__(self, http: Optional[httpx.Client] = None, default_slots: int = 2, status_ttl_s: float = 2.0, poll_s: float = 1.0):
+        self._http = http
+        self.default_slots = default_slots
+        self.status_ttl_s = status_ttl_s
+        self.poll_s = poll_s
+        self._cond = threading.Condition()
+        self._states: Dict[str, _EndpointState] = {}
+
+    def _state(self, endpoint: str) -> _EndpointState:
+        if endpoint not in self._states:
+            self._states[endpoint] = _EndpointState(self.default_slots)
+        return self._states[endpoint]
+
+    def _fetch_status(self, endpoint: str) -> Optional[str]:
+        """Status page text; '' when the server has none (404), None when it could not be read."""
+        try:
+            if self._http is not None:
+                r = self._http.get(status_url(endpoint), timeout=10)
+            else:
+                r = httpx.get(status_url(endpoint), timeout=10)
+            if r.status_code == 404:
+                return ''
+            if r.status_code != 200:
+                return None
+            return r.text
+        except httpx.HTTPError:
+            return None
+
+    def _apply_status(self, state: _EndpointState, text: Optional[str]) -> None:
+        now = time.monotonic()
+        state.refreshed_at = now
+        state.stale = False
+        if text is None or 'Rate limit' not in text:
+            state.rate_limit = None
+            # An answer without a slot report will not grow one; errors may pass
+            state.no_status = text is not None
+            return
+        st = parse_status(text)
+        state.rate_limit = st['rate_limit']
+        state.free_at_refresh = st['available']
+        state.release_times = [now + w for w in st['waits_s']]
+        state.taken_since_refresh = 0
+
+    def _refresh(self, endpoint: str, state: _EndpointState) -> None:
+        """
+        Re-read endpoint's status page. Called with the condition held; the
+        lock is dropped for the HTTP request so a slow status page does not
+        stall the other endpoints. Other acquirers of this endpoint wait
+        for the result.
+        """
+        state.refreshing = True
+        state.released = False
+        self._cond.release()
+        try:
+            text = self._fetch_status(endpoint)
+        finally:
+            self._cond.acquire()
+            state.refreshing = False
+            self._cond.notify_all()
+        self._apply_status(state, text)
+
+    def acquire(self, endpoint: str) -> None:
+        with self._cond:
+            state = self._state(endpoint)
+            while True:
+                now = time.monotonic()
+                if now < state.not_before:
+                    self._cond.wait(state.not_before - now)
+                    continue
+                if state.refreshing:
+                    self._cond.wait(self.poll_s)
+                    continue
+                # Re-read right after one of our queries finished; status_ttl_s
+                # only paces polling while no slot is free
+                if not state.no_status and (state.released or (state.stale and now - state.refreshed_at >= self.status_ttl_s)):
+                    self._refresh(endpoint, state)
+                    continue
+                if state.tokens(now) > 0:
+                    state.in_flight += 1
+                    state.taken_since_refresh += 1
+                    return
+                pending = [t for t in state.release_times if t > now]
+                wait_s = (min(pending) - now) if pending else self.poll_s
+                state.stale = True
+                self._cond.wait(max(min(wait_s, self.poll_s * 5), 0.05))
+
+    def release(self, endpoint: str) -> None:
+        with self._cond:
+            state = self._state(endpoint)
+            state.in_flight = max(state.in_flight - 1, 0)
+            # Without a limit (or a status page) in_flight is the whole story
+            if state.rate_limit:
+                state.released = True
+            self._cond.notify_all()
+
+    def defer(self, endpoint: str, seconds: float) -> None:
+        """Hold all queries to endpoint for seconds (e.g. from Retry-After)."""
+        with self._cond:
+            state = self._state(endpoint)
+            state.not_before = max(state.not_before, time.monotonic() + seconds)
+            state.stale = True
+            self._cond.notify_all()
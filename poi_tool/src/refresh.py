@@ -0,0 +1,84 @@
+from typing import Dict, Iterable, List, Set, Tuple
+
+from .io_utils import read_outputs, write_outputs
+from .normalize import TYPE_ORDER, normalize_elements
+from .overpass_client import OverpassClient
+from .tags import tagset_hash
+
+Key = Tuple[str, int]
+
+
+def apply_changes(rows: List[Dict], changed: Iterable[Dict], current_ids: Set[Key]) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    Update stored rows with a change set.
+
+    changed holds Overpass elements modified or created since the last
+    run; current_ids is every (type, id) that matches the filters now.
+    Rows no longer in current_ids are deleted (removed from OSM, retagged
+    or moved out of the bbox) unless they appear in changed. Returns the
+    rows sorted like normalize_elements, and created/modified/deleted
+    counts.
+    """
+    by_key: Dict[Key, Dict] = {(r['type'], r['id']): r for r in rows}
+    updates = {(r['type'], r['id']): r for r in normalize_elements(changed)}
+    stats = {'created': 0, 'modified': 0, 'deleted': 0}
+    for key in list(by_key):
+        if key not in current_ids and key not in updates:
+            del by_key[key]
+            stats['deleted'] += 1
+    for key, row in updates.items():
+        stats['modified' if key in by_key else 'created'] += 1
+        by_key[key] = row
+    merged = sorted(by_key.values(), key=lambda r: (TYPE_ORDER[r['type']], r['id']))
+    return merged, stats
+
+
+def refresh_site(client: OverpassClient, out_dir: str, filters: List[str]) -> Dict:
+    """
+    Bring the outputs in out_dir up to date with two small Overpass
+    queries instead of a full extraction:
+
+    1. the site's filters restricted to (newer:"<osm_base_ts>"), with
+       `out center tags`, for creates and modifies;
+    2. the same filters without the newer clause and `out ids`, which
+       lists what matches now, so rows missing from it are deletes.
+
+    Augmented diffs ([adiff:...]) would report deletes directly, but
+    Overpass only serves them as XML. Ways whose nodes moved while the
+    way itself stayed untouched keep their old center until a full
+    extraction. The outputs are rewritten with write_outputs in the format
+    and compression they were found in, which recomputes id_list_sha256;
+    osm_base_ts advances to the change query's timestamp.
+    csv-stream outputs carry no tags, so unchanged rows stay tagless.
+    """
+    rows, meta, fmt, compression = read_outputs(out_dir)
+    since = meta.get('osm_base_ts')
+    if not since:
+        raise ValueError(f"{out_dir} has no osm_base_ts to refresh from")
+    if meta.get('tagset_hash') != tagset_hash(filters):
+        raise ValueError(f"{out_dir} was extracted with different tags; run a full extraction instead")
+
+    bbox = tuple(meta['bbox_wgs84'])
+    changed = client.fetch(client.build_query(bbox, filters, newer_iso=since))
+    current = client.fetch(client.build_query(bbox, filters, out="ids"))
+    current_ids = {(el['type'], el['id']) for el in current.get('elements', [])}
+    new_rows, stats = apply_changes(rows, changed.get('elements', []), current_ids)
+
+    meta = dict(meta)
+    meta['refreshed_from_osm_base_ts'] = since
+    meta['osm_base_ts'] = changed.get('osm3s', {}).get('timestamp_osm_base') or since
+    meta.pop('id_list_sha256', None)
+    write_outputs(new_rows, out_dir, meta, fmt, compression)
+    return dict(stats, rows=len(new_rows), osm_base_ts=meta['osm_base_ts'])
+
+
+def refresh_sites(client: OverpassClient, out_dirs: List[str], filters: List[str]) -> List[Dict]:
+    """refresh_site for every directory; failures are reported and skipped."""
+    summary = []
+    for d in out_dirs:
+        try:
+            summary.append(dict(refresh_site(client, d, filters), outdir=d))
+        except Exception as e:
+            print(f"Refresh of {d} failed: {e}")
+            summary.append({'outdir': d, 'error': str(e)})
+    return summary
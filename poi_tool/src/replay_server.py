@@ -0,0 +1,293 @@
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from .backend import BBox
+from .overpass_cache import OverpassCache, normalize_query
+from .tags import filters_predicate
+
+DEFAULT_RECORDED_ENDPOINT = "https://overpass-api.de/api/interpreter"
+
+# Tag vocabulary of synthesized elements, close to config/tags.yml
+SYNTH_TAGS: List[Tuple[str, str]] = [
+    ('amenity', 'cafe'), ('amenity', 'restaurant'), ('amenity', 'school'), ('amenity', 'bank'),
+    ('amenity', 'pharmacy'), ('amenity', 'parking'), ('shop', 'supermarket'), ('shop', 'bakery'),
+    ('shop', 'clothes'), ('leisure', 'park'), ('leisure', 'playground'), ('tourism', 'hotel'),
+    ('tourism', 'museum'), ('historic', 'monument'), ('office', 'company'), ('healthcare', 'clinic'),
+]
+
+TRUNCATION_REMARK = 'runtime error: Query ran out of memory in "query" at line 3.'
+TIMEOUT_REMARK = 'runtime error: Query timed out in "query" at line 3 after 180 seconds.'
+
+_STATEMENT_RE = re.compile(r'^nwr(?P<filter>.*)\((?P<bbox>[-+\d.eE]+(?:,[-+\d.eE]+){3})\)(?P<newer>\(newer:"[^"]*"\))?;$')
+_OUT_RE = re.compile(r'^out\s*(?P<mode>[^;]*);$')
+
+Fault = Union[int, str, None]
+
+
+def parse_query(query: str) -> Tuple[List[Tuple[str, BBox, bool]], str]:
+    """
+    Read back a query from OverpassClient.build_query: a list of
+    (filter, bbox, has_newer) statements and the out mode.
+    """
+    statements = []
+    mode = 'center tags'
+    for line in normalize_query(query).splitlines():
+        m = _STATEMENT_RE.match(line)
+        if m:
+            bbox = tuple(float(v) for v in m.group('bbox').split(','))
+            statements.append((m.group('filter'), bbox, m.group('newer') is not None))
+            continue
+        m = _OUT_RE.match(line)
+        if m:
+            mode = m.group('mode').strip()
+    return statements, mode
+
+
+class SyntheticWorld:
+    """
+    A fixed, seeded set of POI elements spread uniformly over bbox.
+
+    Element i is a node, way or relation (roughly 80/15/5) with one tag
+    from SYNTH_TAGS and, mostly, a name. Ways and relations are points
+    with a 'center', like `out center`. Every query is answered from the
+    same set, so split or chunked queries merge back to the unsplit result.
+    """
+
+    def __init__(self, count: int, bbox: BBox = (0.0, 0.0, 1.0, 1.0), seed: int = 0):
+        rng = np.random.default_rng(seed)
+        south, west, north, east = bbox
+        self.lat = np.round(rng.uniform(south, north, count), 7)
+        self.lon = np.round(rng.uniform(west, east, count), 7)
+        self.type_code = rng.choice(3, size=count, p=[0.8, 0.15, 0.05]).astype(np.int8)
+        self.kind = rng.integers(0, len(SYNTH_TAGS), count)
+        self.named = rng.random(count) < 0.7
+        # Sequential ids per type, in element order
+        self.ids = np.zeros(count, dtype=np.int64)
+        for t in range(3):
+            mask = self.type_code == t
+            self.ids[mask] = np.arange(1, int(mask.sum()) + 1)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def element(self, i: int, ids_only: bool = False) -> Dict:
+        t = ('node', 'way', 'relation')[self.type_code[i]]
+        el: Dict = {'type': t, 'id': int(self.ids[i])}
+        if ids_only:
+            return el
+        lat, lon = float(self.lat[i]), float(self.lon[i])
+        if t == 'node':
+            el['lat'], el['lon'] = lat, lon
+        else:
+            el['center'] = {'lat': lat, 'lon': lon}
+        el['tags'] = self.tags(i)
+        return el
+
+    def tags(self, i: int) -> Dict[str, str]:
+        key, value = SYNTH_TAGS[self.kind[i]]
+        tags = {key: value}
+        if self.named[i]:
+            tags['name'] = f"{value.capitalize()} {self.ids[i]}"
+        return tags
+
+    def query(self, statements: List[Tuple[str, BBox, bool]]) -> List[int]:
+        """Positions matching any statement, in element order. The world never changes, so (newer:...) matches nothing."""
+        hit = np.zeros(len(self), dtype=bool)
+        for flt, (south, west, north, east), newer in statements:
+            if newer:
+                continue
+            match = filters_predicate([flt])
+            cand = np.flatnonzero(~hit & (self.lat >= south) & (self.lat <= north) & (self.lon >= west) & (self.lon <= east))
+            for i in cand.tolist():
+                if match(self.tags(i)):
+                    hit[i] = True
+        return np.flatnonzero(hit).tolist()
+
+
+class ReplayServer:
+    """
+    Local stand-in for an Overpass interpreter, for tests and benchmarks
+    without network access.
+
+    A query is answered from recordings when it has one: an OverpassCache
+    directory filled by earlier runs (e.g. --cache-dir), looked up under
+    recorded_endpoint with no expiry. Otherwise it is answered from a
+    SyntheticWorld of synth_elements elements, or with no elements.
+
+    Faults are injected before answering. faults is a script consumed one
+    entry per request (an HTTP status such as 429 or 504, 'truncate',
+    'timeout' or None for a normal answer); after it runs out, error_rate
+    and truncate_rate draw from a seeded RNG. Busy responses carry
+    Retry-After when retry_after_s is set. With max_elements, larger
+    results are cut short with an out-of-memory remark, as Overpass does.
+    rate_limit > 0 answers 429 above that many concurrent queries and is
+    reported on /api/status. Every request is appended to self.log, and
+    self.connections counts accepted connections.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, recorded_endpoint: str = DEFAULT_RECORDED_ENDPOINT,
+                 synth_elements: int = 0, synth_bbox: BBox = (0.0, 0.0, 1.0, 1.0), seed: int = 0,
+                 latency_s: float = 0.0, jitter_s: float = 0.0, faults: Sequence[Fault] = (),
+                 error_rate: float = 0.0, error_codes: Sequence[int] = (429, 504), truncate_rate: float = 0.0,
+                 retry_after_s: Optional[float] = None, max_elements: Optional[int] = None, rate_limit: int = 0,
+                 osm_base_ts: str = "2025-09-01T00:00:00Z", host: str = "127.0.0.1", port: int = 0):
+        self.recordings = OverpassCache(cache_dir, ttl_s=10 ** 12) if cache_dir else None
+        self.recorded_endpoint = recorded_endpoint
+        self.world = SyntheticWorld(synth_elements, synth_bbox, seed) if synth_elements else None
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.faults = list(faults)
+        self.error_rate = error_rate
+        self.error_codes = list(error_codes)
+        self.truncate_rate = truncate_rate
+        self.retry_after_s = retry_after_s
+        self.max_elements = max_elements
+        self.rate_limit = rate_limit
+        self.osm_base_ts = osm_base_ts
+        self.log: List[Dict] = []
+        self.connections = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api/interpreter"
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "ReplayServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _next_fault(self) -> Fault:
+        with self._lock:
+            if self.faults:
+                return self.faults.pop(0)
+            if self.error_codes and self._rng.random() < self.error_rate:
+                return self._rng.choice(self.error_codes)
+            if self._rng.random() < self.truncate_rate:
+                return 'truncate'
+            return None
+
+    def _delay(self) -> float:
+        with self._lock:
+            return self.latency_s + (self._rng.uniform(0.0, self.jitter_s) if self.jitter_s else 0.0)
+
+    def status_text(self) -> str:
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        with self._lock:
+            free = max(self.rate_limit - self._in_flight, 0) if self.rate_limit else 0
+        return (f"Connected as: 2130706433\nCurrent time: {now}\nAnnounced endpoint: none\n"
+                f"Rate limit: {self.rate_limit}\n{free} slots available now.\n"
+                "Currently running queries (pid, space limit, time limit, start time):\n")
+
+    def answer(self, query: str, fault: Fault = None) -> Tuple[int, Dict]:
+        """Status code and JSON body for query, given the fault drawn for it."""
+        if isinstance(fault, int):
+            return fault, {'remark': f"replay: injected HTTP {fault}"}
+        data = self.recordings.get(self.recorded_endpoint, query) if self.recordings else None
+        if data is None:
+            statements, mode = parse_query(query)
+            positions = self.world.query(statements) if self.world is not None else []
+            ids_only = mode == 'ids'
+            data = {
+                'version': 0.6,
+                'generator': 'poi_tool replay server',
+                'osm3s': {'timestamp_osm_base': self.osm_base_ts, 'copyright': 'Synthetic data'},
+                'elements': [self.world.element(i, ids_only) for i in positions],
+            }
+        elements = data.get('elements', [])
+        if fault in ('truncate', 'timeout'):
+            # Overpass sends what it had so far plus the remark
+            remark = TRUNCATION_REMARK if fault == 'truncate' else TIMEOUT_REMARK
+            data = dict(data, elements=elements[:len(elements) // 2], remark=remark)
+        elif self.max_elements is not None and len(elements) > self.max_elements:
+            data = dict(data, elements=elements[:self.max_elements], remark=TRUNCATION_REMARK)
+        return 200, data
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; without this Nagle
+            # plus delayed ACK adds ~40 ms to every keep-alive request
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path.endswith('/status'):
+                    self._send(200, server.status_text().encode('utf-8'), 'text/plain')
+                    return
+                self._interpret(parse_qs(parts.query).get('data', [''])[0])
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                form = parse_qs(self.rfile.read(length).decode('utf-8'))
+                self._interpret(form.get('data', [''])[0])
+
+            def _interpret(self, query: str):
+                with server._lock:
+                    server._in_flight += 1
+                    busy = server.rate_limit and server._in_flight > server.rate_limit
+                try:
+                    fault = 429 if busy else server._next_fault()
+                    time.sleep(server._delay())
+                    status, data = server.answer(query, fault)
+                finally:
+                    with server._lock:
+                        server._in_flight -= 1
+                headers = {}
+                if status in (429, 503, 504) and server.retry_after_s is not None:
+                    headers['Retry-After'] = str(server.retry_after_s)
+                with server._lock:
+                    server.log.append({'status': status, 'fault': fault, 'elements': len(data.get('elements', [])),
+                                       'truncated': 'remark' in data, 'query': query})
+                self._send(status, json.dumps(data, separators=(',', ':')).encode('utf-8'), 'application/json', headers)
+
+        return Handler
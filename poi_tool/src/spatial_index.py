@@ -0,0 +1,188 @@
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .backend import BBox, ExtractBackend
+from .columnar import TYPE_NAMES, ElementTable
+from .tags import compile_filters, filters_predicate, uncovered_filters
+
+INDEX_VERSION = 2
+_ARRAYS = ('keys', 'rank', 'type_code', 'ids', 'lat', 'lon', 'extent', 'name_idx',
+           'tag_offsets', 'tag_keys', 'tag_values', 'oversize')
+
+
+def _extent(el: Dict) -> List[float]:
+    b = el.get('bounds')
+    if b:
+        return [b['minlat'], b['minlon'], b['maxlat'], b['maxlon']]
+    if el.get('type') == 'node':
+        return [el['lat'], el['lon'], el['lat'], el['lon']]
+    c = el.get('center') or {}
+    return [c['lat'], c['lon'], c['lat'], c['lon']]
+
+
+class SpatialIndex(ExtractBackend):
+    """
+    Persistent POI store with a sorted grid-key index, memory-mapped from disk.
+
+    Elements are bucketed into cells of cell_deg degrees keyed by
+    row * ncols + col of their output coordinate; the arrays are stored
+    sorted by that key, so a bbox query is one searchsorted range per
+    cell row followed by an exact extent-overlap test on the candidates.
+    Elements wider than a cell (big parks, admin relations) live in a
+    small side list that is always tested. Extents come from Overpass-style
+    'bounds' (LocalOSMBackend.iter_bbox(bounds=True) or `out center bb`);
+    without them an element is a point. A way or relation is returned
+    when its extent overlaps the window, a superset of Overpass' exact
+    geometry test.
+
+    Rows come back exactly as normalize_elements would build them for the
+    matching elements, and the index also serves as an ExtractBackend.
+    An index built from filtered elements records those filters and
+    refuses queries for tags it may not hold.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'index.json'), 'r') as f:
+            info = json.load(f)
+        if info.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported spatial index version in {path}: {info.get('version')}; rebuild it with poiextract index")
+        self.cell_deg = info['cell_deg']
+        self.ncols = info['ncols']
+        self._osm3s = info.get('osm3s', {})
+        self.filters: Optional[List[str]] = info.get('filters')
+        with open(os.path.join(path, 'strings.json'), 'r', encoding='utf-8') as f:
+            self.strings: List[str] = json.load(f)
+        for name in _ARRAYS:
+            # Plain ndarray views over the mapped files skip np.memmap's per-op overhead
+            setattr(self, name, np.asarray(np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')))
+
+    @classmethod
+    def build(cls, elements: Iterable[Dict], path: str, cell_deg: float = 0.01, osm3s: Optional[Dict] = None,
+              filters: Optional[List[str]] = None) -> "SpatialIndex":
+        """
+        Write an index of elements (deduplicated like normalize_elements) to
+        path and open it. filters are the tag filters elements were selected
+        with, or None when they are complete.
+        """
+        elements = list(elements)
+        table = ElementTable.from_elements(elements)
+        extents: Dict[tuple, List[float]] = {}
+        for el in elements:
+            if el.get('type') in TYPE_NAMES and el.get('id') is not None:
+                extents[(el['type'], int(el['id']))] = _extent(el)
+        extent = np.array([extents[(t, i)] for t, i in zip(table.types().tolist(), table.ids.tolist())],
+                          dtype=np.float64).reshape(-1, 4)
+
+        ncols = int(np.ceil(360.0 / cell_deg))
+        keys = cls._cell_row(table.lat, cell_deg) * ncols + cls._cell_col(table.lon, cell_deg, ncols)
+        wide = np.maximum(extent[:, 2] - extent[:, 0], extent[:, 3] - extent[:, 1]) > cell_deg
+        order = np.argsort(keys, kind='stable')
+
+        # Reorder every row-aligned array by cell key; tag runs follow their rows
+        counts = np.diff(table.tag_offsets)[order]
+        offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        gather = np.repeat(table.tag_offsets[:-1][order] - offsets[:-1], counts) + np.arange(offsets[-1])
+        arrays = {
+            # rank: position in normalize_elements order, restored after a query
+            'keys': keys[order], 'rank': order.astype(np.int64), 'type_code': table.type_code[order], 'ids': table.ids[order],
+            'lat': table.lat[order], 'lon': table.lon[order], 'extent': extent[order],
+            'name_idx': table.name_idx[order], 'tag_offsets': offsets,
+            'tag_keys': table.tag_keys[gather], 'tag_values': table.tag_values[gather],
+            'oversize': np.flatnonzero(wide[order]).astype(np.int64),
+        }
+        os.makedirs(path, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), arrays[name])
+        with open(os.path.join(path, 'strings.json'), 'w', encoding='utf-8') as f:
+            json.dump(table.strings, f, ensure_ascii=False)
+        with open(os.path.join(path, 'index.json'), 'w') as f:
+            json.dump({'version': INDEX_VERSION, 'cell_deg': cell_deg, 'ncols': ncols, 'count': len(table),
+                       'osm3s': osm3s or {}, 'filters': sorted(set(filters)) if filters is not None else None},
+                      f, indent=2)
+        return cls(path)
+
+    @staticmethod
+    def _cell_row(lat, cell_deg: float) -> np.ndarray:
+        return np.floor((np.asarray(lat, dtype=np.float64) + 90.0) / cell_deg).astype(np.int64)
+
+    @staticmethod
+    def _cell_col(lon, cell_deg: float, ncols: int) -> np.ndarray:
+        return np.clip(np.floor((np.asarray(lon, dtype=np.float64) + 180.0) / cell_deg).astype(np.int64), 0, ncols - 1)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def query_index(self, bbox: BBox) -> np.ndarray:
+        """Positions of elements whose extent overlaps bbox, in normalize_elements order."""
+        south, west, north, east = bbox
+        # Narrow elements lie within one cell of the window, so widen by a cell
+        r0, r1 = self._cell_row([south - self.cell_deg, north + self.cell_deg], self.cell_deg)
+        c0, c1 = self._cell_col([west - self.cell_deg, east + self.cell_deg], self.cell_deg, self.ncols)
+        rows = np.arange(r0, r1 + 1, dtype=np.int64) * self.ncols
+        lo = np.searchsorted(self.keys, rows + c0, side='left')
+        hi = np.searchsorted(self.keys, rows + c1, side='right')
+        spans = [np.arange(a, b) for a, b in zip(lo.tolist(), hi.tolist()) if b > a]
+        cand = np.concatenate(spans) if spans else np.empty(0, dtype=np.int64)
+        if len(self.oversize):
+            cand = np.union1d(cand, self.oversize)
+        ext = self.extent[cand]
+        hit = cand[(ext[:, 0] <= north) & (ext[:, 2] >= south) & (ext[:, 1] <= east) & (ext[:, 3] >= west)]
+        return hit[np.argsort(self.rank[hit], kind='stable')]
+
+    def missing_filters(self, filters: List[str]) -> List[str]:
+        """Filters this index cannot answer completely, because it was built without their keys."""
+        if self.filters is None:
+            return []
+        return uncovered_filters(self.filters, filters)
+
+    def query_rows(self, bbox: BBox, filters: Optional[List[str]] = None) -> List[Dict]:
+        """normalize_elements rows for elements in bbox, optionally limited to tag filters."""
+        missing = self.missing_filters(filters) if filters else []
+        if missing:
+            raise ValueError(f"Spatial index {self.path} was built without {', '.join(missing)}")
+        match = filters_predicate(compile_filters(filters)) if filters else None
+        idx = self.query_index(bbox)
+        # Pull every column (and the hits' tag runs) out in one gather each
+        starts = self.tag_offsets[idx]
+        counts = self.tag_offsets[idx + 1] - starts
+        ends = np.cumsum(counts).tolist()
+        gather = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(ends[-1] if ends else 0)
+        s = self.strings
+        keys = [s[k] for k in self.tag_keys[gather].tolist()]
+        values = [s[v] for v in self.tag_values[gather].tolist()]
+        rows = []
+        lo = 0
+        for t, eid, y, x, n, hi in zip(self.type_code[idx].tolist(), self.ids[idx].tolist(), self.lat[idx].tolist(),
+                                       self.lon[idx].tolist(), self.name_idx[idx].tolist(), ends):
+            tags = dict(zip(keys[lo:hi], values[lo:hi]))
+            lo = hi
+            if match is not None and not match(tags):
+                continue
+            rows.append({'type': TYPE_NAMES[t], 'id': eid, 'lat': y, 'lon': x, 'name': s[n], 'tags': tags})
+        return rows
+
+    @property
+    def source(self) -> str:
+        return 'index://' + os.path.abspath(self.path)
+
+    def fetch_bbox(self, bbox: BBox, filters: List[str], snapshot_iso: Optional[str] = None, max_depth: int = 3,
+                   max_elements: Optional[int] = None, max_workers: int = 1) -> Dict:
+        elements = []
+        for r in self.query_rows(bbox, filters):
+            if r['type'] == 'node':
+                el = {'type': 'node', 'id': r['id'], 'lat': r['lat'], 'lon': r['lon']}
+            else:
+                el = {'type': r['type'], 'id': r['id'], 'center': {'lat': r['lat'], 'lon': r['lon']}}
+            if r['tags']:
+                el['tags'] = r['tags']
+            elements.append(el)
+        return {'osm3s': dict(self._osm3s), 'elements': elements}
+
+    def fetch_all_chunked(self, bbox: BBox, filters: List[str], snapshot_iso: Optional[str] = None, chunk_size: int = 4,
+                          max_workers: int = 1, max_depth: int = 3) -> Dict:
+        return self.fetch_bbox(bbox, filters, snapshot_iso=snapshot_iso)
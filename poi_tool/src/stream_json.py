@@ -0,0 +1,143 @@
+import json
+import codecs
+from typing import Dict, List
+
+_WS = ' \t\n\r'
+
+
+class OverpassStreamParser:
+    """
+    Incremental parser for an Overpass JSON response body.
+
+    feed() takes raw bytes as they arrive and returns the members of the
+    top-level "elements" array that are complete so far, so the full body is
+    never held in memory. Every other top-level member (version, osm3s,
+    remark, ...) is collected into header. close() checks the document
+    ended cleanly.
+    """
+
+    def __init__(self):
+        self.header: Dict = {}
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._pos = 0
+        self._state = 'start'
+        self._key = None
+
+    def _skip_ws(self) -> bool:
+        """Advance past whitespace; False if the buffer ran out."""
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in _WS:
+            pos += 1
+        self._pos = pos
+        return pos < len(buf)
+
+    def _expect(self, ch: str) -> bool:
+        if not self._skip_ws():
+            return False
+        if self._buf[self._pos] != ch:
+            raise ValueError(f"Expected {ch!r} at offset {self._pos}, got {self._buf[self._pos]!r}")
+        self._pos += 1
+        return True
+
+    def _decode(self, final: bool):
+        """Decode one JSON value at the cursor; None if more input is needed."""
+        if not self._skip_ws():
+            return None
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None
+        # A bare number (e.g. "0" of "0.6") is only complete once a delimiter follows
+        if not final and self._buf[self._pos] not in '{["tfn':
+            if end == len(self._buf) or self._buf[end] not in _WS + ',]}':
+                return None
+        self._pos = end
+        return (value,)
+
+    def feed(self, data: bytes, final: bool = False) -> List[Dict]:
+        self._buf = self._buf[self._pos:] + self._utf8.decode(data, final)
+        self._pos = 0
+        out: List[Dict] = []
+        while True:
+            state = self._state
+            if state == 'start':
+                if not self._expect('{'):
+                    break
+                self._state = 'key_or_end'
+            elif state in ('key_or_end', 'key'):
+                if not self._skip_ws():
+                    break
+                if state == 'key_or_end' and self._buf[self._pos] == '}':
+                    self._pos += 1
+                    self._state = 'done'
+                    continue
+                decoded = self._decode(final)
+                if decoded is None:
+                    break
+                self._key = decoded[0]
+                self._state = 'colon'
+            elif state == 'colon':
+                if not self._expect(':'):
+                    break
+                self._state = 'value'
+            elif state == 'value':
+                if self._key == 'elements':
+                    if not self._expect('['):
+                        break
+                    self._state = 'element_or_end'
+                    continue
+                decoded = self._decode(final)
+                if decoded is None:
+                    break
+                self.header[self._key] = decoded[0]
+                self._state = 'member_sep'
+            elif state in ('element_or_end', 'element'):
+                if not self._skip_ws():
+                    break
+                if state == 'element_or_end' and self._buf[self._pos] == ']':
+                    self._pos += 1
+                    self._state = 'member_sep'
+                    continue
+                decoded = self._decode(final)
+                if decoded is None:
+                    break
+                out.append(decoded[0])
+                self._state = 'element_sep'
+            elif state == 'element_sep':
+                if not self._skip_ws():
+                    break
+                ch = self._buf[self._pos]
+                self._pos += 1
+                if ch == ',':
+                    self._state = 'element'
+                elif ch == ']':
+                    self._state = 'member_sep'
+                else:
+                    raise ValueError(f"Unexpected {ch!r} in elements array")
+            elif state == 'member_sep':
+                if not self._skip_ws():
+                    break
+                ch = self._buf[self._pos]
+                self._pos += 1
+                if ch == ',':
+                    self._state = 'key'
+                elif ch == '}':
+                    self._state = 'done'
+                else:
+                    raise ValueError(f"Unexpected {ch!r} after top-level member")
+            else:  # done
+                if self._skip_ws():
+                    raise ValueError("Trailing data after JSON document")
+                break
+        return out
+
+    def close(self) -> List[Dict]:
+        """Flush the remaining input; raises if the document is incomplete."""
+        out = self.feed(b'', final=True)
+        if self._state != 'done':
+            raise ValueError("Truncated Overpass JSON response")
+        return out
@@ -1,7 +1,19 @@
-from typing import List
+from typing import Callable, Dict, List, Optional, Set
+import re
 import hashlib
 import yaml
 
+_BARE_RE = re.compile(r'^\["([^"]+)"\]$')
+_EQ_RE = re.compile(r'^\["([^"]+)"="([^"]*)"\]$')
+_ERE_SPECIAL = set('.^$*+?()[]{}|\\')
+_TOKEN = r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|[\w:.-]+'
+_CLAUSE_RE = re.compile(
+    r'\[\s*(?P<neg>!)?\s*(?P<key>' + _TOKEN + r')\s*'
+    r'(?:(?P<op>!=|=|!~|~)\s*(?P<val>' + _TOKEN + r')\s*(?P<ci>,\s*i)?\s*)?\]'
+)
+
+TagPredicate = Callable[[Dict[str, str]], bool]
+
 
 def load_tag_filters(path: str) -> List[str]:
     with open(path, 'r') as f:
@@ -22,7 +34,132 @@ def load_tag_filters(path: str) -> List[str]:
 
 
 def tagset_hash(filters: List[str]) -> str:
+    """
+    Hash of the filter list as loaded from tags.yml. Computed on the
+    uncompiled filters so it does not change with compile_filters().
+    """
     s = "|".join(filters)
     return hashlib.sha256(s.encode('utf-8')).hexdigest()
 
 
+def _ere_escape(value: str) -> str:
+    return ''.join('\\' + ch if ch in _ERE_SPECIAL else ch for ch in value)
+
+
+def compile_filters(filters: List[str]) -> List[str]:
+    """
+    Collapse tag filters into the smallest equivalent set:
+    ["k"="v"] is dropped when ["k"] is present, and several values of one
+    key merge into a single ["k"~"^(a|b)$"] regex filter. Filters in any
+    other form are kept as-is. Output is sorted, so it is deterministic.
+    """
+    bare: Set[str] = set()
+    values: Dict[str, Set[str]] = {}
+    other: Set[str] = set()
+    for flt in filters:
+        m = _BARE_RE.match(flt)
+        if m:
+            bare.add(m.group(1))
+            continue
+        m = _EQ_RE.match(flt)
+        if m:
+            values.setdefault(m.group(1), set()).add(m.group(2))
+            continue
+        other.add(flt)
+
+    compiled = [f'["{key}"]' for key in bare]
+    for key, vals in values.items():
+        if key in bare:
+            continue
+        if len(vals) == 1:
+            compiled.append(f'["{key}"="{next(iter(vals))}"]')
+        else:
+            alternation = '|'.join(_ere_escape(v) for v in sorted(vals))
+            compiled.append(f'["{key}"~"^({alternation})$"]')
+    return sorted(set(compiled) | other)
+
+
+def uncovered_filters(indexed: List[str], requested: List[str]) -> List[str]:
+    """
+    Requested filters that can match elements outside those matching
+    indexed: a filter is covered when indexed holds it (as given or
+    after compile_filters) or a bare ["k"] for one of the keys it requires.
+    """
+    held = set(indexed) | set(compile_filters(indexed))
+    bare = {m.group(1) for m in map(_BARE_RE.match, held) if m}
+    missing = []
+    for flt in sorted(set(requested)):
+        if flt in held or _required_keys(flt) & bare:
+            continue
+        missing.append(flt)
+    return missing
+
+
+def _required_keys(flt: str) -> Set[str]:
+    """Keys every element matching flt carries: those of its ["k"], ["k"="v"] and ["k"~"re"] clauses."""
+    keys = set()
+    pos = 0
+    flt = flt.strip()
+    while pos < len(flt):
+        m = _CLAUSE_RE.match(flt, pos)
+        if not m:
+            break
+        if not m.group('neg') and m.group('op') in (None, '=', '~'):
+            keys.add(_unquote(m.group('key')))
+        pos = m.end()
+        while pos < len(flt) and flt[pos].isspace():
+            pos += 1
+    return keys
+
+
+def _unquote(token: str, regex: bool = False) -> str:
+    """Strip quotes; regex values keep their backslash escapes except before quotes."""
+    if token[:1] not in ('"', "'"):
+        return token
+    return re.sub(r'\\(["\'])' if regex else r'\\(.)', r'\1', token[1:-1])
+
+
+def _clause_predicate(neg: bool, key: str, op: Optional[str], val: Optional[str], ci: bool) -> TagPredicate:
+    if op is None:
+        if neg:
+            return lambda tags: key not in tags
+        return lambda tags: key in tags
+    if op in ('=', '!='):
+        want = op == '='
+        return lambda tags: (tags.get(key) == val) == want
+    pattern = re.compile(val, re.IGNORECASE if ci else 0)
+    want = op == '~'
+    return lambda tags: (key in tags and pattern.search(tags[key]) is not None) == want
+
+
+def filter_predicate(flt: str) -> TagPredicate:
+    """
+    Turn one Overpass QL tag filter into a predicate on a tags dict.
+    Supports ["k"], [!"k"], ["k"="v"], ["k"!="v"], ["k"~"re"], ["k"!~"re"]
+    (with an optional ,i for case-insensitive regexes); consecutive
+    clauses, as in ["amenity"]["name"], must all hold. Like Overpass, !=
+    and !~ also match elements that lack the key.
+    """
+    clauses = []
+    pos = 0
+    flt = flt.strip()
+    while pos < len(flt):
+        m = _CLAUSE_RE.match(flt, pos)
+        if not m:
+            raise ValueError(f"Unsupported tag filter: {flt}")
+        key = _unquote(m.group('key'))
+        op = m.group('op')
+        val = _unquote(m.group('val'), regex=op in ('~', '!~')) if op else None
+        clauses.append(_clause_predicate(bool(m.group('neg')), key, op, val, bool(m.group('ci'))))
+        pos = m.end()
+        while pos < len(flt) and flt[pos].isspace():
+            pos += 1
+    if not clauses:
+        raise ValueError(f"Empty tag filter: {flt!r}")
+    return lambda tags: all(c(tags) for c in clauses)
+
+
+def filters_predicate(filters: List[str]) -> TagPredicate:
+    """Predicate true when any filter matches, like a union of nwr statements."""
+    preds = [filter_predicate(f) for f in filters]
+    return lambda tags: any(p(tags) for p in preds)
@@ -0,0 +1,32 @@
+import pytest
+
+# A small OSM XML extract: tagged nodes, ways with and without tags, and
+# multipolygon-style relations, some outside (0, 0, 1, 1)
+OSM_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6" generator="test" timestamp="2025-09-01T00:00:00Z">
+  <node id="1" lat="0.5" lon="0.5"><tag k="amenity" v="cafe"/><tag k="name" v="Inside"/></node>
+  <node id="2" lat="5.0" lon="5.0"><tag k="amenity" v="cafe"/></node>
+  <node id="3" lat="0.2" lon="0.2"><tag k="shop" v="bakery"/></node>
+  <node id="10" lat="-1.0" lon="0.5"/>
+  <node id="11" lat="2.0" lon="0.5"/>
+  <node id="12" lat="0.1" lon="0.1"/>
+  <node id="13" lat="0.1" lon="0.3"/>
+  <node id="14" lat="0.3" lon="0.3"/>
+  <node id="20" lat="3.0" lon="3.0"/>
+  <node id="21" lat="3.0" lon="4.0"/>
+  <way id="100"><nd ref="10"/><nd ref="11"/><tag k="highway" v="bus_stop"/></way>
+  <way id="101"><nd ref="12"/><nd ref="13"/><nd ref="14"/><nd ref="12"/><tag k="leisure" v="park"/></way>
+  <way id="102"><nd ref="20"/><nd ref="21"/><tag k="leisure" v="park"/></way>
+  <way id="103"><nd ref="12"/><nd ref="13"/></way>
+  <relation id="200"><member type="way" ref="103" role="outer"/><tag k="amenity" v="school"/></relation>
+  <relation id="201"><member type="way" ref="102" role="outer"/><tag k="amenity" v="school"/></relation>
+</osm>
+"""
+
+
+@pytest.fixture
+def osm_extract(tmp_path):
+    """Path of OSM_XML written to an .osm file."""
+    path = tmp_path / "extract.osm"
+    path.write_text(OSM_XML)
+    return str(path)
@@ -0,0 +1,66 @@
+import csv
+import json
+import os
+import threading
+
+from src.cli import load_manifest, run_batch
+from src.overpass_client import OverpassClient
+
+TAGS = os.path.join(os.path.dirname(__file__), '..', 'config', 'tags.yml')
+
+
+class FakeClient(OverpassClient):
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def fetch_all_chunked(self, bbox, filters, snapshot_iso=None, chunk_size=4, max_workers=1, max_depth=3):
+        self.threads.add(threading.get_ident())
+        if bbox[0] > 50:
+            raise RuntimeError("Overpass busy")
+        base = int(bbox[0] * 1000)
+        els = [{"type": "node", "id": base + k, "lat": bbox[0], "lon": bbox[1], "tags": {"name": f"n{k}"}} for k in range(3)]
+        return {"osm3s": {"timestamp_osm_base": snapshot_iso or "live"}, "elements": els}
+
+
+def test_manifest_formats_and_slugs(tmp_path):
+    csv_path = tmp_path / "sites.csv"
+    csv_path.write_text("site,address,lat,lon,snapshot\nParc A,,48.87,2.38,2025-09-01\nParc A,,48.88,2.39,\n")
+    yml_path = tmp_path / "sites.yml"
+    yml_path.write_text("sites:\n  - { site: Parc A, lat: 48.87, lon: 2.38, snapshot: 2025-09-01 }\n"
+                        "  - { site: Parc A, lat: 48.88, lon: 2.39 }\n")
+    from_csv = load_manifest(str(csv_path))
+    assert from_csv == load_manifest(str(yml_path))
+    assert [s['slug'] for s in from_csv] == ['parc-a', 'parc-a-1']
+    assert from_csv[0]['snapshot'] == '2025-09-01' and from_csv[1]['snapshot'] is None
+
+
+def test_manifest_tags_are_relative_to_the_manifest(tmp_path, monkeypatch):
+    (tmp_path / "sites").mkdir()
+    manifest = tmp_path / "sites" / "sites.yml"
+    manifest.write_text(f"- {{ site: A, lat: 1, lon: 1, tags: custom.yml }}\n- {{ site: B, lat: 2, lon: 2, tags: {TAGS} }}\n")
+    monkeypatch.chdir(tmp_path)
+    sites = load_manifest("sites/sites.yml")
+    assert sites[0]['tags'] == os.path.join("sites", "custom.yml")
+    assert sites[1]['tags'] == TAGS
+
+
+def test_batch_writes_per_site_and_combined_outputs(tmp_path):
+    manifest = tmp_path / "sites.csv"
+    manifest.write_text("site,lat,lon,snapshot\nOne,40.0,-74.0,2025-09-01\nTwo,41.0,-73.0,\nBroken,51.0,0.0,\n")
+    client = FakeClient()
+    summary = run_batch(load_manifest(str(manifest)), client, str(tmp_path / "out"), tags=TAGS, max_workers=3)
+
+    assert [s['slug'] for s in summary] == ['one', 'two', 'broken']
+    assert summary[2]['error'] == "Overpass busy"
+    assert summary[0]['rows'] == summary[1]['rows'] == 3
+    with open(tmp_path / "out" / "one" / "pois.json") as f:
+        meta = json.load(f)['meta']
+    assert meta['osm_base_ts'] == '2025-09-01T00:00:00Z'
+    assert meta['id_list_sha256'] == summary[0]['id_list_sha256']
+    assert not os.path.exists(tmp_path / "out" / "broken" / "pois.csv")
+
+    with open(tmp_path / "out" / "combined.csv", newline='') as f:
+        combined = list(csv.DictReader(f))
+    assert [r['site'] for r in combined] == ['One'] * 3 + ['Two'] * 3
+    assert len(client.threads) > 1  # sites ran on the shared client concurrently
@@ -0,0 +1,106 @@
+import glob
+import itertools
+import json
+import os
+
+from src.classify import load_category_rules
+from src.extractor import map_to_detailed_category
+
+OUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'out')
+
+
+def legacy_map_to_detailed_category(tags):
+    """The hard-coded chain the rule table replaced, kept as the oracle."""
+    if tags.get("amenity") == "school" and tags.get("school:type") in ["public", "state"]:
+        return "Public Schools"
+    if tags.get("amenity") == "school" and not tags.get("school:type") in ["private", "religious"]:
+        return "Public Schools"
+    if tags.get("public_transport") in ["station", "stop_position", "platform"]:
+        return "Public Transit Lines"
+    if tags.get("route") in ["subway", "bus", "tram", "light_rail"]:
+        return "Public Transit Lines"
+    if tags.get("highway") == "bus_stop":
+        return "Public Transit Lines"
+    if tags.get("leisure") in ["park", "recreation_ground", "playground", "garden"]:
+        return "Parks and Recreational Areas"
+    if tags.get("landuse") == "recreation_ground":
+        return "Parks and Recreational Areas"
+    if tags.get("amenity") in ["community_centre", "social_facility", "civic"]:
+        return "Community Services"
+    if tags.get("office") == "ngo":
+        return "Community Services"
+    if tags.get("amenity") in ["cafe", "coffee_shop"]:
+        return "Cafés"
+    if tags.get("shop") == "coffee":
+        return "Cafés"
+    if tags.get("amenity") in ["bar", "pub", "nightclub"]:
+        return "Bars"
+    if tags.get("shop") == "alcohol":
+        return "Bars"
+    if tags.get("amenity") == "library":
+        return "Libraries"
+    if tags.get("building") == "house":
+        return "Single-Family Houses"
+    if tags.get("building") in ["apartments", "residential"]:
+        return "Residential Buildings"
+    if tags.get("building") == "detached":
+        return "Detached Houses"
+    if tags.get("building") == "semi_detached":
+        return "Semi-Detached Houses"
+    if tags.get("building") == "terrace":
+        return "Terraced Houses"
+    if tags.get("landuse") == "residential":
+        return "Residential Areas"
+    if tags.get("amenity") == "housing":
+        return "Housing Facilities"
+    if tags.get("amenity"):
+        return "amenity"
+    if tags.get("historic"):
+        return "historic"
+    if tags.get("leisure"):
+        return "leisure"
+    if tags.get("shop"):
+        return "shop"
+    if tags.get("tourism"):
+        return "tourism"
+    if tags.get("landuse"):
+        return "landuse"
+    return "other"
+
+
+def _fixture_tags():
+    tags = []
+    for path in sorted(glob.glob(os.path.join(OUT_DIR, '*', 'pois.json'))):
+        with open(path, 'r') as f:
+            tags.extend(r.get('tags') or {} for r in json.load(f)['rows'])
+    return tags
+
+
+def _synthetic_tags():
+    values = {
+        "amenity": [None, "", "school", "cafe", "bar", "housing", "civic", "bench"],
+        "school:type": [None, "public", "private", "religious", "charter"],
+        "shop": [None, "coffee", "alcohol", "bakery"],
+        "building": [None, "house", "terrace", "yes"],
+        "landuse": [None, "residential", "recreation_ground", "retail"],
+        "leisure": [None, "park", "pitch"],
+        "office": [None, "ngo"],
+        "tourism": [None, "museum"],
+    }
+    keys = list(values)
+    for combo in itertools.product(*(values[k] for k in keys)):
+        yield {k: v for k, v in zip(keys, combo) if v is not None}
+
+
+def test_rule_table_matches_legacy_chain_on_recorded_outputs():
+    tags = _fixture_tags()
+    assert len(tags) > 100
+    classifier = load_category_rules()
+    assert classifier.classify_many(tags) == [legacy_map_to_detailed_category(t) for t in tags]
+    assert [map_to_detailed_category(t) for t in tags] == [legacy_map_to_detailed_category(t) for t in tags]
+
+
+def test_rule_table_matches_legacy_chain_on_tag_combinations():
+    classifier = load_category_rules()
+    tags = list(_synthetic_tags())
+    assert classifier.classify_many(tags) == [legacy_map_to_detailed_category(t) for t in tags]
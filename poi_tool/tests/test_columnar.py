@@ -0,0 +1,83 @@
+import glob
+import json
+import os
+import random
+import tracemalloc
+
+import pytest
+
+from src.columnar import ElementTable
+from src.normalize import normalize_elements
+
+OUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'out')
+
+
+def _synthetic_elements(n, seed=0):
+    rng = random.Random(seed)
+    kinds = ["cafe", "bar", "school", "bench", "library"]
+    for _ in range(n):
+        etype = rng.choice(["node", "way", "relation"])
+        eid = rng.randrange(n // 2 + 1)  # plenty of duplicates
+        tags = {"amenity": rng.choice(kinds)}
+        if rng.random() < 0.7:
+            tags["name"] = f"Place {rng.randrange(200)}"
+        if rng.random() < 0.3:
+            tags["opening_hours"] = "Mo-Fr 08:00-18:00"
+        el = {"type": etype, "id": eid, "tags": tags} if rng.random() < 0.9 else {"type": etype, "id": eid}
+        if etype == "node":
+            el.update(lat=rng.uniform(-60, 60), lon=rng.uniform(-180, 180))
+        else:
+            el["center"] = {"lat": rng.uniform(-60, 60), "lon": rng.uniform(-180, 180)}
+        yield el
+
+
+def test_table_rows_match_normalize_elements():
+    els = list(_synthetic_elements(5000))
+    els.append({"type": "area", "id": 1})
+    table = ElementTable.from_elements(iter(els))
+    assert table.to_rows() == normalize_elements(els)
+    assert len(table) == len(normalize_elements(els))
+
+
+def test_table_rows_match_recorded_outputs():
+    for path in sorted(glob.glob(os.path.join(OUT_DIR, '*', 'pois.json'))):
+        with open(path, 'r') as f:
+            rows = json.load(f)['rows']
+        els = [{"type": r['type'], "id": r['id'], "lat": r['lat'], "lon": r['lon'],
+                "center": {"lat": r['lat'], "lon": r['lon']}, "tags": r['tags']} for r in reversed(rows)]
+        assert ElementTable.from_elements(els).to_rows() == normalize_elements(els)
+
+
+def test_to_pandas_columns():
+    table = ElementTable.from_elements(_synthetic_elements(200))
+    df = table.to_pandas(include_tags=True)
+    rows = table.to_rows()
+    assert list(df.columns) == ['type', 'id', 'lat', 'lon', 'name', 'tags']
+    assert df['id'].tolist() == [r['id'] for r in rows]
+    assert df['type'].astype(str).tolist() == [r['type'] for r in rows]
+    assert df['tags'].tolist() == [r['tags'] for r in rows]
+
+
+def test_table_uses_far_less_memory_than_row_dicts():
+    n = 20000
+    tracemalloc.start()
+    rows = normalize_elements(_synthetic_elements(n))
+    rows_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del rows
+
+    tracemalloc.start()
+    table = ElementTable.from_elements(_synthetic_elements(n))
+    table_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert table_bytes * 3 < rows_bytes
+    assert len(table) > 0
+
+
+def test_to_arrow_map_column():
+    pa = pytest.importorskip("pyarrow")
+    table = ElementTable.from_elements(_synthetic_elements(100))
+    at = table.to_arrow({"tagset_hash": "abc"})
+    assert at.schema.field('tags').type == pa.map_(pa.string(), pa.string())
+    assert at.schema.metadata[b"tagset_hash"] == b"abc"
+    assert [dict(t) for t in at.column('tags').to_pylist()] == [r['tags'] for r in table.to_rows()]
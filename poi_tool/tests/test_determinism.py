@@ -25,5 +25,3 @@ def test_snapshot_flag_builds_date_clause():
     c = OverpassClient()
     q = c.build_query((0,0,1,1), ['["amenity"]'], snapshot_iso='2025-09-01T00:00:00Z')
     assert '[date:"2025-09-01T00:00:00Z"]' in q
-
-
@@ -0,0 +1,39 @@
+import time
+
+import httpx
+
+from src.endpoint_pool import EndpointPool
+from src.overpass_client import OverpassClient
+
+
+def test_ranking_prefers_fast_healthy_fresh_mirrors():
+    pool = EndpointPool(["a", "b", "c", "d"])
+    assert pool.ranked() == ["a", "b", "c", "d"]
+    pool.record_success("a", 2.0, "2025-09-22T13:00:00Z")
+    pool.record_success("b", 0.5, "2025-09-22T13:00:00Z")
+    pool.record_success("c", 0.1, "2025-09-22T10:00:00Z")  # fast but 3h behind
+    pool.record_error("d")
+    assert pool.ranked() == ["b", "a", "d", "c"]
+    for _ in range(4):
+        pool.record_error("b")
+    assert pool.ranked()[0] == "a"
+
+
+def test_hedged_request_returns_first_answer():
+    class SlowPrimary(OverpassClient):
+        def _post(self, endpoint, query):
+            t0 = time.monotonic()
+            time.sleep(1.0 if endpoint == "http://a" else 0.05)
+            r = httpx.Response(200, json={"elements": [], "osm3s": {"timestamp_osm_base": "t"}},
+                               request=httpx.Request("POST", endpoint))
+            self.pool.record_success(endpoint, time.monotonic() - t0)
+            return endpoint, r, time.monotonic() - t0
+
+    with SlowPrimary(base_url="http://a", mirrors=["http://b"], hedge=True) as c:
+        for _ in range(3):
+            c.pool.record_success("http://a", 0.1)
+            c.pool.record_success("http://b", 0.2)
+        t0 = time.monotonic()
+        endpoint, r, _ = c._send("q")
+        assert endpoint == "http://b"
+        assert time.monotonic() - t0 < 0.9
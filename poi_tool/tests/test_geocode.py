@@ -0,0 +1,89 @@
+import json
+import multiprocessing
+import time
+from types import SimpleNamespace
+
+from src import geocode
+from src.geocode import GeocodeCache, RateLimiter, cached_geocode, iter_geocode
+
+
+class FakeGeolocator:
+    def __init__(self):
+        self.calls = []
+
+    def geocode(self, address, exactly_one=True, addressdetails=False):
+        self.calls.append(address)
+        if address == "nowhere":
+            return None
+        return SimpleNamespace(latitude=48.0 + len(address) / 100, longitude=2.0)
+
+
+def test_hits_misses_and_negative_ttl(tmp_path, monkeypatch):
+    geo = FakeGeolocator()
+    monkeypatch.setattr(geocode, "get_geolocator", lambda: geo)
+    cache = GeocodeCache(str(tmp_path / "geocode.sqlite"), negative_ttl_s=60)
+
+    assert cached_geocode("Paris", cache) == (48.05, 2.0)
+    assert cached_geocode("Paris", cache) == (48.05, 2.0)
+    assert cached_geocode("nowhere", cache) == (None, None)
+    assert cached_geocode("nowhere", cache) == (None, None)
+    assert geo.calls == ["Paris", "nowhere"]
+
+    # A fresh instance (empty LRU) reads the same rows back from SQLite
+    reopened = GeocodeCache(cache.path, negative_ttl_s=60)
+    assert reopened.get("Paris") == (48.05, 2.0)
+    assert reopened.get("nowhere") == (None, None)
+
+    # Expired negatives are looked up again; positives never expire
+    later = time.time() + 120
+    monkeypatch.setattr(geocode.time, "time", lambda: later)
+    assert reopened.get("nowhere") is None
+    assert reopened.get("Paris") == (48.05, 2.0)
+
+
+def test_legacy_json_is_migrated(tmp_path):
+    (tmp_path / "geocode.json").write_text(json.dumps({"Rome": [41.9, 12.5]}))
+    cache = GeocodeCache(str(tmp_path / "geocode.sqlite"))
+    assert cache.get("Rome") == (41.9, 12.5)
+    assert not (tmp_path / "geocode.json").exists()
+    assert (tmp_path / "geocode.json.migrated").exists()
+
+
+def _write_many(args):
+    path, worker = args
+    cache = GeocodeCache(path)
+    for k in range(50):
+        cache.put(f"addr-{worker}-{k}", float(worker), float(k))
+    return worker
+
+
+def test_concurrent_writers_from_process_pool(tmp_path):
+    path = str(tmp_path / "geocode.sqlite")
+    GeocodeCache(path).get("warm-up")  # create the schema once
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        assert sorted(pool.map(_write_many, [(path, w) for w in range(4)])) == [0, 1, 2, 3]
+    cache = GeocodeCache(path)
+    assert all(cache.get(f"addr-{w}-{k}") == (float(w), float(k)) for w in range(4) for k in range(50))
+
+
+def test_batch_geocode_dedupes_serves_hits_first_and_rate_limits(tmp_path, monkeypatch):
+    geo = FakeGeolocator()
+    monkeypatch.setattr(geocode, "get_geolocator", lambda: geo)
+    cache = GeocodeCache(str(tmp_path / "geocode.sqlite"))
+    cache.put("Madrid", 40.4, -3.7)
+
+    limiter = RateLimiter(0.05)
+    t0 = time.monotonic()
+    out = list(iter_geocode(["Rome", "  rome ", "Madrid", "Oslo", "nowhere"], cache, limiter))
+    elapsed = time.monotonic() - t0
+
+    assert out[0] == ("Madrid", (40.4, -3.7))
+    assert dict(out)["  rome "] == dict(out)["Rome"]
+    assert dict(out)["nowhere"] == (None, None)
+    assert geo.calls == ["Rome", "Oslo", "nowhere"]
+    assert elapsed >= 0.05 * 2
+
+    # Second pass is served entirely from the cache
+    geo.calls.clear()
+    again = geocode.batch_geocode(["ROME", "Oslo", "nowhere"], cache, limiter)
+    assert geo.calls == [] and again["ROME"] == dict(out)["Rome"]
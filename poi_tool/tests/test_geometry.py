@@ -0,0 +1,24 @@
+import numpy as np
+from geopy.distance import geodesic
+
+from src.geometry import bbox_wgs84_for_square_m, bboxes_wgs84_for_squares_m, geodesic_km, haversine_km
+
+
+def test_batch_bboxes_match_scalar():
+    lats = np.array([40.0, -33.8688, 55.6761, 35.6717, 40.0])
+    lons = np.array([-74.0, 151.2093, 12.5683, 139.765, -74.0])
+    out = bboxes_wgs84_for_squares_m(lats, lons, 1000)
+    for row, lat, lon in zip(out, lats, lons):
+        s, w, n, e, zone = bbox_wgs84_for_square_m(lat, lon, 1000)
+        assert tuple(row[:4]) == (s, w, n, e)
+        assert int(row[4]) == zone
+
+
+def test_vectorized_distances_match_geopy():
+    lat0, lon0 = 48.8566, 2.3522
+    lats = np.array([48.86, 48.0, 51.5074, -33.8688, lat0])
+    lons = np.array([2.36, 2.0, -0.1278, 151.2093, lon0])
+    ref = np.array([geodesic((lat0, lon0), (a, b)).km for a, b in zip(lats, lons)])
+    assert np.allclose(geodesic_km(lat0, lon0, lats, lons), ref, rtol=0, atol=1e-6)
+    hav = haversine_km(lat0, lon0, lats, lons)
+    assert np.all(np.abs(hav - ref) <= 0.006 * ref + 1e-9)
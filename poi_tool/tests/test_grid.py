@@ -0,0 +1,158 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from geopy.distance import geodesic
+
+from src import extractor
+from src.checkpoint import GridCheckpoint
+
+
+def test_bin_to_grid_assigns_each_poi_to_one_cell():
+    lat, lon, g = 40.0, -74.0, 0.5
+    # Points exactly on the boundary between cells 0 and 1 fall into cell 1
+    edge_lat = lat + 0.5 * g / extractor.KM_PER_DEGREE
+    i, j = extractor._bin_to_grid([lat, edge_lat, lat - 0.001], [lon, lon, lon], lat, lon, g)
+    assert list(i) == [0, 1, 0]
+    assert list(j) == [0, 0, 0]
+    assert i.dtype == np.int64
+
+
+def test_single_fetch_grid_uses_one_query(monkeypatch):
+    lat, lon, g = 40.0, -74.0, 0.5
+    calls = []
+
+    def fake_query(bbox, latitude, longitude, distance_mode="geodesic"):
+        calls.append(bbox)
+        return pd.DataFrame([
+            {"name": "A", "category": "Cafés", "latitude": lat, "longitude": lon, "distance_from_center_km": 0.0},
+            {"name": "B", "category": "Bars", "latitude": lat + 0.0001, "longitude": lon, "distance_from_center_km": 0.01},
+            {"name": "C", "category": "Bars", "latitude": lat + g / extractor.KM_PER_DEGREE, "longitude": lon, "distance_from_center_km": 0.5},
+        ])
+
+    monkeypatch.setattr(extractor, "_query_detailed_pois", fake_query)
+    df = extractor.create_grid_analysis(lat, lon, grid_size_km=g, search_radius_km=1.0)
+    assert len(calls) == 1
+    assert list(df['grid_id']) == ["grid_0_0", "grid_1_0"]
+    assert list(df['Bars_count']) == [1, 1]
+    assert list(df['Cafés_count']) == [1, 0]
+
+    vdf = extractor.create_grid_analysis_vertical(lat, lon, grid_size_km=g, search_radius_km=1.0)
+    assert len(calls) == 2
+    assert list(vdf['poi_name']) == ["A", "B", "C"]
+    assert vdf['count'].sum() == 3
+
+
+def test_grid_cells_match_per_cell_geodesic_loop():
+    lat, lon, g, r = 55.6761, 12.5683, 0.5, 2.0
+    half = int(np.ceil(r / g))
+    expected = []
+    for i in range(-half, half + 1):
+        for j in range(-half, half + 1):
+            clat = lat + i * g / 111.0
+            clon = lon + j * g / (111.0 * np.cos(np.radians(lat)))
+            d = geodesic((lat, lon), (clat, clon)).km
+            if d <= r:
+                expected.append((i, j))
+    assert [(c[0], c[1]) for c in extractor._grid_cells(lat, lon, g, r)] == expected
+
+
+def test_per_cell_parallel_matches_sequential(monkeypatch):
+    lock = threading.Lock()
+    running = {"now": 0, "peak": 0}
+
+    def fake_query(bbox, latitude, longitude, distance_mode="geodesic"):
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        try:
+            time.sleep(0.02)
+        finally:
+            with lock:
+                running["now"] -= 1
+        if latitude > 40.004:
+            raise RuntimeError("Overpass busy")
+        return pd.DataFrame([{"name": "X", "category": "Bars", "latitude": latitude, "longitude": longitude,
+                              "distance_from_center_km": 0.0}])
+
+    monkeypatch.setattr(extractor, "_query_detailed_pois", fake_query)
+    kwargs = dict(grid_size_km=0.5, search_radius_km=1.0, single_fetch=False)
+    seq = extractor.create_grid_analysis(40.0, -74.0, max_workers=1, **kwargs)
+    assert running["peak"] == 1
+    par = extractor.create_grid_analysis(40.0, -74.0, max_workers=8, **kwargs)
+    assert 1 < running["peak"] <= 8
+    pd.testing.assert_frame_equal(seq, par)
+    assert "grid_2_0" not in set(par['grid_id'])  # failed cell left out
+    assert len(par.attrs['cell_timings']) == len(par)
+
+
+def test_checkpointed_per_cell_run_resumes(monkeypatch, tmp_path):
+    calls = []
+    failing = {"on": True}
+
+    def fake_query(bbox, latitude, longitude, distance_mode="geodesic"):
+        calls.append((latitude, longitude))
+        if failing["on"] and latitude > 40.004 and longitude == -74.0:
+            raise RuntimeError("Overpass busy")
+        if longitude > -74.0:
+            return pd.DataFrame(columns=["name", "category", "latitude", "longitude", "distance_from_center_km"])
+        return pd.DataFrame([{"name": "X", "category": "Bars", "latitude": latitude, "longitude": longitude,
+                              "distance_from_center_km": 0.1}])
+
+    monkeypatch.setattr(extractor, "_query_detailed_pois", fake_query)
+    kwargs = dict(grid_size_km=0.5, search_radius_km=1.0, single_fetch=False, max_workers=4)
+    params = {"lat": 40.0, "lon": -74.0, **kwargs}
+    ckpt = GridCheckpoint.for_run(params, str(tmp_path))
+
+    first = extractor.create_grid_analysis(40.0, -74.0, checkpoint=ckpt, **kwargs)
+    n_cells = len(calls)
+    assert len(ckpt.load()) == n_cells - 1  # the failed cell is not recorded
+
+    failing["on"] = False
+    calls.clear()
+    resumed = extractor.create_grid_analysis(40.0, -74.0, checkpoint=ckpt, **kwargs)
+    assert calls == [(pytest.approx(40.0 + 0.5 / 111.0), -74.0)]
+    assert len(ckpt.load()) == n_cells
+
+    calls.clear()
+    fresh = extractor.create_grid_analysis(40.0, -74.0, **kwargs)
+    assert len(calls) == n_cells
+    pd.testing.assert_frame_equal(resumed, fresh)
+    assert len(resumed) == len(first) + 1
+
+    # A torn trailing line from an interrupted write is ignored
+    with open(ckpt.path, "a") as f:
+        f.write('{"cell": "grid_9_9", "ro')
+    assert len(ckpt.load()) == n_cells
+
+    # and the next run's appends are not glued onto it
+    reopened = GridCheckpoint(ckpt.path)
+    reopened.append("grid_9_9", [])
+    reopened.append("grid_9_8", [])
+    done = reopened.load()
+    assert len(done) == n_cells + 2 and done["grid_9_9"] == []
+    with open(ckpt.path) as f:
+        assert all(line.startswith('{"cell":') for line in f)
+    assert GridCheckpoint.for_run({**params, "lat": 41.0}, str(tmp_path)).path != ckpt.path
+
+
+def test_lazy_client_is_created_once_across_threads(monkeypatch):
+    created = []
+
+    def slow_client(**kwargs):
+        time.sleep(0.02)
+        created.append(object())
+        return created[-1]
+
+    monkeypatch.setattr(extractor, "_overpass_client", None)
+    monkeypatch.setattr(extractor, "OverpassClient", slow_client)
+    monkeypatch.setattr(extractor, "OverpassCache", lambda: None)
+    threads = [threading.Thread(target=extractor.get_overpass_client) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(created) == 1
+    assert extractor.get_overpass_client() is created[0]
@@ -0,0 +1,47 @@
+import json
+
+from src import extractor
+from src.cli import extract_site
+from src.local_osm import LocalOSMBackend
+from src.normalize import normalize_elements
+
+BBOX = (0.0, 0.0, 1.0, 1.0)
+
+
+def test_local_backend_matches_overpass_semantics(osm_extract):
+    backend = LocalOSMBackend(osm_extract)
+    filters = ['["amenity"]', '["amenity"="cafe"]', '["leisure"="park"]', '["highway"="bus_stop"]']
+    data = backend.fetch_all_chunked(BBOX, filters)
+    assert data['osm3s']['timestamp_osm_base'] == "2025-09-01T00:00:00Z"
+    assert data['elements'] == [
+        {'type': 'node', 'id': 1, 'lat': 0.5, 'lon': 0.5, 'tags': {'amenity': 'cafe', 'name': 'Inside'}},
+        # crosses the bbox with both nodes outside it
+        {'type': 'way', 'id': 100, 'center': {'lat': 0.5, 'lon': 0.5}, 'tags': {'highway': 'bus_stop'}},
+        {'type': 'way', 'id': 101, 'center': {'lat': 0.2, 'lon': 0.2}, 'tags': {'leisure': 'park'}},
+        # matched through its untagged member way
+        {'type': 'relation', 'id': 200, 'center': {'lat': 0.1, 'lon': 0.2}, 'tags': {'amenity': 'school'}},
+    ]
+    rows = normalize_elements(data['elements'])
+    assert [(r['type'], r['id'], r['name']) for r in rows] == [('node', 1, 'Inside'), ('way', 100, 'N/A'),
+                                                               ('way', 101, 'N/A'), ('relation', 200, 'N/A')]
+
+
+def test_local_backend_value_filters(osm_extract):
+    backend = LocalOSMBackend(osm_extract)
+    ids = [el['id'] for el in backend.fetch_bbox((0.0, 0.0, 10.0, 10.0), ['["amenity"="cafe"]', '["shop"]'])['elements']]
+    assert ids == [1, 2, 3]
+    assert backend.fetch_bbox((10.0, 10.0, 11.0, 11.0), ['["amenity"]'])['elements'] == []
+
+
+def test_extract_site_and_extractor_run_on_local_backend(tmp_path, osm_extract, monkeypatch):
+    backend = LocalOSMBackend(osm_extract)
+    # The 1x1 km square around (0.2, 0.2) holds node 3 and the diagonal edge of way 101
+    rows, meta = extract_site(backend, 0.2, 0.2, ['["amenity"]', '["leisure"]', '["shop"]'], str(tmp_path / "out"))
+    assert [(r['type'], r['id']) for r in rows] == [('node', 3), ('way', 101)]
+    assert meta['overpass_url'].startswith('file://') and meta['osm_base_ts'] == "2025-09-01T00:00:00Z"
+    with open(tmp_path / "out" / "pois.json") as f:
+        assert json.load(f)['meta']['id_list_sha256'] == meta['id_list_sha256']
+
+    monkeypatch.setattr(extractor, "_overpass_client", backend)
+    df = extractor.get_pois_with_detailed_categories(0.5, 0.5, distance_km=60)
+    assert set(df['category']) == {"Cafés", "Parks and Recreational Areas", "Public Schools", "Public Transit Lines", "shop"}
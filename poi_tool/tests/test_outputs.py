@@ -0,0 +1,93 @@
+import csv
+import gzip
+import json
+import os
+
+import pytest
+
+from src.io_utils import id_list_hash, read_table, write_outputs, write_stream
+
+ROWS = [
+    {"type": "node", "id": 1, "lat": 48.1, "lon": 2.1, "name": "A", "tags": {"name": "A", "amenity": "cafe"}},
+    {"type": "way", "id": 7, "lat": 48.2, "lon": 2.2, "name": "N/A", "tags": {"shop": "bakery"}},
+    {"type": "relation", "id": 3, "lat": 48.3, "lon": 2.3, "name": "N/A", "tags": {}},
+]
+META = {"input_address": "", "center_lat": 48.0, "center_lon": 2.0, "utm_zone": 32631,
+        "bbox_wgs84": [47.9, 1.9, 48.1, 2.1], "tagset_hash": "abc", "osm_base_ts": "2025-09-01T00:00:00Z"}
+
+
+def test_csv_outputs_carry_id_hash(tmp_path):
+    csv_path, json_path = write_outputs(ROWS, str(tmp_path), META)
+    assert os.path.basename(csv_path) == 'pois.csv'
+    with open(json_path) as f:
+        doc = json.load(f)
+    assert doc['rows'] == ROWS
+    assert doc['meta']['id_list_sha256'] == id_list_hash(ROWS)
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow", "feather"])
+def test_columnar_outputs_round_trip(tmp_path, fmt):
+    pytest.importorskip("pyarrow")
+
+    path, meta_path = write_outputs(ROWS, str(tmp_path), META, fmt)
+    table, meta = read_table(path)
+    assert meta['tagset_hash'] == 'abc'
+    assert meta['bbox_wgs84'] == META['bbox_wgs84']
+    assert meta['id_list_sha256'] == id_list_hash(ROWS)
+    with open(meta_path) as f:
+        assert json.load(f) == meta
+    assert table.column('id').to_pylist() == [1, 7, 3]
+    assert [dict(t) for t in table.column('tags').to_pylist()] == [r['tags'] for r in ROWS]
+
+
+def _row_stream(n):
+    for i in range(n):
+        yield {"type": "node", "id": i, "lat": 48.0 + i * 1e-5, "lon": 2.0, "name": f"n{i}",
+               "tags": {"name": f"n{i}", "amenity": "bench"}}
+
+
+@pytest.mark.parametrize("fmt", ["csv-stream", "ndjson", "geojson"])
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_stream_writers_hash_on_the_fly(tmp_path, fmt, compression):
+    rows = list(_row_stream(1000))
+    path, meta_path = write_stream(_row_stream(1000), str(tmp_path), META, fmt, compression)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    assert meta['id_list_sha256'] == id_list_hash(rows)
+    assert meta['row_count'] == 1000
+
+    opener = gzip.open if compression == 'gzip' else open
+    with opener(path, 'rt', newline='') as f:
+        if fmt == 'ndjson':
+            assert [json.loads(line) for line in f] == rows
+        elif fmt == 'geojson':
+            doc = json.load(f)
+            assert doc['type'] == 'FeatureCollection'
+            assert doc['meta']['id_list_sha256'] == meta['id_list_sha256']
+            assert doc['features'][3]['geometry']['coordinates'] == [rows[3]['lon'], rows[3]['lat']]
+            assert [ft['properties']['tags'] for ft in doc['features']] == [r['tags'] for r in rows]
+        else:
+            out = list(csv.reader(f))
+            assert out[0] == ['type', 'id', 'lat', 'lon', 'name']
+            assert out[1:3] == [['node', '0', '48.00000000', '2.00000000', 'n0'], ['node', '1', '48.00001000', '2.00000000', 'n1']]
+
+
+def test_stream_writer_handles_empty_input(tmp_path):
+    path, meta_path = write_stream(iter([]), str(tmp_path), META, 'geojson')
+    with open(path) as f:
+        assert json.load(f)['features'] == []
+    with open(meta_path) as f:
+        assert json.load(f)['id_list_sha256'] == id_list_hash([])
+
+
+def test_csv_and_csv_stream_use_separate_files(tmp_path):
+    csv_path, _ = write_outputs(ROWS, str(tmp_path), META, 'csv')
+    stream_path, _ = write_outputs(ROWS, str(tmp_path), META, 'csv-stream')
+    assert os.path.basename(stream_path) == 'pois.stream.csv'
+    with open(csv_path) as f:
+        assert next(csv.reader(f))[0] == '# input_address'
+
+
+def test_compression_is_rejected_for_non_stream_formats(tmp_path):
+    with pytest.raises(ValueError):
+        write_outputs(ROWS, str(tmp_path), META, 'csv', 'gzip')
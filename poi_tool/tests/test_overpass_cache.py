@@ -0,0 +1,49 @@
+import os
+import time
+
+from src.overpass_cache import OverpassCache
+from src.overpass_client import OverpassClient
+
+URL = "https://overpass.example/api/interpreter"
+
+
+def test_key_ignores_indentation(tmp_path):
+    a = OverpassCache.key(URL, "[out:json];\n  node(1,2,3,4);\nout;")
+    b = OverpassCache.key(URL, "  [out:json];\nnode(1,2,3,4);\n\nout;  ")
+    assert a == b
+    assert a != OverpassCache.key(URL + "x", "[out:json];\nnode(1,2,3,4);\nout;")
+
+
+def test_live_entries_expire_snapshot_entries_do_not(tmp_path):
+    cache = OverpassCache(str(tmp_path), ttl_s=10)
+    live, pinned = "[out:json];node;out;", '[out:json][date:"2025-01-01T00:00:00Z"];node;out;'
+    cache.put(URL, live, {"elements": [1]})
+    cache.put(URL, pinned, {"elements": [2]})
+    assert cache.get(URL, live) == {"elements": [1]}
+
+    cache.ttl_s = -1
+    assert cache.get(URL, live) is None
+    assert cache.get(URL, pinned) == {"elements": [2]}
+
+
+def test_lru_eviction_respects_byte_budget(tmp_path):
+    cache = OverpassCache(str(tmp_path), max_bytes=10**9)
+    for i in range(3):
+        cache.put(URL, f"q{i}", {"elements": list(range(200))})
+        path = cache._path(cache.key(URL, f"q{i}"))
+        os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+    cache.get(URL, "q0")  # bump q0 to most recently used
+    size = os.path.getsize(cache._path(cache.key(URL, "q0")))
+    cache.max_bytes = 2 * size + size // 2
+    cache.put(URL, "q0", {"elements": list(range(200))})
+    assert cache.get(URL, "q1") is None
+    assert cache.get(URL, "q2") is not None
+    assert cache.get(URL, "q0") is not None
+
+
+def test_client_serves_cached_response(tmp_path):
+    cache = OverpassCache(str(tmp_path))
+    client = OverpassClient(base_url=URL, cache=cache)
+    q = client.build_query((0, 0, 1, 1), ['["amenity"]'], snapshot_iso='2025-09-01T00:00:00Z')
+    cache.put(URL, q, {"osm3s": {}, "elements": []})
+    assert client.fetch(q, max_retries=1) == {"osm3s": {}, "elements": []}
@@ -0,0 +1,65 @@
+import re
+import time
+
+from src.overpass_client import OverpassClient, OverpassTruncated
+from src.replay_server import ReplayServer
+
+
+def test_parallel_chunks_merge_like_sequential():
+    filters = ['["amenity"]', '["historic"]', '["leisure"]', '["shop"]']
+
+    class FakeClient(OverpassClient):
+        def fetch(self, query, max_retries=5, retry_truncated=True):
+            idx = next(i for i, f in enumerate(filters) if f in query)
+            time.sleep(0.01 * (len(filters) - idx))  # later chunks finish first
+            els = [{"type": "node", "id": 1, "lat": 0, "lon": 0, "tags": {"chunk": str(idx)}},
+                   {"type": "way", "id": 10 + idx, "center": {"lat": 0, "lon": 0}}]
+            return {"osm3s": {"timestamp_osm_base": f"t{idx}"}, "elements": els}
+
+    c = FakeClient()
+    seq = c.fetch_all_chunked((0, 0, 1, 1), filters, chunk_size=1)
+    par = c.fetch_all_chunked((0, 0, 1, 1), filters, chunk_size=1, max_workers=4)
+    assert par == seq
+    assert par['osm3s']['timestamp_osm_base'] == 't3'
+    assert par['elements'][0]['tags'] == {"chunk": "3"}
+
+
+def test_client_reuses_pooled_connections():
+    filters = ['["amenity"]', '["shop"]', '["leisure"]', '["tourism"]']
+    with ReplayServer(synth_elements=200) as server:
+        with OverpassClient(base_url=server.url, max_connections=2) as c:
+            session = c._http
+            for k in range(5):
+                c.fetch_bbox((0.0, 0.0, 1.0, 1.0), filters[k % 2:k % 2 + 1])
+            assert server.connections == 1  # status check and queries share one keep-alive connection
+            c.fetch_all_chunked((0.0, 0.0, 1.0, 1.0), filters, chunk_size=1, max_workers=4)
+            assert server.connections <= 2  # bounded by the pool
+        assert len(server.log) == 9
+    assert session.is_closed
+
+
+def test_truncated_bbox_is_split_into_quadrants():
+    points = [(0.1, 0.1, 1), (0.9, 0.9, 2), (0.5, 0.5, 3), (0.1, 0.9, 4)]
+
+    class FakeClient(OverpassClient):
+        queries = 0
+
+        def fetch(self, query, max_retries=5, retry_truncated=True):
+            FakeClient.queries += 1
+            s, w, n, e = map(float, re.search(r"\(([^()]*)\);", query).group(1).split(','))
+            if n - s > 0.5:
+                raise OverpassTruncated("runtime error: Query timed out")
+            els = [{"type": "node", "id": i, "lat": la, "lon": lo} for la, lo, i in points if s <= la <= n and w <= lo <= e]
+            return {"osm3s": {}, "elements": els}
+
+    c = FakeClient()
+    data = c.fetch_bbox((0, 0, 1, 1), ['["amenity"]'], max_workers=4)
+    assert FakeClient.queries == 5
+    assert sorted(el['id'] for el in data['elements']) == [1, 2, 3, 4]
+
+
+def test_build_query_uses_nwr_statements():
+    c = OverpassClient()
+    q = c.build_query((0, 0, 1, 1), ['["amenity"="cafe"]', '["amenity"]'])
+    assert 'nwr["amenity"](0,0,1,1);' in q
+    assert 'node[' not in q and 'cafe' not in q
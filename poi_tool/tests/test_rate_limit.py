@@ -0,0 +1,114 @@
+import time
+import threading
+
+import httpx
+
+from src.rate_limit import SlotScheduler, parse_status, status_url
+
+STATUS = """Connected as: 3232235777
+Current time: 2025-09-22T13:28:11Z
+Announced endpoint: gall.openstreetmap.de/
+Rate limit: 2
+1 slots available now.
+Slot available after: 2025-09-22T13:28:20Z, in 9 seconds.
+Currently running queries (pid, space limit, time limit, start time):
+"""
+
+
+def test_parse_status():
+    assert parse_status(STATUS) == {'rate_limit': 2, 'available': 1, 'waits_s': [9.0]}
+    assert status_url("https://overpass-api.de/api/interpreter") == "https://overpass-api.de/api/status"
+
+
+def test_scheduler_queues_until_status_reports_a_free_slot():
+    statuses = [
+        "Rate limit: 2\n1 slots available now.\nSlot available after: x, in 30 seconds.\n",
+        "Rate limit: 2\n0 slots available now.\nSlot available after: x, in 30 seconds.\nSlot available after: x, in 30 seconds.\n",
+        "Rate limit: 2\n1 slots available now.\nSlot available after: x, in 30 seconds.\n",
+    ]
+
+    class FakeScheduler(SlotScheduler):
+        reads = 0
+
+        def _fetch_status(self, endpoint):
+            FakeScheduler.reads += 1
+            return statuses[min(FakeScheduler.reads - 1, len(statuses) - 1)]
+
+    sched = FakeScheduler(status_ttl_s=0.0, poll_s=0.01)
+    sched.acquire("e")  # first reading: one free slot
+    sched.release("e")
+
+    acquired = threading.Event()
+    t = threading.Thread(target=lambda: (sched.acquire("e"), acquired.set()))
+    t.start()
+    t.join(2)
+    assert acquired.is_set()
+    assert FakeScheduler.reads == 3  # second reading had no free slot
+
+
+def test_defer_holds_queries():
+    class NoStatus(SlotScheduler):
+        def _fetch_status(self, endpoint):
+            return None
+
+    sched = NoStatus(default_slots=1)
+    sched.defer("e", 0.2)
+    t0 = time.monotonic()
+    sched.acquire("e")
+    assert time.monotonic() - t0 >= 0.15
+
+
+def test_release_rereads_status_without_waiting_for_ttl():
+    class OneSlot(SlotScheduler):
+        reads = 0
+
+        def _fetch_status(self, endpoint):
+            OneSlot.reads += 1
+            return "Rate limit: 1\n1 slots available now.\n"
+
+    sched = OneSlot(status_ttl_s=60.0, poll_s=5.0)
+    t0 = time.monotonic()
+    for _ in range(3):
+        sched.acquire("e")
+        sched.release("e")
+    assert time.monotonic() - t0 < 1.0
+    assert OneSlot.reads == 3
+
+
+def test_slow_status_page_does_not_block_other_endpoints():
+    unblock = threading.Event()
+
+    class SlowMirror(SlotScheduler):
+        def _fetch_status(self, endpoint):
+            if endpoint == "slow":
+                unblock.wait(5)
+            return None
+
+    sched = SlowMirror()
+    t = threading.Thread(target=sched.acquire, args=("slow",))
+    t.start()
+    time.sleep(0.05)
+    acquired = threading.Event()
+    other = threading.Thread(target=lambda: (sched.acquire("fast"), sched.release("fast"), sched.defer("fast", 0), acquired.set()))
+    other.start()
+    assert acquired.wait(1.0)
+    unblock.set()
+    t.join(2)
+    assert not t.is_alive()
+
+
+def test_missing_status_page_is_not_polled_again():
+    for code, polled_again in ((404, False), (503, True)):
+        reads = []
+
+        def handler(request):
+            reads.append(request.url.path)
+            return httpx.Response(code, text="")
+
+        sched = SlotScheduler(httpx.Client(transport=httpx.MockTransport(handler)), default_slots=1, status_ttl_s=0.0)
+        for _ in range(5):
+            sched.acquire("http://overpass.test/api/interpreter")
+            sched.release("http://overpass.test/api/interpreter")
+            sched.defer("http://overpass.test/api/interpreter", 0)
+        assert reads[0] == "/api/status"
+        assert (len(reads) > 1) == polled_again
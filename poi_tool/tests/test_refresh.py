@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from src.io_utils import id_list_hash, read_outputs, write_outputs
+from src.normalize import normalize_elements
+from src.overpass_client import OverpassClient
+from src.refresh import apply_changes, refresh_site
+from src.tags import tagset_hash
+
+FILTERS = ['["amenity"]']
+
+
+def _node(i, name, lat=0.5):
+    return {"type": "node", "id": i, "lat": lat, "lon": 0.5, "tags": {"amenity": "cafe", "name": name}}
+
+
+def test_apply_changes_creates_modifies_and_deletes():
+    old = normalize_elements([_node(1, "A"), _node(2, "B"), _node(3, "C"),
+                              {"type": "way", "id": 9, "center": {"lat": 0.1, "lon": 0.1}, "tags": {"amenity": "x"}}])
+    changed = [_node(2, "B2", lat=0.6), _node(4, "D")]
+    current = {("node", 1), ("node", 2), ("node", 4), ("way", 9)}
+    rows, stats = apply_changes(old, changed, current)
+    assert stats == {"created": 1, "modified": 1, "deleted": 1}
+    assert rows == normalize_elements([_node(1, "A"), _node(2, "B2", lat=0.6), _node(4, "D"),
+                                       {"type": "way", "id": 9, "center": {"lat": 0.1, "lon": 0.1}, "tags": {"amenity": "x"}}])
+
+
+@pytest.mark.parametrize("fmt,compression", [("csv", None), ("ndjson", None), ("geojson", "gzip"),
+                                             ("csv-stream", None), ("parquet", None)])
+def test_refresh_site_queries_only_changes(tmp_path, fmt, compression):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    rows = normalize_elements([_node(1, "A"), _node(2, "B")])
+    meta = {"bbox_wgs84": [0.0, 0.0, 1.0, 1.0], "tagset_hash": tagset_hash(FILTERS), "osm_base_ts": "2025-09-01T00:00:00Z"}
+    write_outputs(rows, str(tmp_path), meta, fmt, compression)
+    files = sorted(os.listdir(tmp_path))
+    queries = []
+
+    class FakeClient(OverpassClient):
+        def fetch(self, query, max_retries=5, retry_truncated=True):
+            queries.append(query)
+            if 'newer:"2025-09-01T00:00:00Z"' in query:
+                return {"osm3s": {"timestamp_osm_base": "2025-09-02T00:00:00Z"}, "elements": [_node(3, "C")]}
+            assert query.endswith("out ids;")
+            return {"osm3s": {}, "elements": [{"type": "node", "id": 1}, {"type": "node", "id": 3}]}
+
+    summary = refresh_site(FakeClient(), str(tmp_path), FILTERS)
+    assert summary == {"created": 1, "modified": 0, "deleted": 1, "rows": 2, "osm_base_ts": "2025-09-02T00:00:00Z"}
+    assert len(queries) == 2
+
+    # Rewritten in place, in the same format
+    assert sorted(os.listdir(tmp_path)) == files
+    new_rows, new_meta, new_fmt, new_compression = read_outputs(str(tmp_path))
+    assert (new_fmt, new_compression) == (fmt, compression)
+    assert [r['id'] for r in new_rows] == [1, 3]
+    if fmt != "csv-stream":
+        assert new_rows[1]['tags'] == {"amenity": "cafe", "name": "C"}
+    assert new_meta['osm_base_ts'] == "2025-09-02T00:00:00Z"
+    assert new_meta['refreshed_from_osm_base_ts'] == "2025-09-01T00:00:00Z"
+    assert new_meta['id_list_sha256'] == id_list_hash(new_rows)
@@ -0,0 +1,101 @@
+from collections import Counter
+
+import httpx
+
+from src import extractor
+from src.overpass_cache import OverpassCache
+from src.overpass_client import OverpassClient
+from src.rate_limit import parse_status, status_url
+from src.replay_server import DEFAULT_RECORDED_ENDPOINT, ReplayServer, parse_query
+
+BBOX = (0.0, 0.0, 1.0, 1.0)
+FILTERS = ['["amenity"]', '["shop"]', '["leisure"]', '["tourism"]']
+
+
+def _ids(data):
+    return sorted((el['type'], el['id']) for el in data['elements'])
+
+
+def test_parse_query_reads_back_build_query():
+    q = OverpassClient().build_query((1, 2, 3, 4), ['["amenity"="cafe"]'], newer_iso="2025-01-01T00:00:00Z", out="ids")
+    assert parse_query(q) == ([('["amenity"="cafe"]', (1.0, 2.0, 3.0, 4.0), True)], 'ids')
+
+
+def test_synthetic_answers_match_filters_and_bbox():
+    with ReplayServer(synth_elements=2000, seed=1) as server, OverpassClient(base_url=server.url) as c:
+        data = c.fetch(c.build_query((0.0, 0.0, 0.5, 0.5), ['["amenity"="cafe"]']))
+        assert data['elements']
+        for el in data['elements']:
+            pos = el if el['type'] == 'node' else el['center']
+            assert el['tags']['amenity'] == 'cafe'
+            assert 0.0 <= pos['lat'] <= 0.5 and 0.0 <= pos['lon'] <= 0.5
+        ids = c.fetch(c.build_query((0.0, 0.0, 0.5, 0.5), ['["amenity"="cafe"]'], out="ids"))
+        assert ids['elements'] == [{'type': el['type'], 'id': el['id']} for el in data['elements']]
+        assert c.fetch(c.build_query(BBOX, FILTERS, newer_iso="2025-01-01T00:00:00Z"))['elements'] == []
+
+
+def test_busy_responses_are_retried():
+    with ReplayServer(synth_elements=100, faults=[429, 504], retry_after_s=0) as server, \
+            OverpassClient(base_url=server.url) as c:
+        data = c.fetch(c.build_query(BBOX, FILTERS))
+        assert data['elements']
+        assert [e['status'] for e in server.log] == [429, 504, 200]
+
+
+def test_truncated_bbox_splits_back_to_full_result():
+    with ReplayServer(synth_elements=3000, seed=2) as server, OverpassClient(base_url=server.url) as c:
+        full = c.fetch(c.build_query(BBOX, FILTERS))
+    with ReplayServer(synth_elements=3000, seed=2, max_elements=500) as server, OverpassClient(base_url=server.url) as c:
+        split = c.fetch_bbox(BBOX, FILTERS, max_depth=3, max_workers=4)
+        assert server.log[0]['truncated'] and len(server.log) > 1
+    assert _ids(split) == _ids(full)
+
+
+def test_client_max_elements_splits_large_responses():
+    with ReplayServer(synth_elements=3000, seed=2) as server, OverpassClient(base_url=server.url, max_elements=400) as c:
+        split = c.fetch_bbox(BBOX, FILTERS, max_workers=4)
+        assert not server.log[0]['truncated'] and len(server.log) > 5
+        full = c.fetch(c.build_query(BBOX, FILTERS))
+    assert _ids(split) == _ids(full)
+
+
+def test_chunked_fetch_merges_like_one_query():
+    with ReplayServer(synth_elements=1000, seed=3, faults=['truncate', 'timeout']) as server, \
+            OverpassClient(base_url=server.url) as c:
+        chunked = c.fetch_all_chunked(BBOX, FILTERS, chunk_size=1, max_workers=4)
+        assert sum(e['truncated'] for e in server.log) == 2
+        whole = c.fetch(c.build_query(BBOX, FILTERS))
+    assert _ids(chunked) == _ids(whole)
+
+
+def test_recorded_responses_are_replayed(tmp_path):
+    q = OverpassClient().build_query(BBOX, ['["amenity"]'])
+    recorded = {'osm3s': {'timestamp_osm_base': 'rec'}, 'elements': [{'type': 'node', 'id': 7, 'lat': 0.1, 'lon': 0.1}]}
+    OverpassCache(str(tmp_path)).put(DEFAULT_RECORDED_ENDPOINT, q, recorded)
+    with ReplayServer(cache_dir=str(tmp_path), synth_elements=100) as server, OverpassClient(base_url=server.url) as c:
+        assert c.fetch(q) == recorded
+        assert c.fetch(c.build_query(BBOX, ['["shop"]']))['osm3s']['timestamp_osm_base'] != 'rec'
+
+
+def test_status_page_reports_rate_limit():
+    with ReplayServer(rate_limit=2) as server:
+        st = parse_status(httpx.get(status_url(server.url)).text)
+    assert st['rate_limit'] == 2 and st['available'] == 2
+
+
+def test_get_pois_runs_against_replay_server():
+    with ReplayServer(synth_elements=2000, synth_bbox=(40.0, -74.01, 40.01, -74.0), seed=4) as server, \
+            OverpassClient(base_url=server.url) as c:
+        extractor.set_overpass_client(c)
+        try:
+            df = extractor.get_pois(40.005, -74.005, distance_km=0.3)
+        finally:
+            extractor.set_overpass_client(None)
+    south, west, north, east = extractor._bbox_around(40.005, -74.005, 0.3)
+    keys = {'amenity', 'shop', 'leisure', 'tourism', 'historic'}
+    w = server.world
+    expected = Counter(
+        key for i in range(len(w))
+        for key in w.tags(i) if key in keys and south <= w.lat[i] <= north and west <= w.lon[i] <= east
+    )
+    assert expected and Counter(df['category']) == expected
@@ -0,0 +1,70 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.geometry import bbox_wgs84_for_square_m
+from src.local_osm import LocalOSMBackend
+from src.normalize import normalize_elements
+from src.spatial_index import SpatialIndex
+from src.tags import filters_predicate
+
+
+def _elements(n, seed=1):
+    rng = random.Random(seed)
+    for k in range(n):
+        etype = rng.choice(["node", "way", "relation"])
+        lat, lon = rng.uniform(48.80, 48.90), rng.uniform(2.25, 2.40)
+        tags = {"amenity": rng.choice(["cafe", "bar", "bench"])}
+        if rng.random() < 0.5:
+            tags["name"] = f"P{k}"
+        if etype == "node":
+            yield {"type": "node", "id": k, "lat": lat, "lon": lon, "tags": tags}
+        else:
+            h = rng.choice([0.0005, 0.003, 0.05])  # some wider than a cell
+            yield {"type": etype, "id": k, "center": {"lat": lat, "lon": lon}, "tags": tags,
+                   "bounds": {"minlat": lat - h, "minlon": lon - h, "maxlat": lat + h, "maxlon": lon + h}}
+
+
+def _brute_force(elements, bbox, filters=None):
+    south, west, north, east = bbox
+    match = filters_predicate(filters) if filters else (lambda tags: True)
+    hits = []
+    for el in elements:
+        b = el.get("bounds") or {"minlat": el["lat"], "maxlat": el["lat"], "minlon": el["lon"], "maxlon": el["lon"]}
+        if b["minlat"] <= north and b["maxlat"] >= south and b["minlon"] <= east and b["maxlon"] >= west \
+                and match(el.get("tags", {})):
+            hits.append(el)
+    return normalize_elements(hits)
+
+
+def test_index_queries_match_a_full_scan(tmp_path):
+    elements = list(_elements(3000))
+    index = SpatialIndex.build(elements, str(tmp_path / "idx"), cell_deg=0.005)
+    assert isinstance(index.keys.base, np.memmap)
+    rng = random.Random(2)
+    for _ in range(40):
+        lat, lon = rng.uniform(48.80, 48.90), rng.uniform(2.25, 2.40)
+        bbox = bbox_wgs84_for_square_m(lat, lon, rng.choice([200, 1000, 3000]))[:4]
+        assert index.query_rows(bbox) == _brute_force(elements, bbox)
+        assert index.query_rows(bbox, ['["amenity"="cafe"]']) == _brute_force(elements, bbox, ['["amenity"="cafe"]'])
+
+
+def test_index_from_local_extract_serves_as_backend(tmp_path, osm_extract):
+    backend = LocalOSMBackend(osm_extract)
+    filters = ['["amenity"]', '["leisure"]', '["shop"]', '["highway"]']
+    elements = backend.iter_bbox((-90.0, -180.0, 90.0, 180.0), filters, bounds=True)
+    SpatialIndex.build(elements, str(tmp_path / "idx"), osm3s=backend.osm3s(), filters=filters)
+
+    index = SpatialIndex(str(tmp_path / "idx"))  # reopened from disk
+    bbox = (0.0, 0.0, 1.0, 1.0)
+    live = backend.fetch_bbox(bbox, filters)
+    served = index.fetch_bbox(bbox, filters)
+    assert served['osm3s']['timestamp_osm_base'] == "2025-09-01T00:00:00Z"
+    assert normalize_elements(served['elements']) == normalize_elements(live['elements'])
+    assert [r['id'] for r in index.query_rows((4.9, 4.9, 5.1, 5.1))] == [2]
+
+    # Keys left out of the index are refused rather than silently empty
+    assert index.missing_filters(['["amenity"="cafe"]', '["building"]']) == ['["building"]']
+    with pytest.raises(ValueError, match="building"):
+        index.fetch_bbox(bbox, ['["amenity"]', '["building"]'])
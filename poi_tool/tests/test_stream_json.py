@@ -0,0 +1,75 @@
+import json
+
+import httpx
+import pytest
+
+from src.normalize import normalize_elements
+from src.overpass_client import OverpassClient, OverpassTruncated
+from src.stream_json import OverpassStreamParser
+
+DOC = {
+    "version": 0.6,
+    "generator": "Overpass API 0.7.62",
+    "osm3s": {"timestamp_osm_base": "2025-09-22T13:28:11Z", "copyright": "ODbL"},
+    "elements": [
+        {"type": "node", "id": 1, "lat": 40.1, "lon": -74.2, "tags": {"name": "Café Ünïcode", "amenity": "cafe"}},
+        {"type": "way", "id": 22, "center": {"lat": 40.0, "lon": -74.0}, "tags": {"note": "a, b ] }"}},
+        {"type": "relation", "id": 3, "center": {"lat": 1e-3, "lon": -2.5E2}},
+    ],
+    "remark": "runtime error: Query timed out",
+}
+
+
+@pytest.mark.parametrize("step", [1, 3, 7, 4096])
+def test_parser_matches_json_loads_for_any_chunking(step):
+    body = json.dumps(DOC, indent=1, ensure_ascii=False).encode('utf-8')
+    parser = OverpassStreamParser()
+    elements = []
+    for i in range(0, len(body), step):
+        elements.extend(parser.feed(body[i:i + step]))
+    elements.extend(parser.close())
+    assert elements == DOC["elements"]
+    assert parser.header == {k: v for k, v in DOC.items() if k != "elements"}
+
+
+def test_parser_rejects_truncated_body():
+    body = json.dumps(DOC).encode('utf-8')
+    parser = OverpassStreamParser()
+    parser.feed(body[:-40])
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+def test_iter_elements_streams_and_reports_truncation():
+    def handler(request):
+        if request.url.path.endswith('/status'):
+            return httpx.Response(404)
+        return httpx.Response(200, content=json.dumps(DOC).encode('utf-8'))
+
+    with OverpassClient(base_url="http://overpass.test/api/interpreter") as c:
+        c._http = httpx.Client(transport=httpx.MockTransport(handler))
+        c.scheduler._http = c._http
+        header = {}
+        seen = []
+        with pytest.raises(OverpassTruncated):
+            for el in c.iter_elements("q", header):
+                seen.append(el)
+        assert header["osm3s"]["timestamp_osm_base"] == "2025-09-22T13:28:11Z"
+        rows = normalize_elements(iter(seen))
+        assert [(r['type'], r['id']) for r in rows] == [("node", 1), ("way", 22), ("relation", 3)]
+
+
+def test_iter_elements_records_error_on_garbled_stream():
+    body = json.dumps(DOC).encode('utf-8')[:-40]
+
+    def handler(request):
+        if request.url.path.endswith('/status'):
+            return httpx.Response(404)
+        return httpx.Response(200, content=body)
+
+    with OverpassClient(base_url="http://overpass.test/api/interpreter") as c:
+        c._http = httpx.Client(transport=httpx.MockTransport(handler))
+        c.scheduler._http = c._http
+        with pytest.raises(ValueError):
+            list(c.iter_elements("q"))
+        assert list(c.pool._stats[c.base_url].outcomes) == [False]
@@ -0,0 +1,40 @@
+import itertools
+
+from src.tags import compile_filters, filter_predicate, filters_predicate, uncovered_filters
+
+
+def test_compile_filters_drops_subsumed_and_merges_values():
+    filters = ['["amenity"="cafe"]', '["amenity"]', '["route"="tram"]', '["route"="bus"]',
+               '["highway"="bus_stop"]', '["name"~"^A"]', '["shop"="a.b"]', '["shop"="c"]']
+    assert compile_filters(filters) == [
+        '["amenity"]', '["highway"="bus_stop"]', '["name"~"^A"]',
+        '["route"~"^(bus|tram)$"]', '["shop"~"^(a\\.b|c)$"]',
+    ]
+    assert compile_filters(compile_filters(filters)) == compile_filters(filters)
+
+
+def test_filter_predicates():
+    assert filter_predicate('["amenity"]')({'amenity': 'x'})
+    assert not filter_predicate('["amenity"="cafe"]')({'amenity': 'bar'})
+    assert filter_predicate('["shop"!="coffee"]')({})
+    assert not filter_predicate('["shop"!~"^c"]')({'shop': 'coffee'})
+    assert filter_predicate('["name"~"CAF",i][!"disused"]')({'name': 'Grand Café'})
+    assert not filter_predicate('["amenity"]["name"]')({'amenity': 'bench'})
+    assert filter_predicate('["a"~"^(x\\.y|z)$"]')({'a': 'x.y'})
+    assert not filter_predicate('["a"~"^(x\\.y|z)$"]')({'a': 'xzy'})
+
+
+def test_compiled_filters_select_the_same_tags():
+    filters = ['["amenity"="cafe"]', '["amenity"="bar"]', '["leisure"]', '["leisure"="park"]', '["name"="a.b"]', '["name"="c"]']
+    values = {"amenity": [None, "cafe", "bar", "pub"], "leisure": [None, "park", "pitch"], "name": [None, "a.b", "axb", "c"]}
+    raw, compiled = filters_predicate(filters), filters_predicate(compile_filters(filters))
+    for combo in itertools.product(*values.values()):
+        tags = {k: v for k, v in zip(values, combo) if v is not None}
+        assert raw(tags) == compiled(tags)
+
+
+def test_uncovered_filters():
+    indexed = ['["amenity"]', '["shop"="bakery"]', '["shop"="florist"]']
+    assert uncovered_filters(indexed, ['["amenity"="cafe"]', '["amenity"]["name"]', '["shop"="bakery"]']) == []
+    assert uncovered_filters(indexed, ['["shop"="deli"]', '["name"]["amenity"]']) == ['["shop"="deli"]']
+    assert uncovered_filters(indexed, ['["shop"]', '[!"amenity"]']) == ['[!"amenity"]', '["shop"]']